@@ -1,16 +1,20 @@
 """
 股票预警API路由
 """
+import csv
+import io
 import uuid
 from typing import List, Optional
 from datetime import datetime, timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Header
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, desc, func, case, select, true
 from loguru import logger
 
-from app.database.base import get_db
+from app.database.base import get_db, get_async_read_db, open_async_read_session
 from app.models.stock_alert import (
     StockAlert,
     StockAlertCreate,
@@ -18,57 +22,139 @@ from app.models.stock_alert import (
     StockAlertResponse,
     StockAlertToggle,
     StockAlertStats,
-    ALERT_RULE_TEMPLATES
+    ALERT_RULE_TEMPLATES,
+    normalize_symbol
 )
 from app.models.alert_trigger import AlertTrigger
 from app.core.config import settings
+from app.core.pagination import encode_cursor, keyset_before
+from app.core.responses import (
+    FastJSONResponse,
+    PrecomputedJSONResponse,
+    dumps_json,
+    etag_matches,
+    make_etag,
+    not_modified
+)
+from app.services.alert_monitor import alert_monitor
+from app.services.alert_versions import alert_versions
+from app.services.leader import leader_election
+from app.services.price_index import price_index
+from app.services.stats_cache import stats_cache
+from app.services.symbol_index import symbol_trie
 
 router = APIRouter()
 
+# 预警规则模板是静态的，启动时序列化一次
+_templates_response = PrecomputedJSONResponse({
+    "templates": ALERT_RULE_TEMPLATES,
+    "total": len(ALERT_RULE_TEMPLATES)
+})
+
+# 预警列表由客户端重新验证，不按时间缓存
+LIST_CACHE_CONTROL = "private, no-cache"
+
 
 def get_user_id(x_user_id: Optional[str] = Header(None)) -> str:
     """获取用户ID"""
     return x_user_id or "anonymous"
 
 
+def symbol_prefix_filter(prefix: str):
+    """
+    股票代码前缀条件
+    
+    在规范化列上写成半开区间 [prefix, prefix的后继)，不依赖 LIKE 的大小写和排序规则，
+    可直接使用 (user_id, is_deleted, symbol_key) 索引做范围扫描。
+    """
+    prefix = normalize_symbol(prefix)
+    if not prefix:
+        return true()
+    upper_bound = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(StockAlert.symbol_key >= prefix, StockAlert.symbol_key < upper_bound)
+
+
+def new_alert(alert_data: StockAlertCreate, user_id: str) -> StockAlert:
+    """由创建请求构造预警规则"""
+    return StockAlert(
+        id=str(uuid.uuid4()),
+        symbol=normalize_symbol(alert_data.symbol),
+        name=alert_data.name,
+        indicator_type=alert_data.indicator.type,
+        indicator_period=alert_data.indicator.period,
+        indicator_periods=alert_data.indicator.periods,
+        indicator_threshold=alert_data.indicator.threshold,
+        indicator_parameters=alert_data.indicator.parameters,
+        condition=alert_data.condition,
+        target_value=alert_data.target_value,
+        user_id=user_id,
+        description=alert_data.description,
+        priority=alert_data.priority,
+        tags=alert_data.tags
+    )
+
+
 @router.get("/alerts", response_model=List[StockAlertResponse])
 async def get_alerts(
+    request: Request,
     user_id: str = Depends(get_user_id),
     skip: int = Query(0, ge=0, description="跳过记录数"),
     limit: int = Query(100, ge=1, le=1000, description="返回记录数"),
-    symbol: Optional[str] = Query(None, description="股票代码过滤"),
+    cursor: Optional[str] = Query(None, description="分页游标（取自上一页响应头 X-Next-Cursor，使用时忽略 skip）"),
+    symbol: Optional[str] = Query(None, description="股票代码前缀过滤（不区分大小写）"),
     is_active: Optional[bool] = Query(None, description="是否启用过滤"),
     indicator_type: Optional[str] = Query(None, description="指标类型过滤"),
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """获取用户的所有预警规则"""
     try:
-        query = db.query(StockAlert).filter(
+        after_cursor = keyset_before(StockAlert.created_at, StockAlert.id, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # 版本号未变且查询参数相同，客户端缓存仍然有效，不执行查询（多 worker 时不提供 ETag）
+    version = alert_versions.current(user_id)
+    etag = make_etag(user_id, version, sorted(request.query_params.multi_items())) if version else None
+    if etag and etag_matches(if_none_match, etag):
+        return not_modified(etag, {"Cache-Control": LIST_CACHE_CONTROL})
+    
+    try:
+        query = select(StockAlert).where(
             StockAlert.user_id == user_id,
             StockAlert.is_deleted == False
         )
         
         # 应用过滤条件
         if symbol:
-            query = query.filter(StockAlert.symbol.ilike(f"%{symbol}%"))
+            query = query.where(symbol_prefix_filter(symbol))
         
         if is_active is not None:
-            query = query.filter(StockAlert.is_active == is_active)
+            query = query.where(StockAlert.is_active == is_active)
         
         if indicator_type:
-            query = query.filter(StockAlert.indicator_type == indicator_type)
-        
-        # 排序和分页
-        alerts = query.order_by(desc(StockAlert.created_at)).offset(skip).limit(limit).all()
-        
-        # 转换为响应格式
-        result = []
-        for alert in alerts:
-            alert_dict = alert.to_dict()
-            result.append(StockAlertResponse(**alert_dict))
+            query = query.where(StockAlert.indicator_type == indicator_type)
+        
+        # 排序和分页：游标模式沿 (user_id, is_deleted, created_at, id) 索引定位，不再扫描前面的页
+        query = query.order_by(desc(StockAlert.created_at), desc(StockAlert.id))
+        if after_cursor is not None:
+            query = query.where(after_cursor)
+        else:
+            query = query.offset(skip)
+        alerts = (await db.scalars(query.limit(limit))).all()
+        
+        # 满页时返回下一页游标
+        headers = {"Cache-Control": LIST_CACHE_CONTROL}
+        if etag:
+            headers["ETag"] = etag
+        if len(alerts) == limit and alerts[-1].created_at is not None:
+            headers["X-Next-Cursor"] = encode_cursor(alerts[-1].created_at, alerts[-1].id)
+        
+        # 数据库行可信，直接序列化 to_dict()，不再逐行构造并校验响应模型
+        result = [alert.to_dict() for alert in alerts]
         
         logger.info(f"用户 {user_id} 获取了 {len(result)} 个预警规则")
-        return result
+        return FastJSONResponse(result, headers=headers)
         
     except Exception as e:
         logger.error(f"获取预警规则失败: {e}")
@@ -96,30 +182,17 @@ async def create_alert(
             )
         
         # 创建预警规则
-        alert = StockAlert(
-            id=str(uuid.uuid4()),
-            symbol=alert_data.symbol.upper(),
-            name=alert_data.name,
-            indicator_type=alert_data.indicator.type,
-            indicator_period=alert_data.indicator.period,
-            indicator_periods=alert_data.indicator.periods,
-            indicator_threshold=alert_data.indicator.threshold,
-            indicator_parameters=alert_data.indicator.parameters,
-            condition=alert_data.condition,
-            target_value=alert_data.target_value,
-            user_id=user_id,
-            description=alert_data.description,
-            priority=alert_data.priority,
-            tags=alert_data.tags
-        )
+        alert = new_alert(alert_data, user_id)
         
         db.add(alert)
         db.commit()
         db.refresh(alert)
+        price_index.sync_alert(alert)
+        stats_cache.invalidate(user_id)
+        alert_versions.bump(user_id)
+        symbol_trie.add(alert.symbol)
         
-        # 转换为响应格式
-        alert_dict = alert.to_dict()
-        result = StockAlertResponse(**alert_dict)
+        result = FastJSONResponse(alert.to_dict())
         
         logger.info(f"用户 {user_id} 创建了预警规则: {alert.symbol} - {alert.indicator_type}")
         return result
@@ -132,25 +205,263 @@ async def create_alert(
         raise HTTPException(status_code=500, detail="创建预警规则失败")
 
 
+@router.post("/alerts/import")
+async def import_alerts(
+    alerts_data: List[StockAlertCreate],
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    批量导入预警规则
+    
+    整个列表先通过校验，只检查一次数量限制，全部规则在一个事务中插入，任一失败则全部回滚。
+    """
+    if not alerts_data:
+        raise HTTPException(status_code=400, detail="导入列表为空")
+    
+    try:
+        user_alert_count = db.query(StockAlert).filter(
+            StockAlert.user_id == user_id,
+            StockAlert.is_deleted == False
+        ).count()
+        
+        remaining = settings.MAX_ALERTS_PER_USER - user_alert_count
+        if len(alerts_data) > remaining:
+            raise HTTPException(
+                status_code=400,
+                detail=f"预警规则数量将超过上限 ({settings.MAX_ALERTS_PER_USER})，最多还可导入 {max(remaining, 0)} 条"
+            )
+        
+        alerts = [new_alert(alert_data, user_id) for alert_data in alerts_data]
+        
+        # 提交后不过期对象，更新内存索引时不会逐行重新查询
+        db.expire_on_commit = False
+        db.add_all(alerts)
+        db.commit()
+        
+        for alert in alerts:
+            price_index.sync_alert(alert)
+            symbol_trie.add(alert.symbol)
+        stats_cache.invalidate(user_id)
+        alert_versions.bump(user_id)
+        
+        logger.info(f"用户 {user_id} 批量导入了 {len(alerts)} 个预警规则")
+        
+        return {
+            "message": f"成功导入 {len(alerts)} 个预警规则",
+            "imported_count": len(alerts),
+            "ids": [alert.id for alert in alerts]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"批量导入预警规则失败: {e}")
+        raise HTTPException(status_code=500, detail="批量导入预警规则失败")
+
+
+async def _query_alert_stats(db: AsyncSession, user_id: str) -> dict:
+    """
+    单次查询汇总预警和触发统计
+    
+    触发表聚合为一行（条件计数得到今日触发数，使用时间范围而非 DATE() 以便走索引），
+    左连接按股票分组的预警计数，保证用户没有预警时也返回一行。
+    """
+    today = datetime.combine(datetime.now().date(), datetime.min.time())
+    tomorrow = today + timedelta(days=1)
+    
+    triggers = select(
+        func.count().label("total_triggers"),
+        func.count(case(
+            (and_(AlertTrigger.timestamp >= today, AlertTrigger.timestamp < tomorrow), 1)
+        )).label("today_triggers")
+    ).where(AlertTrigger.user_id == user_id).subquery()
+    
+    alerts = select(
+        StockAlert.symbol,
+        func.count().label("total_alerts"),
+        func.count(case((StockAlert.is_active == True, 1))).label("active_alerts")
+    ).where(
+        StockAlert.user_id == user_id,
+        StockAlert.is_deleted == False
+    ).group_by(StockAlert.symbol).subquery()
+    
+    rows = (await db.execute(
+        select(
+            triggers.c.total_triggers,
+            triggers.c.today_triggers,
+            alerts.c.symbol,
+            alerts.c.total_alerts,
+            alerts.c.active_alerts
+        ).select_from(triggers.outerjoin(alerts, true()))
+    )).all()
+    
+    return {
+        "total_alerts": sum(row.total_alerts or 0 for row in rows),
+        "active_alerts": sum(row.active_alerts or 0 for row in rows),
+        "total_triggers": rows[0].total_triggers,
+        "today_triggers": rows[0].today_triggers,
+        "connected_stocks": [row.symbol for row in rows if row.active_alerts],
+        "last_update": datetime.now()
+    }
+
+
+@router.get("/alerts/stats", response_model=StockAlertStats)
+async def get_alert_stats(
+    user_id: str = Depends(get_user_id),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """获取预警统计信息（按用户缓存，预警或触发记录变化时失效）"""
+    try:
+        stats = stats_cache.get(user_id)
+        if stats is None:
+            stats = await _query_alert_stats(db, user_id)
+            stats_cache.set(user_id, stats)
+        
+        return StockAlertStats(
+            **stats,
+            is_running=alert_monitor.is_running or (
+                settings.MONITOR_ENABLED and leader_election.leader_exists()
+            )
+        )
+        
+    except Exception as e:
+        logger.error(f"获取预警统计失败: {e}")
+        raise HTTPException(status_code=500, detail="获取预警统计失败")
+
+
+# 导出CSV的列，列表/字典类型的列以JSON字符串写入
+EXPORT_CSV_COLUMNS = [
+    "id", "symbol", "name", "indicator_type", "indicator_period", "indicator_periods",
+    "indicator_threshold", "indicator_parameters", "condition", "target_value", "is_active",
+    "trigger_count", "last_triggered", "created_at", "description", "priority", "tags"
+]
+
+# 每次向客户端写出的行数
+EXPORT_CHUNK_ROWS = 500
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (list, dict)):
+        return dumps_json(value).decode()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def _export_alert_rows(user_id: str, export_format: str):
+    """
+    逐块导出预警规则
+    
+    按列查询并以服务端游标分批读取，每行直接转换为输出格式，不创建 ORM 对象、不在内存中保存全部结果。
+    会话在生成器内打开，流式响应期间保持有效。
+    """
+    query = select(*StockAlert.__table__.columns).where(
+        StockAlert.user_id == user_id,
+        StockAlert.is_deleted == False
+    ).order_by(desc(StockAlert.created_at), desc(StockAlert.id)).execution_options(
+        yield_per=EXPORT_CHUNK_ROWS
+    )
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if export_format == "csv":
+        writer.writerow(EXPORT_CSV_COLUMNS)
+    
+    async with open_async_read_session(user_id) as db:
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            if export_format == "csv":
+                for row in rows:
+                    writer.writerow([_csv_value(getattr(row, column)) for column in EXPORT_CSV_COLUMNS])
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            else:
+                yield b"".join(dumps_json(StockAlert.row_to_dict(row)) + b"\n" for row in rows)
+    
+    if export_format == "csv" and buffer.tell():
+        yield buffer.getvalue()
+
+
+@router.get("/alerts/export")
+async def export_alerts(
+    user_id: str = Depends(get_user_id),
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$", description="导出格式: ndjson 或 csv")
+):
+    """流式导出用户的全部预警规则（NDJSON 每行一个与列表接口相同结构的对象；CSV 每行一条规则）"""
+    media_type = "text/csv; charset=utf-8" if export_format == "csv" else "application/x-ndjson"
+    filename = f"alerts-{datetime.now():%Y%m%d}.{export_format}"
+    logger.info(f"用户 {user_id} 导出预警规则 ({export_format})")
+    return StreamingResponse(
+        _export_alert_rows(user_id, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+# 固定路径须声明在 /alerts/{alert_id} 之前，否则会被当作 alert_id="batch-delete" 匹配
+@router.delete("/alerts/batch-delete")
+async def batch_delete_alerts(
+    alert_ids: List[str],
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db)
+):
+    """批量删除预警规则"""
+    try:
+        updated_count = db.query(StockAlert).filter(
+            StockAlert.id.in_(alert_ids),
+            StockAlert.user_id == user_id,
+            StockAlert.is_deleted == False
+        ).update(
+            {"is_deleted": True},
+            synchronize_session=False
+        )
+        
+        db.commit()
+        
+        for alert in db.query(StockAlert).filter(
+            StockAlert.id.in_(alert_ids),
+            StockAlert.user_id == user_id
+        ).all():
+            price_index.sync_alert(alert)
+        stats_cache.invalidate(user_id)
+        alert_versions.bump(user_id)
+        
+        logger.info(f"用户 {user_id} 批量删除了 {updated_count} 个预警规则")
+        
+        return {
+            "message": f"成功删除 {updated_count} 个预警规则",
+            "deleted_count": updated_count
+        }
+        
+    except Exception as e:
+        db.rollback()
+        logger.error(f"批量删除预警规则失败: {e}")
+        raise HTTPException(status_code=500, detail="批量删除预警规则失败")
+
+
 @router.get("/alerts/{alert_id}", response_model=StockAlertResponse)
 async def get_alert(
     alert_id: str,
     user_id: str = Depends(get_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """获取单个预警规则"""
     try:
-        alert = db.query(StockAlert).filter(
+        alert = await db.scalar(select(StockAlert).where(
             StockAlert.id == alert_id,
             StockAlert.user_id == user_id,
             StockAlert.is_deleted == False
-        ).first()
+        ))
         
         if not alert:
             raise HTTPException(status_code=404, detail="预警规则不存在")
         
-        alert_dict = alert.to_dict()
-        return StockAlertResponse(**alert_dict)
+        return FastJSONResponse(alert.to_dict())
         
     except HTTPException:
         raise
@@ -193,9 +504,12 @@ async def update_alert(
         
         db.commit()
         db.refresh(alert)
+        price_index.sync_alert(alert)
+        stats_cache.invalidate(user_id)
+        alert_versions.bump(user_id)
+        symbol_trie.add(alert.symbol)
         
-        alert_dict = alert.to_dict()
-        result = StockAlertResponse(**alert_dict)
+        result = FastJSONResponse(alert.to_dict())
         
         logger.info(f"用户 {user_id} 更新了预警规则: {alert.symbol}")
         return result
@@ -228,6 +542,9 @@ async def delete_alert(
         # 软删除
         alert.is_deleted = True
         db.commit()
+        price_index.remove(alert.id)
+        stats_cache.invalidate(user_id)
+        alert_versions.bump(user_id)
         
         logger.info(f"用户 {user_id} 删除了预警规则: {alert.symbol}")
         return {"message": "预警规则删除成功"}
@@ -261,9 +578,11 @@ async def toggle_alert(
         alert.is_active = toggle_data.is_active
         db.commit()
         db.refresh(alert)
+        price_index.sync_alert(alert)
+        stats_cache.invalidate(user_id)
+        alert_versions.bump(user_id)
         
-        alert_dict = alert.to_dict()
-        result = StockAlertResponse(**alert_dict)
+        result = FastJSONResponse(alert.to_dict())
         
         status = "启用" if toggle_data.is_active else "禁用"
         logger.info(f"用户 {user_id} {status}了预警规则: {alert.symbol}")
@@ -278,68 +597,32 @@ async def toggle_alert(
         raise HTTPException(status_code=500, detail="切换预警状态失败")
 
 
-@router.get("/alerts/stats", response_model=StockAlertStats)
-async def get_alert_stats(
-    user_id: str = Depends(get_user_id),
-    db: Session = Depends(get_db)
+@router.get("/symbols/search")
+async def search_symbols(
+    q: str = Query(..., min_length=1, max_length=20, description="股票代码前缀"),
+    limit: int = Query(10, ge=1, le=50, description="返回数量"),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """获取预警统计信息"""
-    try:
-        # 获取预警统计
-        total_alerts = db.query(StockAlert).filter(
-            StockAlert.user_id == user_id,
-            StockAlert.is_deleted == False
-        ).count()
-        
-        active_alerts = db.query(StockAlert).filter(
-            StockAlert.user_id == user_id,
-            StockAlert.is_active == True,
-            StockAlert.is_deleted == False
-        ).count()
-        
-        # 获取触发统计
-        total_triggers = db.query(AlertTrigger).filter(
-            AlertTrigger.user_id == user_id
-        ).count()
-        
-        # 今日触发数
-        today = datetime.now().date()
-        today_triggers = db.query(AlertTrigger).filter(
-            AlertTrigger.user_id == user_id,
-            func.date(AlertTrigger.timestamp) == today
-        ).count()
-        
-        # 获取监控的股票列表
-        connected_stocks = db.query(StockAlert.symbol).filter(
-            StockAlert.user_id == user_id,
-            StockAlert.is_active == True,
-            StockAlert.is_deleted == False
-        ).distinct().all()
-        
-        connected_stocks = [stock[0] for stock in connected_stocks]
-        
-        return StockAlertStats(
-            total_alerts=total_alerts,
-            active_alerts=active_alerts,
-            total_triggers=total_triggers,
-            today_triggers=today_triggers,
-            is_running=True,  # 这个需要从监控服务获取
-            connected_stocks=connected_stocks,
-            last_update=datetime.now()
-        )
-        
-    except Exception as e:
-        logger.error(f"获取预警统计失败: {e}")
-        raise HTTPException(status_code=500, detail="获取预警统计失败")
+    """股票代码自动补全（已知股票池内按前缀匹配，只返回代码，不返回其他用户填写的预警名称）"""
+    if symbol_trie.is_loaded:
+        symbols = symbol_trie.search(q, limit)
+    else:
+        # 未启用内存索引时走 symbol_key 索引
+        rows = (await db.scalars(
+            select(StockAlert.symbol_key).where(
+                symbol_prefix_filter(q),
+                StockAlert.is_deleted == False
+            ).group_by(StockAlert.symbol_key).order_by(StockAlert.symbol_key).limit(limit)
+        )).all()
+        symbols = [{"symbol": symbol} for symbol in rows]
+    
+    return {"query": normalize_symbol(q), "symbols": symbols, "total": len(symbols)}
 
 
 @router.get("/alert-templates")
-async def get_alert_templates():
+async def get_alert_templates(if_none_match: Optional[str] = Header(None)):
     """获取预警规则模板"""
-    return {
-        "templates": ALERT_RULE_TEMPLATES,
-        "total": len(ALERT_RULE_TEMPLATES)
-    }
+    return _templates_response.respond(if_none_match)
 
 
 @router.post("/alerts/batch-toggle")
@@ -362,6 +645,14 @@ async def batch_toggle_alerts(
         
         db.commit()
         
+        for alert in db.query(StockAlert).filter(
+            StockAlert.id.in_(alert_ids),
+            StockAlert.user_id == user_id
+        ).all():
+            price_index.sync_alert(alert)
+        stats_cache.invalidate(user_id)
+        alert_versions.bump(user_id)
+        
         status = "启用" if is_active else "禁用"
         logger.info(f"用户 {user_id} 批量{status}了 {updated_count} 个预警规则")
         
@@ -374,35 +665,3 @@ async def batch_toggle_alerts(
         db.rollback()
         logger.error(f"批量切换预警状态失败: {e}")
         raise HTTPException(status_code=500, detail="批量切换预警状态失败")
-
-
-@router.delete("/alerts/batch-delete")
-async def batch_delete_alerts(
-    alert_ids: List[str],
-    user_id: str = Depends(get_user_id),
-    db: Session = Depends(get_db)
-):
-    """批量删除预警规则"""
-    try:
-        updated_count = db.query(StockAlert).filter(
-            StockAlert.id.in_(alert_ids),
-            StockAlert.user_id == user_id,
-            StockAlert.is_deleted == False
-        ).update(
-            {"is_deleted": True},
-            synchronize_session=False
-        )
-        
-        db.commit()
-        
-        logger.info(f"用户 {user_id} 批量删除了 {updated_count} 个预警规则")
-        
-        return {
-            "message": f"成功删除 {updated_count} 个预警规则",
-            "deleted_count": updated_count
-        }
-        
-    except Exception as e:
-        db.rollback()
-        logger.error(f"批量删除预警规则失败: {e}")
-        raise HTTPException(status_code=500, detail="批量删除预警规则失败")
@@ -0,0 +1,178 @@
+"""
+预警回测和参数寻优API路由
+"""
+import asyncio
+import json
+import uuid
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from loguru import logger
+
+from app.api.v1.alerts import get_user_id
+from app.database.base import get_read_db
+from app.models.stock_alert import (
+    StockAlert,
+    normalize_symbol,
+    AlertBacktestRequest,
+    AlertBacktestResponse,
+    AlertOptimizeRequest,
+    TechnicalIndicator
+)
+from app.core.config import settings
+from app.services.alert_rules import AlertRule
+from app.services.backtest import history_provider, run_backtest, slice_bars
+from app.services.grid_search import GridSpec, grid_optimizer
+
+router = APIRouter()
+
+
+def _build_rule(
+    request: AlertBacktestRequest,
+    alert: Optional[StockAlert],
+    user_id: str
+) -> AlertRule:
+    """合并已有规则与请求中的覆盖配置"""
+    base = AlertRule.from_model(alert) if alert else None
+    indicator = request.indicator or (
+        TechnicalIndicator(**alert.to_dict()["indicator"]) if alert else None
+    )
+    symbol = normalize_symbol(request.symbol or (base.symbol if base else None))
+    condition = request.condition or (base.condition if base else None)
+    
+    if not symbol or indicator is None or condition is None:
+        raise HTTPException(status_code=400, detail="未指定 alert_id 时必须提供 symbol、indicator 和 condition")
+    
+    # 显式传入 target_value（包括 null）时覆盖已有规则
+    target_value = request.target_value
+    if "target_value" not in request.model_fields_set and base:
+        target_value = base.target_value
+    
+    return AlertRule(
+        id=base.id if base else str(uuid.uuid4()),
+        user_id=user_id,
+        symbol=symbol,
+        name=base.name if base else symbol,
+        indicator_type=indicator.type,
+        condition=condition,
+        indicator_period=indicator.period,
+        indicator_periods=tuple(indicator.periods) if indicator.periods else None,
+        indicator_threshold=indicator.threshold,
+        indicator_parameters=tuple(sorted(indicator.parameters.items())) if indicator.parameters else None,
+        target_value=target_value
+    )
+
+
+@router.post("/alerts/backtest", response_model=AlertBacktestResponse)
+async def backtest_alert(
+    request: AlertBacktestRequest,
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_read_db)
+):
+    """在历史K线上回测预警规则，返回所有本应触发的时间点和汇总统计"""
+    if any(horizon <= 0 for horizon in request.horizons):
+        raise HTTPException(status_code=400, detail="horizons 必须为正整数")
+    
+    alert = None
+    if request.alert_id:
+        alert = db.query(StockAlert).filter(
+            StockAlert.id == request.alert_id,
+            StockAlert.user_id == user_id,
+            StockAlert.is_deleted == False
+        ).first()
+        if not alert:
+            raise HTTPException(status_code=404, detail="预警规则不存在")
+    
+    rule = _build_rule(request, alert, user_id)
+    
+    bars = await asyncio.to_thread(history_provider.get_history, rule.symbol, request.period)
+    if bars is None:
+        raise HTTPException(status_code=502, detail=f"无法获取 {rule.symbol} 的行情数据")
+    
+    bars = slice_bars(bars, request.start, request.end)
+    if bars.empty:
+        raise HTTPException(status_code=400, detail="所选时间范围内没有K线数据")
+    
+    try:
+        result = run_backtest(rule, bars, request.horizons)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    summary = result["summary"]
+    logger.info(
+        f"用户 {user_id} 回测 {rule.symbol} {rule.indicator_name} {rule.condition}: "
+        f"{summary['bars']} 根K线, {summary['signal_count']} 次信号, {summary['elapsed_ms']}ms"
+    )
+    
+    return AlertBacktestResponse(
+        symbol=rule.symbol,
+        indicator=TechnicalIndicator(
+            type=rule.indicator_type,
+            period=rule.indicator_period,
+            periods=list(rule.indicator_periods) if rule.indicator_periods else None,
+            threshold=rule.indicator_threshold,
+            parameters=rule.parameters or None
+        ),
+        condition=rule.condition,
+        target_value=rule.target_value,
+        **result
+    )
+
+
+@router.post("/alerts/optimize")
+async def optimize_alert(
+    request: AlertOptimizeRequest,
+    user_id: str = Depends(get_user_id)
+):
+    """
+    在多只股票上扫描均线周期组合和阈值
+    
+    以 NDJSON 流式返回：每完成一个分块输出一行 progress，最后一行为 result。
+    """
+    try:
+        spec = GridSpec(
+            indicator_type=request.indicator_type.value,
+            condition=request.condition.value,
+            period_min=request.period_min,
+            period_max=request.period_max,
+            period_step=request.period_step,
+            periods_count=request.periods_count,
+            thresholds=tuple(request.thresholds),
+            horizon=request.horizon,
+            min_signals=request.min_signals,
+            top_k=request.top_k
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    symbols = list(dict.fromkeys(normalize_symbol(symbol) for symbol in request.symbols if symbol.strip()))
+    points = spec.size * len(symbols)
+    if points == 0:
+        raise HTTPException(status_code=400, detail="网格为空，请检查周期范围")
+    if points > settings.OPTIMIZER_MAX_POINTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"网格过大 ({points} 个评估点)，上限为 {settings.OPTIMIZER_MAX_POINTS}"
+        )
+    
+    histories = await asyncio.gather(*(
+        asyncio.to_thread(history_provider.get_history, symbol, request.period) for symbol in symbols
+    ))
+    closes = {
+        symbol: bars["close"].to_numpy(dtype=float)
+        for symbol, bars in zip(symbols, histories)
+        if bars is not None and not bars.empty
+    }
+    if not closes:
+        raise HTTPException(status_code=502, detail="无法获取行情数据")
+    
+    logger.info(f"用户 {user_id} 开始网格寻优: {len(closes)} 只股票, 每只 {spec.size} 个评估点")
+    
+    async def stream():
+        async for event in grid_optimizer.run(closes, spec):
+            yield json.dumps(jsonable_encoder(event), ensure_ascii=False) + "\n"
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
@@ -0,0 +1,19 @@
+"""
+预警监控状态API路由
+"""
+from fastapi import APIRouter
+
+from app.services.alert_monitor import alert_monitor
+from app.services.leader import leader_election
+
+router = APIRouter()
+
+
+@router.get("/monitor/status")
+async def get_monitor_status():
+    """获取后台预警监控运行状态（非领导者 worker 只返回领导者信息）"""
+    return {
+        **alert_monitor.get_status(),
+        "leader": leader_election.get_status()
+    }
+
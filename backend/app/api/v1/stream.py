@@ -0,0 +1,148 @@
+"""
+实时推送WebSocket路由
+
+连接后推送该用户的预警触发事件，以及所订阅股票的行情/指标更新，
+替代前端定时轮询 /alerts 和统计接口。
+
+事件只在运行后台评估的领导者进程中发布，多 worker 部署时由 event_relay 转发到其他进程，
+连接到任何 worker 都能收到。行情只为有活跃预警的股票拉取，订阅其他股票时返回错误。
+"""
+import asyncio
+import json
+from typing import List, Optional
+
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
+from loguru import logger
+
+from app.core.config import settings
+from app.database.database import get_session_factory
+from app.models.stock_alert import StockAlert, normalize_symbol
+from app.services.event_bus import event_bus, user_topic, symbol_topic
+
+router = APIRouter()
+
+# 心跳间隔（秒），保持代理和浏览器连接
+HEARTBEAT_INTERVAL = 30
+
+
+def _load_user_symbols(user_id: str) -> List[str]:
+    """用户活跃预警涉及的股票（仅在连接建立时查询一次）"""
+    session_factory = get_session_factory()
+    if session_factory is None:
+        return []
+    
+    db = session_factory()
+    try:
+        rows = db.query(StockAlert.symbol).filter(
+            StockAlert.user_id == user_id,
+            StockAlert.is_active == True,
+            StockAlert.is_deleted == False
+        ).distinct().all()
+        return sorted({row[0].upper() for row in rows})
+    finally:
+        db.close()
+
+
+def _monitored_symbols(symbols: List[str]) -> List[str]:
+    """有活跃预警（任意用户）的股票：后台评估只为这些股票拉取并推送行情"""
+    session_factory = get_session_factory()
+    if session_factory is None or not symbols:
+        return []
+    
+    db = session_factory()
+    try:
+        rows = db.query(StockAlert.symbol_key).filter(
+            StockAlert.symbol_key.in_(symbols),
+            StockAlert.is_active == True,
+            StockAlert.is_deleted == False
+        ).distinct().all()
+        return [row[0] for row in rows]
+    finally:
+        db.close()
+
+
+def _subscribed_symbols(subscription) -> List[str]:
+    return sorted(t.split(":", 1)[1] for t in subscription.topics if t.startswith("symbol:"))
+
+
+@router.websocket("/ws/alerts")
+async def alert_stream(
+    websocket: WebSocket,
+    user_id: Optional[str] = Query(None, description="用户ID（浏览器WebSocket无法设置自定义请求头）")
+):
+    """
+    预警实时推送
+    
+    服务端消息: {"type": "trigger" | "quote" | "subscribed" | "error" | "ping", ...}
+    客户端消息: {"action": "subscribe" | "unsubscribe", "symbols": ["AAPL", ...]}
+    
+    所有消息都由发送任务写出，接收循环只把回复放入同一个队列，同一连接上不会并发发送。
+    """
+    user_id = user_id or websocket.headers.get("x-user-id") or "anonymous"
+    await websocket.accept()
+    
+    max_symbols = settings.STREAM_MAX_SYMBOLS
+    symbols = (await asyncio.to_thread(_load_user_symbols, user_id))[:max_symbols]
+    subscription = event_bus.subscribe(
+        [user_topic(user_id)] + [symbol_topic(symbol) for symbol in symbols]
+    )
+    subscription.put({"type": "subscribed", "symbols": symbols})
+    
+    async def send_events():
+        while True:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), timeout=HEARTBEAT_INTERVAL)
+            except asyncio.TimeoutError:
+                event = {"type": "ping"}
+            await websocket.send_json(event)
+    
+    sender = asyncio.create_task(send_events())
+    try:
+        while True:
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                subscription.put({"type": "error", "message": "消息不是有效的JSON"})
+                continue
+            if not isinstance(message, dict):
+                subscription.put({"type": "error", "message": "消息格式无效"})
+                continue
+            
+            action = message.get("action")
+            requested = list(dict.fromkeys(
+                normalize_symbol(s) for s in message.get("symbols") or [] if isinstance(s, str) and s.strip()
+            ))
+            
+            if action == "subscribe":
+                new_symbols = [s for s in requested if symbol_topic(s) not in subscription.topics]
+                monitored = set(await asyncio.to_thread(_monitored_symbols, new_symbols))
+                unmonitored = [s for s in new_symbols if s not in monitored]
+                if unmonitored:
+                    subscription.put({
+                        "type": "error",
+                        "message": f"没有活跃预警的股票不推送行情，未订阅: {', '.join(unmonitored)}",
+                        "symbols": unmonitored
+                    })
+                new_topics = [symbol_topic(s) for s in new_symbols if s in monitored]
+                room = max_symbols - len(_subscribed_symbols(subscription))
+                event_bus.add_topics(subscription, new_topics[:room])
+                if len(new_topics) > room:
+                    subscription.put({
+                        "type": "error",
+                        "message": f"每个连接最多订阅 {max_symbols} 只股票，超出部分未订阅"
+                    })
+            elif action == "unsubscribe":
+                event_bus.remove_topics(subscription, [symbol_topic(s) for s in requested])
+            else:
+                subscription.put({"type": "error", "message": f"未知操作: {action}"})
+                continue
+            
+            subscription.put({"type": "subscribed", "symbols": _subscribed_symbols(subscription)})
+    
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.warning(f"WebSocket连接异常 ({user_id}): {e}")
+    finally:
+        event_bus.unsubscribe(subscription)
+        sender.cancel()
@@ -0,0 +1,178 @@
+"""
+预警触发记录API路由
+"""
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, select, update
+from loguru import logger
+
+from app.api.v1.alerts import get_user_id
+from app.database.base import get_db, get_async_read_db
+from app.models.alert_trigger import (
+    AlertTrigger,
+    AlertTriggerResponse,
+    AlertTriggerUpdate,
+    AlertTriggerMarkRead
+)
+from app.core.pagination import encode_cursor, keyset_before
+from app.core.responses import FastJSONResponse
+
+router = APIRouter()
+
+
+@router.get("/triggers", response_model=List[AlertTriggerResponse])
+async def get_triggers(
+    user_id: str = Depends(get_user_id),
+    limit: int = Query(50, ge=1, le=500, description="返回记录数"),
+    cursor: Optional[str] = Query(None, description="分页游标（取自上一页响应头 X-Next-Cursor）"),
+    alert_id: Optional[str] = Query(None, description="预警规则ID过滤"),
+    is_read: Optional[bool] = Query(None, description="是否已读过滤"),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    获取用户的触发记录（按触发时间倒序）
+
+    只支持游标分页：沿 (user_id, timestamp, id) 索引从游标位置向后取 limit 行，
+    翻到多深都只读一页的数据；不返回总数，避免每页对整段历史做 count()。
+    """
+    try:
+        after_cursor = keyset_before(AlertTrigger.timestamp, AlertTrigger.id, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        query = select(AlertTrigger).where(AlertTrigger.user_id == user_id)
+
+        if alert_id:
+            query = query.where(AlertTrigger.alert_id == alert_id)
+
+        # 未读过滤走 (user_id, is_read, timestamp, id) 索引，不必跳过大量已读行
+        if is_read is not None:
+            query = query.where(AlertTrigger.is_read == is_read)
+
+        if after_cursor is not None:
+            query = query.where(after_cursor)
+        query = query.order_by(desc(AlertTrigger.timestamp), desc(AlertTrigger.id))
+        triggers = (await db.scalars(query.limit(limit))).all()
+
+        # 满页时返回下一页游标
+        headers = {"Cache-Control": "private, no-cache"}
+        if len(triggers) == limit and triggers[-1].timestamp is not None:
+            headers["X-Next-Cursor"] = encode_cursor(triggers[-1].timestamp, triggers[-1].id)
+
+        result = [AlertTrigger.row_to_response(trigger) for trigger in triggers]
+
+        logger.info(f"用户 {user_id} 获取了 {len(result)} 条触发记录")
+        return FastJSONResponse(result, headers=headers)
+
+    except Exception as e:
+        logger.error(f"获取触发记录失败: {e}")
+        raise HTTPException(status_code=500, detail="获取触发记录失败")
+
+
+@router.post("/triggers/mark-read")
+async def mark_triggers_read(
+    request: AlertTriggerMarkRead,
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db)
+):
+    """
+    批量标记触发记录为已读
+
+    单条 UPDATE 语句完成，只匹配未读行；不指定 trigger_ids 时标记全部未读记录，
+    before 可限定为客户端已看到的最新触发时间，避免误标刚产生的记录。
+    """
+    try:
+        statement = update(AlertTrigger).where(
+            AlertTrigger.user_id == user_id,
+            AlertTrigger.is_read == False
+        )
+
+        if request.trigger_ids is not None:
+            if not request.trigger_ids:
+                return {"message": "成功标记 0 条触发记录为已读", "updated_count": 0}
+            statement = statement.where(AlertTrigger.id.in_(request.trigger_ids))
+
+        if request.alert_id:
+            statement = statement.where(AlertTrigger.alert_id == request.alert_id)
+
+        if request.before is not None:
+            statement = statement.where(AlertTrigger.timestamp <= request.before)
+
+        updated_count = db.execute(
+            statement.values(is_read=True),
+            execution_options={"synchronize_session": False}
+        ).rowcount
+        db.commit()
+
+        logger.info(f"用户 {user_id} 标记了 {updated_count} 条触发记录为已读")
+
+        return {
+            "message": f"成功标记 {updated_count} 条触发记录为已读",
+            "updated_count": updated_count
+        }
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"批量标记触发记录失败: {e}")
+        raise HTTPException(status_code=500, detail="批量标记触发记录失败")
+
+
+def _update_trigger(db: Session, user_id: str, trigger_id: str, values: dict) -> dict:
+    """按ID更新单条触发记录（单条 UPDATE，不先查询）"""
+    updated_count = db.execute(
+        update(AlertTrigger).where(
+            AlertTrigger.id == trigger_id,
+            AlertTrigger.user_id == user_id
+        ).values(**values),
+        execution_options={"synchronize_session": False}
+    ).rowcount
+
+    if not updated_count:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="触发记录不存在")
+
+    db.commit()
+    return {"message": "触发记录更新成功", "id": trigger_id}
+
+
+@router.patch("/triggers/{trigger_id}/read")
+async def mark_trigger_read(
+    trigger_id: str,
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db)
+):
+    """标记单条触发记录为已读"""
+    try:
+        return _update_trigger(db, user_id, trigger_id, {"is_read": True})
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"标记触发记录失败: {e}")
+        raise HTTPException(status_code=500, detail="标记触发记录失败")
+
+
+@router.patch("/triggers/{trigger_id}")
+async def update_trigger(
+    trigger_id: str,
+    trigger_data: AlertTriggerUpdate,
+    user_id: str = Depends(get_user_id),
+    db: Session = Depends(get_db)
+):
+    """更新触发记录（已读状态、严重程度）"""
+    values = trigger_data.model_dump(exclude_unset=True, exclude_none=True)
+    if not values:
+        raise HTTPException(status_code=400, detail="没有需要更新的字段")
+
+    try:
+        return _update_trigger(db, user_id, trigger_id, values)
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        logger.error(f"更新触发记录失败: {e}")
+        raise HTTPException(status_code=500, detail="更新触发记录失败")
@@ -30,9 +30,16 @@ class Settings(BaseSettings):
     DATABASE_PASSWORD: str = Field(default="", description="数据库密码")
     DATABASE_NAME: str = Field(default="stock_monitor", description="数据库名称")
     DATABASE_ECHO: bool = Field(default=False, description="是否打印SQL")
+    DATABASE_ASYNC_ENABLED: bool = Field(default=True, description="启用异步数据库引擎(aiosqlite/aiomysql，关闭时只读查询在线程中用同步会话执行)")
+    DATABASE_REPLICA_URLS: List[str] = Field(default=[], description="只读副本连接URL(为空则读写都走主库)")
+    DATABASE_READ_YOUR_WRITES_SECONDS: float = Field(default=5.0, description="用户写入后读请求固定走主库的时长(秒)，覆盖副本复制延迟")
     
     # SQLite配置
     SQLITE_PATH: str = Field(default="data/stock_monitor.db", description="SQLite数据库路径")
+    SQLITE_POOLED: bool = Field(default=True, description="SQLite使用连接池和WAL模式(关闭则单连接StaticPool)")
+    SQLITE_POOL_SIZE: int = Field(default=5, description="SQLite连接池大小")
+    SQLITE_MMAP_SIZE: int = Field(default=256 * 1024 * 1024, description="SQLite内存映射大小(字节)")
+    SQLITE_BUSY_TIMEOUT: int = Field(default=5000, description="SQLite锁等待超时(毫秒)")
     
     # Redis配置（可选）
     REDIS_HOST: str = Field(default="localhost", description="Redis主机")
@@ -68,7 +75,10 @@ class Settings(BaseSettings):
     
     # API配置
     API_V1_PREFIX: str = Field(default="/api/v1", description="API v1前缀")
-    API_RATE_LIMIT: str = Field(default="100/minute", description="API限流")
+    API_RATE_LIMIT: str = Field(default="100/minute", description="API限流(每个客户端IP，格式如 100/minute)")
+    RATE_LIMIT_ENABLED: bool = Field(default=True, description="启用API限流")
+    RATE_LIMIT_MAX_KEYS: int = Field(default=10000, description="限流器最多跟踪的IP数(超出淘汰最久未访问的)")
+    RATE_LIMIT_TRUSTED_PROXIES: int = Field(default=0, description="前置可信反向代理层数(>0时取X-Forwarded-For右起第N个地址作为客户端IP)")
     
     # 日志配置
     LOG_LEVEL: str = Field(default="INFO", description="日志级别")
@@ -82,10 +92,22 @@ class Settings(BaseSettings):
     API_RETRY_DELAY: float = Field(default=1.0, description="API重试延迟")
     
     # 监控配置
+    MONITOR_ENABLED: bool = Field(default=True, description="启用后台预警监控")
     MONITOR_CHECK_INTERVAL: int = Field(default=60, description="监控检查间隔(秒)")
     MAX_ALERTS_PER_USER: int = Field(default=100, description="每用户最大预警数")
     MAX_TRIGGERS_HISTORY: int = Field(default=1000, description="最大触发历史记录数")
     ALERT_COOLDOWN_MINUTES: int = Field(default=5, description="预警冷却时间(分钟)")
+    TRIGGER_FLUSH_INTERVAL: float = Field(default=1.0, description="触发记录批量写入间隔(秒)")
+    TRIGGER_FLUSH_MAX_RETRIES: int = Field(default=3, description="触发记录批量写入失败的最大重试次数(之后逐条写入并丢弃写不进的记录)")
+    
+    # 触发记录保留配置
+    TRIGGER_RETENTION_ENABLED: bool = Field(default=True, description="启用触发记录定期清理")
+    TRIGGER_RETENTION_DAYS: int = Field(default=0, description="触发记录保留天数(0为不限)")
+    RETENTION_INTERVAL_MINUTES: int = Field(default=60, description="清理任务执行间隔(分钟)")
+    RETENTION_BATCH_SIZE: int = Field(default=500, description="每批删除的记录数")
+    RETENTION_BATCH_PAUSE: float = Field(default=0.05, description="删除批次间的停顿(秒)")
+    TRIGGER_ARCHIVE_ENABLED: bool = Field(default=False, description="删除前按月归档触发记录")
+    TRIGGER_ARCHIVE_DIR: str = Field(default="data/archive", description="触发记录归档目录")
     
     # 文件上传配置
     MAX_UPLOAD_SIZE: int = Field(default=10 * 1024 * 1024, description="最大上传文件大小")
@@ -94,6 +116,8 @@ class Settings(BaseSettings):
     # 缓存配置
     CACHE_TTL: int = Field(default=300, description="缓存TTL(秒)")
     CACHE_MAX_SIZE: int = Field(default=1000, description="缓存最大条目数")
+    STATS_CACHE_TTL: int = Field(default=60, description="预警统计缓存TTL(秒)")
+    SYMBOL_TRIE_ENABLED: bool = Field(default=True, description="启用内存股票代码前缀索引(自动补全)")
     
     # 邮件配置（可选）
     SMTP_HOST: Optional[str] = Field(default=None, description="SMTP主机")
@@ -101,19 +125,35 @@ class Settings(BaseSettings):
     SMTP_USERNAME: Optional[str] = Field(default=None, description="SMTP用户名")
     SMTP_PASSWORD: Optional[str] = Field(default=None, description="SMTP密码")
     SMTP_USE_TLS: bool = Field(default=True, description="SMTP使用TLS")
+    SMTP_FROM: Optional[str] = Field(default=None, description="发件人地址")
     
     # 通知配置
     ENABLE_EMAIL_NOTIFICATIONS: bool = Field(default=False, description="启用邮件通知")
     ENABLE_WEBHOOK_NOTIFICATIONS: bool = Field(default=False, description="启用Webhook通知")
     WEBHOOK_URL: Optional[str] = Field(default=None, description="Webhook URL")
+    NOTIFICATION_EMAIL_TO: List[str] = Field(default=[], description="预警邮件收件人(管理员邮箱，所有邮件发往这些地址)")
+    NOTIFICATION_EMAIL_USER_IDS: List[str] = Field(default=[], description="只把这些用户的触发发送邮件(为空时不发送邮件，避免把其他用户的预警发给管理员)")
+    NOTIFICATION_QUEUE_SIZE: int = Field(default=1000, description="通知队列容量")
+    NOTIFICATION_BATCH_QUEUE_SIZE: int = Field(default=100, description="待发送通知批次队列容量(满时暂停聚合)")
+    NOTIFICATION_WORKERS: int = Field(default=2, description="通知发送worker数")
+    NOTIFICATION_COALESCE_WINDOW: float = Field(default=2.0, description="通知合并窗口(秒)")
+    NOTIFICATION_MAX_RETRIES: int = Field(default=3, description="通知发送最大重试次数")
+    NOTIFICATION_RETRY_DELAY: float = Field(default=1.0, description="通知重试初始延迟(秒)")
     
     # 性能配置
+    STREAM_MAX_SYMBOLS: int = Field(default=50, description="每个WebSocket连接最多订阅的股票数")
     WORKER_PROCESSES: int = Field(default=1, description="工作进程数")
+    LEADER_LOCK_FILE: str = Field(default="data/leader.lock", description="领导者选举锁文件")
+    LEADER_RETRY_INTERVAL: float = Field(default=5.0, description="领导者选举重试间隔(秒)")
+    EVENT_RELAY_SOCKET: str = Field(default="data/event-relay.sock", description="多 worker 时领导者向其他进程转发推送事件的Unix套接字")
+    OPTIMIZER_WORKERS: int = Field(default=0, description="网格寻优进程数(0为CPU核数)")
+    OPTIMIZER_CHUNK_SIZE: int = Field(default=256, description="网格寻优每个任务的周期组合数")
+    OPTIMIZER_MAX_POINTS: int = Field(default=2000000, description="单次网格寻优最大评估点数")
     WORKER_CONNECTIONS: int = Field(default=1000, description="工作连接数")
     KEEPALIVE_TIMEOUT: int = Field(default=5, description="保持连接超时")
     
     # 监控和健康检查
-    HEALTH_CHECK_INTERVAL: int = Field(default=30, description="健康检查间隔(秒)")
+    HEALTH_CHECK_INTERVAL: int = Field(default=30, description="健康状态后台采样间隔(秒)")
     METRICS_ENABLED: bool = Field(default=True, description="启用指标收集")
     
     class Config:
@@ -0,0 +1,56 @@
+"""
+游标（keyset）分页
+
+按 (时间 DESC, id DESC) 排序的列表使用上一页最后一行的 (时间, id) 作为游标，
+下一页查询直接沿索引定位，耗时与页深无关；offset 分页则需要扫描并丢弃前面所有行。
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import String, and_, literal, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+
+def encode_cursor(timestamp: datetime, row_id: str) -> str:
+    """把排序键编码为不透明的游标字符串"""
+    payload = json.dumps([timestamp.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """
+    解析游标
+    
+    Raises:
+        ValueError: 游标格式无效
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(timestamp), str(row_id)
+    except Exception as e:
+        raise ValueError("无效的分页游标") from e
+
+
+def keyset_before(time_column, id_column, cursor: Optional[str]) -> Optional[ColumnElement]:
+    """
+    游标之后（按时间、id 倒序）的过滤条件；游标为空时返回None
+    
+    写成 "时间 <= 游标 AND (时间 < 游标 OR id < 游标id)"：外层范围条件可直接用于复合索引定位，
+    单独的 OR 形式在参数化查询中无法被 SQLite 识别为范围，会退化为扫描前面所有行。
+    """
+    if not cursor:
+        return None
+    timestamp, row_id = decode_cursor(cursor)
+    
+    # SQLite 以文本存储并按文本排序时间：数据库默认值 CURRENT_TIMESTAMP 不带微秒，
+    # Python 写入的值总是带6位微秒。按存储格式绑定字符串，比较结果才与排序一致（MySQL 会隐式转换）。
+    # 微秒为0时游标无法区分两种格式，"X" 与 "X.000000" 都视为同一时刻，按 id 继续
+    upper = literal(timestamp.strftime("%Y-%m-%d %H:%M:%S.%f"), String)
+    lower = upper if timestamp.microsecond else literal(timestamp.strftime("%Y-%m-%d %H:%M:%S"), String)
+    return and_(
+        time_column <= upper,
+        or_(time_column < lower, id_column < row_id)
+    )
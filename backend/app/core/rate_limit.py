@@ -0,0 +1,119 @@
+"""
+API 限流
+
+令牌桶：每个键一个桶，容量为周期内允许的请求数，按 limit/period 的速率匀速补充，
+既限制平均速率又允许短时突发。桶只保存 (令牌数, 上次更新时间) 两个数，
+按最近访问顺序保存在 OrderedDict 中，键数达到 max_keys 时淘汰最久未访问的桶。
+最久未访问的桶通常早已补满，淘汰与原状态等价；只有同时活跃的客户端超过 max_keys 时，
+被淘汰的限流中的桶才会提前恢复（计入 evicted），新客户端不会因表满而被拒绝。
+
+限流器在事件循环线程中使用，不加锁；每个 worker 进程各自计数。
+"""
+import math
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.core.config import settings
+
+PERIOD_SECONDS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400
+}
+
+
+def parse_rate(rate: str) -> Tuple[int, float]:
+    """
+    解析限流配置
+
+    Args:
+        rate: 如 "100/minute"、"10/second"、"1000/hour"（单位可用复数）
+
+    Returns:
+        (请求数, 周期秒数)
+    """
+    try:
+        count, unit = rate.strip().split("/", 1)
+        unit = unit.strip().lower().rstrip("s")
+        return int(count), float(PERIOD_SECONDS[unit])
+    except (ValueError, KeyError):
+        raise ValueError(f"无效的限流配置: {rate}（格式如 100/minute）") from None
+
+
+class RateLimiter:
+    """令牌桶限流器"""
+
+    def __init__(self, limit: int, period: float, max_keys: Optional[int] = None):
+        self.limit = limit
+        self.period = period
+        self.rate = limit / period
+        self.max_keys = max_keys or settings.RATE_LIMIT_MAX_KEYS
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+        # 统计
+        self.allowed = 0
+        self.rejected = 0
+        self.evicted = 0
+
+    @classmethod
+    def from_setting(cls, rate: str, max_keys: Optional[int] = None) -> "RateLimiter":
+        limit, period = parse_rate(rate)
+        return cls(limit, period, max_keys)
+
+    def hit(self, key: str, now: Optional[float] = None) -> Tuple[bool, int, float]:
+        """
+        消耗一个令牌
+
+        Args:
+            key: 限流键
+            now: 当前单调时间（测试用）
+
+        Returns:
+            (是否放行, 剩余令牌数, 需等待的秒数)
+        """
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_keys:
+                self._buckets.popitem(last=False)
+                self.evicted += 1
+            bucket = [float(self.limit), now]
+            self._buckets[key] = bucket
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.limit, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            self.allowed += 1
+            return True, int(bucket[0]), 0.0
+
+        self.rejected += 1
+        return False, 0, (1 - bucket[0]) / self.rate
+
+    @staticmethod
+    def retry_after_header(wait: float) -> str:
+        """Retry-After 头（整秒，向上取整且至少1秒）"""
+        return str(max(1, math.ceil(wait)))
+
+    def reset(self):
+        """清空所有桶"""
+        self._buckets.clear()
+
+    def get_stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "period": self.period,
+            "keys": len(self._buckets),
+            "max_keys": self.max_keys,
+            "allowed": self.allowed,
+            "rejected": self.rejected,
+            "evicted": self.evicted
+        }
+
+
+# 全局API限流器
+rate_limiter = RateLimiter.from_setting(settings.API_RATE_LIMIT)
@@ -0,0 +1,77 @@
+"""
+快速JSON响应和条件请求
+
+路由返回 response_model 对象时，FastAPI 会先校验一遍模型，再经 jsonable_encoder
+逐字段转换，最后 json.dumps。对可信的数据库行，直接把 to_dict() 的结果一次性序列化：
+优先使用 orjson，未安装时使用 pydantic-core 的 to_json，两者都原生支持 datetime。
+
+ETag / If-None-Match：内容未变化时返回304，客户端复用缓存的响应体。
+"""
+import hashlib
+from typing import Any, Optional
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic_core import to_json
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+
+def dumps_json(content: Any) -> bytes:
+    """序列化为 JSON 字节串"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return to_json(content)
+
+
+class FastJSONResponse(JSONResponse):
+    """跳过响应模型校验和 jsonable_encoder 的 JSON 响应（内容需为可信的基础类型）"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+def make_etag(*parts: Any) -> str:
+    """由若干组成部分计算弱 ETag（响应可能经过 gzip 压缩，只保证语义相同）"""
+    digest = hashlib.blake2b("|".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 是否命中（弱比较，支持逗号分隔的多个值和 *）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == target:
+            return True
+    return False
+
+
+def not_modified(etag: str, headers: Optional[dict] = None) -> Response:
+    """304 响应"""
+    return Response(status_code=304, headers={"ETag": etag, **(headers or {})})
+
+
+class PrecomputedJSONResponse:
+    """
+    静态内容的预序列化响应
+
+    启动时序列化一次并计算 ETag，每次请求直接返回同一份字节。
+    """
+
+    def __init__(self, content: Any, cache_control: str = "public, max-age=3600"):
+        self.body = dumps_json(content)
+        self.etag = f'W/"{hashlib.blake2b(self.body, digest_size=12).hexdigest()}"'
+        self.headers = {"ETag": self.etag, "Cache-Control": cache_control}
+
+    def respond(self, if_none_match: Optional[str] = None) -> Response:
+        if etag_matches(if_none_match, self.etag):
+            return not_modified(self.etag, {"Cache-Control": self.headers["Cache-Control"]})
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
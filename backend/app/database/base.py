@@ -1,10 +1,17 @@
 """
 数据库基础配置
 """
-from sqlalchemy import create_engine, MetaData
+import asyncio
+import itertools
+from typing import List, Optional
+
+from fastapi import Header
+from sqlalchemy import create_engine, event, MetaData
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+
+from app.core.config import settings
 
 # 创建基础模型类
 Base = declarative_base()
@@ -69,13 +76,19 @@ def create_database_engine(database_url: str, **kwargs):
     
     # SQLite特殊配置
     if database_url.startswith("sqlite"):
-        engine_kwargs.update({
-            "poolclass": StaticPool,
-            "connect_args": {
-                "check_same_thread": False,
-                "timeout": 20
-            }
-        })
+        engine_kwargs["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": 20
+        }
+        if settings.SQLITE_POOLED and ":memory:" not in database_url:
+            # 连接池 + WAL：读连接与后台写入并行，不再共用一个连接串行执行
+            engine_kwargs.update({
+                "poolclass": QueuePool,
+                "pool_size": settings.SQLITE_POOL_SIZE,
+                "max_overflow": settings.SQLITE_POOL_SIZE
+            })
+        else:
+            engine_kwargs["poolclass"] = StaticPool
     
     # MySQL特殊配置
     elif "mysql" in database_url:
@@ -92,20 +105,162 @@ def create_database_engine(database_url: str, **kwargs):
     # 合并用户提供的参数
     engine_kwargs.update(kwargs)
     
-    return create_engine(database_url, **engine_kwargs)
+    engine = create_engine(database_url, **engine_kwargs)
+    if database_url.startswith("sqlite"):
+        apply_sqlite_pragmas(engine)
+    return engine
+
+
+def apply_sqlite_pragmas(engine):
+    """
+    每个新建的SQLite连接上设置PRAGMA
+    
+    - journal_mode=WAL: 读不阻塞写、写不阻塞读
+    - synchronous=NORMAL: WAL 模式下只在检查点时 fsync，崩溃不会损坏数据库
+    - mmap_size: 内存映射读取，减少 read() 系统调用和页面拷贝
+    - busy_timeout: 写锁冲突时等待而不是立即报 database is locked
+    
+    Args:
+        engine: 同步引擎，或异步引擎的 sync_engine
+    """
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if settings.SQLITE_POOLED:
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+            cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+            cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT)}")
+        finally:
+            cursor.close()
+
+
+def to_async_database_url(database_url: str) -> str:
+    """
+    同步数据库URL转换为异步驱动URL
+    
+    Args:
+        database_url: 同步连接URL（sqlite / mysql+pymysql）
+    
+    Returns:
+        异步连接URL（sqlite+aiosqlite / mysql+aiomysql）
+    """
+    if database_url.startswith("sqlite:"):
+        return database_url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if database_url.startswith("mysql+pymysql:"):
+        return database_url.replace("mysql+pymysql:", "mysql+aiomysql:", 1)
+    raise ValueError(f"不支持的异步数据库URL: {database_url.split('@')[-1]}")
+
+
+def create_async_database_engine(database_url: str, **kwargs):
+    """
+    创建异步数据库引擎
+    
+    Args:
+        database_url: 异步数据库连接URL
+        **kwargs: 额外的引擎参数
+    
+    Returns:
+        SQLAlchemy 异步引擎实例
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+    
+    engine_kwargs = {
+        "echo": False,
+        "pool_pre_ping": True,
+        "pool_recycle": 3600,
+    }
+    
+    # aiosqlite 每个连接在独立线程中执行，使用连接池允许多个查询并发等待；
+    # 内存库或关闭 SQLITE_POOLED 时与同步引擎一致，使用单连接 StaticPool
+    if database_url.startswith("sqlite"):
+        engine_kwargs["connect_args"] = {"timeout": 20}
+        if settings.SQLITE_POOLED and ":memory:" not in database_url:
+            engine_kwargs.update({
+                "pool_size": settings.SQLITE_POOL_SIZE,
+                "max_overflow": settings.SQLITE_POOL_SIZE
+            })
+        else:
+            engine_kwargs["poolclass"] = StaticPool
+    
+    elif "mysql" in database_url:
+        engine_kwargs.update({
+            "pool_size": 10,
+            "max_overflow": 20,
+            "pool_timeout": 30,
+            "connect_args": {"charset": "utf8mb4"}
+        })
+    
+    engine_kwargs.update(kwargs)
+    
+    engine = create_async_engine(database_url, **engine_kwargs)
+    if database_url.startswith("sqlite"):
+        apply_sqlite_pragmas(engine.sync_engine)
+    return engine
+
+
+class RoutingSession(Session):
+    """
+    读写分离会话
+    
+    info["read_only"] 为真且配置了只读副本时，查询路由到副本（轮询选择，
+    同一会话内固定一个副本）；其余会话以及任何 flush 写入都走主库。
+    """
+    
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replicas = self.info.get("replicas")
+        if replicas and self.info.get("read_only") and not self._flushing:
+            replica = self.info.get("replica")
+            if replica is None:
+                replica = replicas[next(self.info["replica_cycle"]) % len(replicas)]
+                self.info["replica"] = replica
+            return replica
+        return super().get_bind(mapper, clause=clause, **kw)
 
 
-def create_session_factory(engine):
+def _replica_info(replicas: Optional[List]) -> dict:
+    """会话工厂的副本路由信息（轮询计数器由同一工厂创建的会话共享）"""
+    if not replicas:
+        return {}
+    return {"replicas": list(replicas), "replica_cycle": itertools.count()}
+
+
+def create_async_session_factory(engine, replicas: Optional[List] = None):
+    """
+    创建异步会话工厂
+    
+    提交后不过期对象，响应序列化时不会在事件循环外触发隐式加载。
+    
+    Args:
+        engine: 异步主库引擎
+        replicas: 只读副本的异步引擎列表
+    """
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    
+    return async_sessionmaker(
+        bind=engine,
+        sync_session_class=RoutingSession,
+        info=_replica_info([replica.sync_engine for replica in replicas or []]),
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+
+def create_session_factory(engine, replicas: Optional[List] = None):
     """
     创建会话工厂
     
     Args:
-        engine: 数据库引擎
+        engine: 数据库引擎（主库）
+        replicas: 只读副本引擎列表
     
     Returns:
         会话工厂类
     """
     return sessionmaker(
+        class_=RoutingSession,
+        info=_replica_info(replicas),
         autocommit=False,
         autoflush=False,
         bind=engine
@@ -113,9 +268,11 @@ def create_session_factory(engine):
 
 
 # 数据库会话依赖
-def get_db():
+def get_db(x_user_id: Optional[str] = Header(None)):
     """
     获取数据库会话（FastAPI依赖）
+    
+    始终使用主库；提交过写入的用户在随后一段时间内的读请求也会走主库。
     """
     # 动态导入以避免循环导入
     from app.database.database import get_session_factory
@@ -124,19 +281,108 @@ def get_db():
     if session_factory is None:
         raise RuntimeError("数据库未初始化")
 
-    db = session_factory()
+    db = session_factory(info={"user_id": x_user_id or "anonymous"})
     try:
         yield db
     finally:
         db.close()
 
 
-# 异步数据库会话依赖（如果需要）
-async def get_async_db():
+def get_read_db(x_user_id: Optional[str] = Header(None)):
     """
-    获取异步数据库会话（FastAPI依赖）
+    获取只读数据库会话（FastAPI依赖）
+    
+    配置了只读副本时查询走副本；用户刚写入过则走主库（读己之写）。
+    """
+    from app.database.database import get_session_factory, db_manager
+
+    session_factory = get_session_factory()
+    if session_factory is None:
+        raise RuntimeError("数据库未初始化")
+
+    read_only = db_manager.can_read_replica(x_user_id or "anonymous")
+    db = session_factory(info={"read_only": read_only})
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class _ThreadedStreamResult:
+    """同步流式结果的异步包装（每次在线程中取一批）"""
+
+    def __init__(self, result):
+        self._result = result
+
+    async def partitions(self, size: Optional[int] = None):
+        iterator = self._result.partitions(size)
+        while True:
+            rows = await asyncio.to_thread(next, iterator, None)
+            if rows is None:
+                return
+            yield rows
+
+
+class ThreadedReadSession:
+    """
+    未启用异步引擎时的只读会话
+
+    提供路由用到的 AsyncSession 接口（execute / scalars / scalar / stream），
+    查询在线程中由同步会话执行，不阻塞事件循环。
+    """
+
+    def __init__(self, session: Session):
+        self._session = session
+
+    async def execute(self, statement, *args, **kwargs):
+        return await asyncio.to_thread(self._session.execute, statement, *args, **kwargs)
+
+    async def scalars(self, statement, *args, **kwargs):
+        return await asyncio.to_thread(self._session.scalars, statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await asyncio.to_thread(self._session.scalar, statement, *args, **kwargs)
+
+    async def stream(self, statement, *args, **kwargs):
+        result = await asyncio.to_thread(self._session.execute, statement, *args, **kwargs)
+        return _ThreadedStreamResult(result)
+
+    async def close(self):
+        await asyncio.to_thread(self._session.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+def open_async_read_session(user_id: str):
+    """
+    打开异步只读会话（async with 使用）
+    
+    配置了只读副本时查询走副本；用户刚写入过则走主库（读己之写）。
+    流式响应在依赖退出后仍需读取数据，可直接用它在生成器内打开会话。
+    """
+    from app.database.database import get_async_session_factory, get_session_factory, db_manager
+
+    info = {"read_only": db_manager.can_read_replica(user_id)}
+    session_factory = get_async_session_factory()
+    if session_factory is not None:
+        return session_factory(info=info)
+
+    # DATABASE_ASYNC_ENABLED=false：同步会话在线程中执行
+    sync_factory = get_session_factory()
+    if sync_factory is None:
+        raise RuntimeError("数据库未初始化")
+    return ThreadedReadSession(sync_factory(info=info))
+
+
+async def get_async_read_db(x_user_id: Optional[str] = Header(None)):
+    """
+    获取异步只读数据库会话（FastAPI依赖）
+    
+    路由规则同 get_read_db。
     """
-    # 这里可以实现异步数据库会话
-    # 目前使用同步版本
-    async for db in get_db():
+    async with open_async_read_session(x_user_id or "anonymous") as db:
         yield db
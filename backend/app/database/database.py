@@ -2,10 +2,13 @@
 数据库连接和初始化
 """
 import os
+import threading
+import time
+from contextvars import ContextVar
 from pathlib import Path
-from typing import Optional
+from typing import Dict, Optional
 
-from sqlalchemy import text
+from sqlalchemy import event, inspect, text
 from loguru import logger
 
 from app.database.base import (
@@ -13,10 +16,26 @@ from app.database.base import (
     get_database_url, 
     create_database_engine, 
     create_session_factory,
+    create_async_database_engine,
+    create_async_session_factory,
+    to_async_database_url,
+    RoutingSession,
     engine,
     SessionLocal
 )
 from app.core.config import settings
+from app.core.metrics import metrics, db_pool_checkout_seconds, db_queries_total
+
+# 计入指标的SQL语句类型，其余归为 OTHER
+QUERY_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE"}
+
+# 读己之写Cookie：值为该客户端读请求固定走主库的截止时间（Unix时间戳）。
+# 写入时间随客户端携带，多 worker 时后续请求落到任何进程都能读到主库
+READ_YOUR_WRITES_COOKIE = "primary_read_until"
+
+# 当前请求的读己之写状态（由中间件设置）：primary_until 取自请求Cookie，
+# wrote_until 为本次请求提交写入后的新截止时间，由中间件写回Cookie
+request_read_state: ContextVar[Optional[dict]] = ContextVar("request_read_state", default=None)
 
 
 class DatabaseManager:
@@ -25,6 +44,13 @@ class DatabaseManager:
     def __init__(self):
         self.engine = None
         self.session_factory = None
+        self.async_engine = None
+        self.async_session_factory = None
+        self.replica_engines = []
+        self.async_replica_engines = []
+        self._replica_urls = []
+        self._recent_writers: Dict[str, float] = {}
+        self._writers_lock = threading.Lock()
         self._is_initialized = False
     
     def initialize(
@@ -85,14 +111,25 @@ class DatabaseManager:
                 echo=settings.DATABASE_ECHO
             )
             
+            # 只读副本（未配置时读写都走主库）
+            self._create_replica_engines()
+            
             # 创建会话工厂
-            self.session_factory = create_session_factory(self.engine)
+            self.session_factory = create_session_factory(self.engine, self.replica_engines)
             
             # 更新全局变量
             global engine, SessionLocal
             engine = self.engine
             SessionLocal = self.session_factory
             
+            # 异步引擎（API读路径使用，不阻塞事件循环）
+            if settings.DATABASE_ASYNC_ENABLED:
+                self._create_async_engine(database_url)
+            
+            if settings.METRICS_ENABLED:
+                for name, engine_ in self._named_engines().items():
+                    instrument_engine(getattr(engine_, "sync_engine", engine_), name)
+            
             # 测试连接
             self._test_connection()
             
@@ -110,6 +147,71 @@ class DatabaseManager:
             logger.error(f"❌ 数据库初始化失败: {e}")
             raise
     
+    def _create_async_engine(self, database_url: str):
+        """创建异步引擎和会话工厂（需要 aiosqlite / aiomysql 驱动）"""
+        try:
+            self.async_engine = create_async_database_engine(
+                to_async_database_url(database_url),
+                echo=settings.DATABASE_ECHO
+            )
+        except ImportError as e:
+            raise RuntimeError(
+                f"异步数据库驱动未安装: {e}（安装 requirements.txt 或设置 DATABASE_ASYNC_ENABLED=false）"
+            ) from e
+        self.async_replica_engines = [
+            create_async_database_engine(to_async_database_url(url), echo=settings.DATABASE_ECHO)
+            for url in self._replica_urls
+        ]
+        self.async_session_factory = create_async_session_factory(
+            self.async_engine, self.async_replica_engines
+        )
+        logger.info("✅ 异步数据库引擎已创建")
+    
+    def _create_replica_engines(self):
+        """创建只读副本引擎，连接失败的副本跳过（读请求回落到主库）"""
+        self.replica_engines = []
+        self._replica_urls = []
+        for url in settings.DATABASE_REPLICA_URLS:
+            replica = create_database_engine(url, echo=settings.DATABASE_ECHO)
+            try:
+                with replica.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+            except Exception as e:
+                logger.error(f"❌ 只读副本连接失败，已跳过 {url.split('@')[-1]}: {e}")
+                replica.dispose()
+                continue
+            self.replica_engines.append(replica)
+            self._replica_urls.append(url)
+            logger.info(f"✅ 只读副本已连接: {url.split('@')[-1]}")
+    
+    def record_write(self, user_id: str):
+        """记录用户刚提交过写入，随后的读请求暂时走主库"""
+        window = settings.DATABASE_READ_YOUR_WRITES_SECONDS
+        if not self.replica_engines or window <= 0:
+            return
+        state = request_read_state.get()
+        if state is not None:
+            state["wrote_until"] = time.time() + window
+        
+        now = time.monotonic()
+        with self._writers_lock:
+            self._recent_writers[user_id] = now + window
+            # 清理过期记录，内存只与窗口内的活跃写入用户数有关
+            if len(self._recent_writers) > 1024:
+                self._recent_writers = {
+                    user: deadline for user, deadline in self._recent_writers.items() if deadline > now
+                }
+    
+    def can_read_replica(self, user_id: str) -> bool:
+        """读请求是否可以走只读副本"""
+        if not self.replica_engines:
+            return False
+        state = request_read_state.get()
+        if state is not None and state.get("primary_until", 0) > time.time():
+            return False
+        deadline = self._recent_writers.get(user_id)
+        return deadline is None or deadline <= time.monotonic()
+    
     def _test_connection(self):
         """测试数据库连接"""
         try:
@@ -130,12 +232,42 @@ class DatabaseManager:
             
             # 创建所有表
             Base.metadata.create_all(bind=self.engine)
+            
+            # create_all 不会修改已存在的表，新增的列和索引在这里补齐
+            self._add_missing_columns()
+            self._create_missing_indexes()
             logger.info("✅ 数据库表创建成功")
             
         except Exception as e:
             logger.error(f"❌ 创建数据库表失败: {e}")
             raise
     
+    def _add_missing_columns(self):
+        """为已存在的表添加模型中新增的列（均为可空列）"""
+        inspector = inspect(self.engine)
+        with self.engine.begin() as conn:
+            for table in Base.metadata.sorted_tables:
+                if not inspector.has_table(table.name):
+                    continue
+                existing = {column["name"] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing:
+                        continue
+                    column_type = column.type.compile(dialect=self.engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+                    logger.info(f"已添加列 {table.name}.{column.name}")
+            
+            # 回填规范化股票代码
+            conn.execute(text(
+                "UPDATE stock_alerts SET symbol_key = UPPER(TRIM(symbol)) WHERE symbol_key IS NULL"
+            ))
+    
+    def _create_missing_indexes(self):
+        """为已存在的表创建模型中新增的索引"""
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=self.engine, checkfirst=True)
+    
     def _create_sample_data(self):
         """创建示例数据（仅开发环境）"""
         try:
@@ -203,10 +335,46 @@ class DatabaseManager:
     
     def close(self):
         """关闭数据库连接"""
+        for replica in self.replica_engines:
+            replica.dispose()
         if self.engine:
             self.engine.dispose()
             logger.info("✅ 数据库连接已关闭")
     
+    async def close_async(self):
+        """关闭异步连接池（需在事件循环内调用）"""
+        for replica in self.async_replica_engines:
+            await replica.dispose()
+        if self.async_engine:
+            await self.async_engine.dispose()
+    
+    def _named_engines(self) -> dict:
+        """全部引擎（主库、副本，同步与异步），名称用于统计和指标标签"""
+        engines = {"primary": self.engine}
+        engines.update({f"replica_{i}": replica for i, replica in enumerate(self.replica_engines)})
+        if self.async_engine is not None:
+            engines["primary_async"] = self.async_engine
+            engines.update({
+                f"replica_{i}_async": replica for i, replica in enumerate(self.async_replica_engines)
+            })
+        return engines
+    
+    def get_pool_stats(self) -> dict:
+        """各引擎连接池状态（主库、副本、同步与异步分别统计）"""
+        engines = self._named_engines()
+        
+        stats = {}
+        for name, engine_ in engines.items():
+            if engine_ is None:
+                continue
+            pool = engine_.pool
+            pool_stats = {"pool": type(pool).__name__}
+            for attr in ("size", "checkedin", "checkedout", "overflow"):
+                if hasattr(pool, attr):
+                    pool_stats[attr] = getattr(pool, attr)()
+            stats[name] = pool_stats
+        return stats
+    
     def get_stats(self) -> dict:
         """获取数据库统计信息"""
         if not self._is_initialized:
@@ -233,6 +401,8 @@ class DatabaseManager:
                 "total_alerts": total_alerts,
                 "active_alerts": active_alerts,
                 "total_triggers": total_triggers,
+                "replicas": len(self.replica_engines),
+                "pools": self.get_pool_stats(),
                 "is_initialized": self._is_initialized
             }
             
@@ -256,10 +426,71 @@ class DatabaseManager:
             return False
 
 
+def instrument_engine(engine, name: str):
+    """
+    采集连接占用时长和SQL语句数
+    
+    Args:
+        engine: 同步引擎，或异步引擎的 sync_engine
+        name: 指标中的引擎名称
+    """
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        connection_record.info["checkout_at"] = time.perf_counter()
+    
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        checkout_at = connection_record.info.pop("checkout_at", None)
+        if checkout_at is not None:
+            db_pool_checkout_seconds.observe(time.perf_counter() - checkout_at, name)
+    
+    @event.listens_for(engine, "before_cursor_execute")
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        operation = statement.lstrip()[:6].upper()
+        db_queries_total.inc(name, operation if operation in QUERY_OPERATIONS else "OTHER")
+
+
 # 全局数据库管理器实例
 db_manager = DatabaseManager()
 
 
+def _pool_connection_samples() -> dict:
+    """抓取时读取各连接池的连接数"""
+    if not db_manager._is_initialized:
+        return {}
+    samples = {}
+    for name, stats in db_manager.get_pool_stats().items():
+        for state in ("checkedout", "checkedin", "overflow"):
+            if state in stats:
+                samples[(name, state)] = stats[state]
+    return samples
+
+
+metrics.gauge(
+    "db_pool_connections", "连接池连接数（checkedout 为已取出，checkedin 为空闲）",
+    ("engine", "state"), collect=_pool_connection_samples
+)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_session_wrote(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_bulk_write(orm_execute_state):
+    """批量 UPDATE/DELETE 不经过 flush，同样记为写入"""
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _record_session_writer(session):
+    """请求会话提交了写入时记录用户，用于读己之写路由"""
+    if session.info.pop("wrote", False) and session.info.get("user_id"):
+        db_manager.record_write(session.info["user_id"])
+
+
 def init_database():
     """初始化数据库（应用启动时调用）"""
     db_manager.initialize()
@@ -270,6 +501,11 @@ def close_database():
     db_manager.close()
 
 
+async def close_async_database():
+    """关闭异步数据库连接（应用关闭时调用）"""
+    await db_manager.close_async()
+
+
 def get_database_stats():
     """获取数据库统计信息"""
     return db_manager.get_stats()
@@ -283,3 +519,8 @@ def check_database_health():
 def get_session_factory():
     """获取会话工厂"""
     return db_manager.session_factory if db_manager._is_initialized else None
+
+
+def get_async_session_factory():
+    """获取异步会话工厂（未启用异步引擎时为None）"""
+    return db_manager.async_session_factory if db_manager._is_initialized else None
@@ -2,10 +2,10 @@
 预警触发记录模型
 """
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import List, Optional, Dict, Any
 from enum import Enum
 
-from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, JSON, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, JSON, Text, ForeignKey, Index
 from sqlalchemy.dialects.mysql import DECIMAL
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
@@ -54,11 +54,18 @@ class AlertTrigger(Base):
     # 关联关系
     # alert = relationship("StockAlert", back_populates="triggers")
 
+    # 复合索引：触发历史按 (时间, id) 倒序游标分页，未读列表和批量标记已读只扫描未读行
+    __table_args__ = (
+        Index("ix_alert_triggers_user_timestamp", "user_id", "timestamp", "id"),
+        Index("ix_alert_triggers_user_unread", "user_id", "is_read", "timestamp", "id"),
+    )
+
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
         return {
             "id": self.id,
             "alertId": self.alert_id,
+            "userId": self.user_id,
             "symbol": self.symbol,
             "currentPrice": float(self.current_price),
             "indicatorValue": float(self.indicator_value) if self.indicator_value else None,
@@ -70,6 +77,23 @@ class AlertTrigger(Base):
             "severity": self.severity
         }
 
+    @staticmethod
+    def row_to_response(row) -> Dict[str, Any]:
+        """转换为 AlertTriggerResponse 格式的字典"""
+        return {
+            "id": row.id,
+            "alert_id": row.alert_id,
+            "symbol": row.symbol,
+            "current_price": float(row.current_price),
+            "indicator_value": float(row.indicator_value) if row.indicator_value is not None else None,
+            "condition": row.condition,
+            "message": row.message,
+            "timestamp": row.timestamp,
+            "metadata": row.extra_data,
+            "is_read": row.is_read,
+            "severity": row.severity
+        }
+
 
 # Pydantic 模型用于API
 class AlertTriggerCreate(BaseModel):
@@ -108,6 +132,13 @@ class AlertTriggerUpdate(BaseModel):
     severity: Optional[int] = Field(None, ge=1, le=4, description="严重程度")
 
 
+class AlertTriggerMarkRead(BaseModel):
+    """批量标记已读请求（不指定ID时标记全部未读记录）"""
+    trigger_ids: Optional[List[str]] = Field(None, max_length=1000, description="触发记录ID列表")
+    alert_id: Optional[str] = Field(None, description="只标记该预警规则的触发记录")
+    before: Optional[datetime] = Field(None, description="只标记该时间及之前的触发记录")
+
+
 class AlertTriggerList(BaseModel):
     """触发记录列表响应"""
     triggers: list[AlertTriggerResponse]
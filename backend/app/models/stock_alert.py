@@ -5,14 +5,20 @@ from datetime import datetime
 from typing import Optional, List, Dict, Any
 from enum import Enum
 
-from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, JSON, Text
+from sqlalchemy import Column, String, Integer, Float, Boolean, DateTime, JSON, Text, Index
 from sqlalchemy.dialects.mysql import DECIMAL
 from sqlalchemy.sql import func
+from sqlalchemy.orm import validates
 from pydantic import BaseModel, Field
 
 from app.database.base import Base
 
 
+def normalize_symbol(symbol: Optional[str]) -> Optional[str]:
+    """股票代码规范化：去除空白并转为大写"""
+    return symbol.strip().upper() if symbol else symbol
+
+
 class IndicatorType(str, Enum):
     """技术指标类型"""
     MA = "MA"  # 移动平均线
@@ -47,6 +53,7 @@ class StockAlert(Base):
 
     id = Column(String(36), primary_key=True, index=True)
     symbol = Column(String(20), nullable=False, index=True, comment="股票代码")
+    symbol_key = Column(String(20), nullable=True, index=True, comment="规范化(大写)股票代码，用于前缀搜索")
     name = Column(String(100), nullable=False, comment="股票名称")
     
     # 技术指标配置
@@ -78,28 +85,48 @@ class StockAlert(Base):
     created_at = Column(DateTime, default=func.now(), comment="创建时间")
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now(), comment="更新时间")
 
+    # 复合索引：覆盖列表分页、活跃预警加载和按股票查找
+    __table_args__ = (
+        Index("ix_stock_alerts_user_deleted_created", "user_id", "is_deleted", "created_at", "id"),
+        Index("ix_stock_alerts_user_active", "user_id", "is_active"),
+        Index("ix_stock_alerts_symbol_active", "symbol", "is_active"),
+        Index("ix_stock_alerts_user_deleted_symbol_key", "user_id", "is_deleted", "symbol_key"),
+    )
+
+    @validates("symbol")
+    def _sync_symbol_key(self, key, value):
+        """写入股票代码时规范化，并同步到 symbol_key"""
+        value = normalize_symbol(value)
+        self.symbol_key = value
+        return value
+
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典格式"""
+        return self.row_to_dict(self)
+    
+    @staticmethod
+    def row_to_dict(row) -> Dict[str, Any]:
+        """转换为字典格式（row 可以是模型实例，也可以是按列查询得到的 Row）"""
         return {
-            "id": self.id,
-            "symbol": self.symbol,
-            "name": self.name,
+            "id": row.id,
+            "symbol": row.symbol,
+            "name": row.name,
             "indicator": {
-                "type": self.indicator_type,
-                "period": self.indicator_period,
-                "periods": self.indicator_periods,
-                "threshold": float(self.indicator_threshold) if self.indicator_threshold else None,
-                "parameters": self.indicator_parameters
+                "type": row.indicator_type,
+                "period": row.indicator_period,
+                "periods": row.indicator_periods,
+                "threshold": float(row.indicator_threshold) if row.indicator_threshold else None,
+                "parameters": row.indicator_parameters
             },
-            "condition": self.condition,
-            "target_value": float(self.target_value) if self.target_value else None,
-            "is_active": self.is_active,
-            "trigger_count": self.trigger_count,
-            "last_triggered": self.last_triggered,
-            "created_at": self.created_at,
-            "description": self.description,
-            "priority": self.priority,
-            "tags": self.tags
+            "condition": row.condition,
+            "target_value": float(row.target_value) if row.target_value else None,
+            "is_active": row.is_active,
+            "trigger_count": row.trigger_count,
+            "last_triggered": row.last_triggered,
+            "created_at": row.created_at,
+            "description": row.description,
+            "priority": row.priority,
+            "tags": row.tags
         }
 
 
@@ -174,6 +201,74 @@ class StockAlertStats(BaseModel):
     last_update: datetime = Field(..., description="最后更新时间")
 
 
+class AlertBacktestRequest(BaseModel):
+    """预警回测请求（指定 alert_id 时，其余字段覆盖已有规则的对应配置）"""
+    alert_id: Optional[str] = Field(None, description="已有预警规则ID")
+    symbol: Optional[str] = Field(None, min_length=1, max_length=20, description="股票代码")
+    indicator: Optional[TechnicalIndicator] = Field(None, description="技术指标配置")
+    condition: Optional[AlertCondition] = Field(None, description="触发条件")
+    target_value: Optional[float] = Field(None, description="目标值")
+    period: str = Field("1y", pattern=r"^(\d+(d|mo|y)|ytd|max)$", description="历史长度(如 1y、10y、max)")
+    start: Optional[datetime] = Field(None, description="回测开始时间")
+    end: Optional[datetime] = Field(None, description="回测结束时间")
+    horizons: List[int] = Field(default=[1, 5, 20], max_length=10, description="统计触发后收益的前瞻K线数")
+
+
+class BacktestTrigger(BaseModel):
+    """回测中的一次触发"""
+    timestamp: datetime
+    price: float
+    indicator_value: Optional[float] = None
+    is_onset: bool = Field(..., description="是否为连续触发区间的第一根K线")
+
+
+class BacktestForwardReturn(BaseModel):
+    """触发后收益统计（百分比）"""
+    count: int
+    mean: Optional[float] = None
+    median: Optional[float] = None
+    win_rate: Optional[float] = None
+
+
+class BacktestSummary(BaseModel):
+    """回测汇总"""
+    bars: int = Field(..., description="K线数量")
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+    trigger_count: int = Field(..., description="满足条件的K线数")
+    signal_count: int = Field(..., description="信号次数（连续触发合并为一次）")
+    trigger_ratio: float = Field(..., description="满足条件的K线占比")
+    avg_bars_between_signals: Optional[float] = None
+    forward_returns: Dict[str, BacktestForwardReturn] = Field(..., description="按前瞻K线数统计的信号后收益")
+    elapsed_ms: float = Field(..., description="评估耗时(毫秒)")
+
+
+class AlertBacktestResponse(BaseModel):
+    """预警回测结果"""
+    symbol: str
+    indicator: TechnicalIndicator
+    condition: AlertCondition
+    target_value: Optional[float] = None
+    triggers: List[BacktestTrigger]
+    summary: BacktestSummary
+
+
+class AlertOptimizeRequest(BaseModel):
+    """参数网格寻优请求"""
+    symbols: List[str] = Field(..., min_length=1, max_length=50, description="股票代码列表")
+    indicator_type: IndicatorType = Field(IndicatorType.MA_CONVERGENCE, description="指标类型(MA_CONVERGENCE/MA_PROXIMITY)")
+    condition: AlertCondition = Field(AlertCondition.CONVERGING, description="触发条件")
+    period_min: int = Field(3, ge=1, le=250, description="最小均线周期")
+    period_max: int = Field(60, ge=1, le=250, description="最大均线周期")
+    period_step: int = Field(1, ge=1, description="周期步长")
+    periods_count: int = Field(3, ge=2, le=5, description="均线缠绕的均线条数")
+    thresholds: List[float] = Field(default=[1.0, 2.0, 3.0], min_length=1, max_length=50, description="阈值列表(%)")
+    period: str = Field("5y", pattern=r"^(\d+(d|mo|y)|ytd|max)$", description="历史长度")
+    horizon: int = Field(5, ge=1, le=250, description="评估信号后收益的前瞻K线数")
+    min_signals: int = Field(3, ge=1, description="结果至少包含的信号次数")
+    top_k: int = Field(10, ge=1, le=100, description="返回的最佳结果数")
+
+
 # 预警规则模板
 ALERT_RULE_TEMPLATES = [
     {
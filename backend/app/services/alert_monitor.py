@@ -0,0 +1,324 @@
+"""
+后台预警监控
+
+按 MONITOR_CHECK_INTERVAL 周期评估所有活跃预警，按股票分组，
+每只股票每轮只拉取一次行情，评估全部规则并记录触发。
+规则和指标计划在轮次间复用，预警表的变更签名（行数、最大 updated_at）变化时才重新加载。
+"""
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from loguru import logger
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.database.database import get_session_factory
+from app.models.stock_alert import StockAlert
+from app.models.alert_trigger import AlertTrigger, generate_trigger_message
+from app.services.alert_rules import AlertRule
+from app.services.indicator_plan import IndicatorPlan
+from app.services.event_bus import event_bus, user_topic, symbol_topic
+from app.services.market_data import MarketDataProvider
+from app.services.notifier import notification_dispatcher
+from app.services.price_index import price_index
+from app.services.trigger_writer import trigger_writer
+
+
+class AlertMonitor:
+    """预警监控器"""
+    
+    def __init__(
+        self,
+        data_provider: Optional[MarketDataProvider] = None,
+        interval: Optional[int] = None,
+        max_concurrent_fetches: int = 8
+    ):
+        self.data_provider = data_provider or MarketDataProvider()
+        self.interval = interval or settings.MONITOR_CHECK_INTERVAL
+        self.max_concurrent_fetches = max_concurrent_fetches
+        
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = asyncio.Event()
+        
+        # 运行统计
+        self.cycle_count = 0
+        self.last_cycle_started: Optional[datetime] = None
+        self.last_cycle_duration: Optional[float] = None
+        self.last_cycle_lag: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.last_triggers = 0
+        self.monitored_symbols: List[str] = []
+        self.plan_stats: dict = {}
+        self.rule_reloads = 0
+        
+        # 上次加载的规则、计划及其对应的预警表签名
+        self._rules: List[AlertRule] = []
+        self._plan: Optional[IndicatorPlan] = None
+        self._rules_signature: Optional[tuple] = None
+    
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    async def start(self):
+        """启动后台监控任务"""
+        if self.is_running:
+            return
+        self._stopping = asyncio.Event()
+        await trigger_writer.start()
+        self._task = asyncio.create_task(self._run(), name="alert-monitor")
+        logger.info(f"✅ 预警监控已启动，检查间隔 {self.interval}s")
+    
+    async def stop(self):
+        """停止后台监控任务"""
+        if not self.is_running:
+            return
+        self._stopping.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await trigger_writer.stop()
+        logger.info("✅ 预警监控已停止")
+    
+    async def _run(self):
+        """固定频率调度：落后超过一个周期时跳过错过的轮次"""
+        loop = asyncio.get_running_loop()
+        next_run = loop.time()
+        
+        while not self._stopping.is_set():
+            self.last_cycle_lag = max(0.0, loop.time() - next_run)
+            
+            try:
+                await self.run_cycle()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"预警监控周期执行失败: {e}")
+            
+            next_run += self.interval
+            now = loop.time()
+            if next_run < now:
+                skipped = int((now - next_run) // self.interval) + 1
+                next_run += skipped * self.interval
+                logger.warning(f"预警监控周期超时，跳过 {skipped} 轮")
+            
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=next_run - now)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def run_cycle(self) -> int:
+        """
+        执行一轮评估
+        
+        Returns:
+            本轮触发的预警数
+        """
+        started = time.perf_counter()
+        self.last_cycle_started = datetime.now()
+        
+        # 先取签名再加载规则：加载期间发生的修改会让下一轮签名不同，从而再次加载
+        signature = await asyncio.to_thread(self._load_rules_signature)
+        if self._plan is None or signature is None or signature != self._rules_signature:
+            rules = await asyncio.to_thread(self._load_active_rules)
+            
+            # 价格阈值规则由常驻索引负责（API写操作实时维护），首次从数据库加载；
+            # 多 worker 时API写操作可能发生在其他进程，规则变化时按数据库重建
+            if not price_index.is_loaded or settings.WORKER_PROCESSES > 1:
+                price_index.load(rule for rule in rules if price_index.accepts(rule))
+            self._rules = rules
+            self._plan = IndicatorPlan([rule for rule in rules if not price_index.accepts(rule)])
+            self._rules_signature = signature
+            self.rule_reloads += 1
+        rules, plan = self._rules, self._plan
+        
+        symbols = sorted(set(plan.symbols) | set(price_index.symbols))
+        self.monitored_symbols = symbols
+        self.plan_stats = {**plan.get_stats(), "price_rules": len(price_index)}
+        
+        semaphore = asyncio.Semaphore(self.max_concurrent_fetches)
+        
+        async def evaluate_symbol(symbol: str):
+            async with semaphore:
+                bars = await asyncio.to_thread(self.data_provider.get_history, symbol)
+            if bars is None or bars.empty:
+                logger.warning(f"无法获取行情数据，跳过 {symbol} 的预警评估")
+                return []
+            now = datetime.now()
+            self._publish_quote(symbol, bars, now)
+            # 指标计算是CPU密集的 numpy/pandas 运算，放到线程中，不阻塞事件循环上的API请求
+            return await asyncio.to_thread(self.evaluate_symbol, plan, symbol, bars, now)
+        
+        results = await asyncio.gather(
+            *(evaluate_symbol(symbol) for symbol in symbols),
+            return_exceptions=True
+        )
+        
+        candidates = []
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, Exception):
+                logger.error(f"评估 {symbol} 预警失败: {result}")
+            else:
+                candidates.extend(result)
+        
+        # 提交到写缓冲，由其批量落库并最终判断冷却期；通知异步投递
+        triggered = 0
+        for rule, trigger in candidates:
+            if trigger_writer.submit(trigger, last_triggered=rule.last_triggered):
+                notification_dispatcher.publish(trigger)
+                event_bus.publish(user_topic(rule.user_id), {
+                    "type": "trigger",
+                    "data": jsonable_encoder(AlertTrigger(**trigger).to_dict())
+                })
+                triggered += 1
+        
+        self.cycle_count += 1
+        self.last_triggers = triggered
+        self.last_cycle_duration = time.perf_counter() - started
+        logger.info(
+            f"预警监控第 {self.cycle_count} 轮: {len(rules)} 条规则, "
+            f"{len(symbols)} 只股票, {self.plan_stats['indicators']} 个指标, "
+            f"触发 {triggered} 次, 耗时 {self.last_cycle_duration:.3f}s, "
+            f"延迟 {self.last_cycle_lag or 0:.3f}s"
+        )
+        return triggered
+    
+    def evaluate_symbol(
+        self,
+        plan: IndicatorPlan,
+        symbol: str,
+        bars: pd.DataFrame,
+        now: Optional[datetime] = None
+    ) -> List[Tuple[AlertRule, dict]]:
+        """评估同一只股票的所有规则（每个不同指标只计算一次；不访问事件循环，可在线程中调用）"""
+        current_price = float(bars["close"].iloc[-1])
+        now = now or datetime.now()
+        
+        try:
+            triggered = plan.evaluate(symbol, bars)
+        except Exception as e:
+            logger.error(f"评估 {symbol} 预警失败: {e}")
+            triggered = []
+        
+        price_series = {"value": bars["close"].to_numpy(dtype=float)}
+        triggered.extend((rule, price_series) for rule in price_index.match(symbol, current_price))
+        
+        return [
+            (rule, self._build_trigger(rule, current_price, series, now))
+            for rule, series in triggered
+            if not trigger_writer.in_cooldown(rule.id, now, rule.last_triggered)
+        ]
+    
+    def _publish_quote(self, symbol: str, bars: pd.DataFrame, now: datetime):
+        """向订阅该股票的连接推送最新行情（无订阅者时跳过）"""
+        topic = symbol_topic(symbol)
+        if not event_bus.has_subscribers(topic):
+            return
+        
+        close = bars["close"]
+        previous = float(close.iloc[-2]) if len(close) > 1 else None
+        price = float(close.iloc[-1])
+        event_bus.publish(topic, {
+            "type": "quote",
+            "symbol": symbol,
+            "price": price,
+            "change": price - previous if previous else None,
+            "change_percent": (price / previous - 1) * 100 if previous else None,
+            "volume": float(bars["volume"].iloc[-1]),
+            "timestamp": now.isoformat()
+        })
+    
+    def _build_trigger(self, rule: AlertRule, current_price: float, series: dict, now: datetime) -> dict:
+        """构造触发记录"""
+        indicator_value = series["value"][-1]
+        indicator_value = None if pd.isna(indicator_value) else float(indicator_value)
+        
+        return {
+            "id": str(uuid.uuid4()),
+            "alert_id": rule.id,
+            "symbol": rule.symbol,
+            "current_price": current_price,
+            "indicator_value": indicator_value,
+            "condition": rule.condition,
+            "message": generate_trigger_message(
+                symbol=rule.symbol,
+                condition=rule.condition,
+                current_price=current_price,
+                target_value=rule.target_value,
+                indicator_name=rule.indicator_name,
+                periods=list(rule.indicator_periods) if rule.indicator_periods else None
+            ),
+            "user_id": rule.user_id,
+            "severity": min(max(rule.priority, 1), 4),
+            "is_read": False,
+            "timestamp": now
+        }
+    
+    def _load_rules_signature(self) -> Optional[tuple]:
+        """
+        预警表的变更签名：(行数, 最大 updated_at)
+        
+        增删改和触发计数更新都会刷新 updated_at。SQLite 的 updated_at 只有秒级精度，
+        同一秒内的后续修改不会改变签名，因此最近一次修改距数据库当前时间不足 1 秒时返回 None，
+        下一轮仍然重新加载。
+        """
+        session_factory = get_session_factory()
+        if session_factory is None:
+            return None
+        
+        db = session_factory()
+        try:
+            count, latest, now = db.execute(
+                select(func.count(StockAlert.id), func.max(StockAlert.updated_at), func.now())
+            ).one()
+        finally:
+            db.close()
+        
+        if latest is not None and (now is None or latest >= now - timedelta(seconds=1)):
+            return None
+        return count, latest
+    
+    def _load_active_rules(self) -> List[AlertRule]:
+        """加载所有活跃预警"""
+        session_factory = get_session_factory()
+        if session_factory is None:
+            return []
+        
+        db = session_factory()
+        try:
+            alerts = db.query(StockAlert).filter(
+                StockAlert.is_active == True,
+                StockAlert.is_deleted == False
+            ).all()
+            return [AlertRule.from_model(alert) for alert in alerts]
+        finally:
+            db.close()
+    
+    def get_status(self) -> dict:
+        """监控运行状态"""
+        return {
+            "is_running": self.is_running,
+            "interval": self.interval,
+            "cycle_count": self.cycle_count,
+            "last_cycle_started": self.last_cycle_started.isoformat() if self.last_cycle_started else None,
+            "last_cycle_duration": self.last_cycle_duration,
+            "last_cycle_lag": self.last_cycle_lag,
+            "last_triggers": self.last_triggers,
+            "monitored_symbols": self.monitored_symbols,
+            "plan": self.plan_stats,
+            "rule_reloads": self.rule_reloads,
+            "trigger_writer": trigger_writer.get_stats(),
+            "last_error": self.last_error
+        }
+
+
+# 全局监控器实例
+alert_monitor = AlertMonitor()
@@ -0,0 +1,271 @@
+"""
+预警规则评估
+
+把 StockAlert 转换为与数据库会话无关的 AlertRule 快照，
+并在整段K线上向量化计算每根K线是否满足触发条件。
+实时评估只取最后一根K线的结果，回测则使用完整序列。
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.models.stock_alert import StockAlert, IndicatorType, AlertCondition
+from app.services import indicators
+
+
+# 与价格直接比较的叠加类指标（价格 vs 指标线）
+OVERLAY_INDICATORS = {IndicatorType.MA.value, IndicatorType.EMA.value, IndicatorType.BOLL.value}
+
+# EQUAL 条件的相对误差
+EQUAL_TOLERANCE = 0.001
+
+# RSI 未配置阈值时的默认超买/超卖线
+RSI_DEFAULT_LEVELS = {
+    AlertCondition.ABOVE.value: 70.0,
+    AlertCondition.CROSS_ABOVE.value: 70.0,
+    AlertCondition.BELOW.value: 30.0,
+    AlertCondition.CROSS_BELOW.value: 30.0,
+}
+
+
+@dataclass(frozen=True)
+class AlertRule:
+    """预警规则快照（脱离ORM会话，可在后台任务中安全使用）"""
+    id: str
+    user_id: str
+    symbol: str
+    name: str
+    indicator_type: str
+    condition: str
+    indicator_period: Optional[int] = None
+    indicator_periods: Optional[Tuple[int, ...]] = None
+    indicator_threshold: Optional[float] = None
+    indicator_parameters: Optional[Tuple[Tuple[str, float], ...]] = None
+    target_value: Optional[float] = None
+    priority: int = 1
+    last_triggered: Optional[datetime] = None
+
+    def __post_init__(self):
+        # 统一为普通字符串，避免枚举和字符串混用导致分组不一致
+        for field in ("indicator_type", "condition"):
+            value = getattr(self, field)
+            if isinstance(value, Enum):
+                object.__setattr__(self, field, value.value)
+
+    @classmethod
+    def from_model(cls, alert: StockAlert) -> "AlertRule":
+        """从数据库模型创建快照"""
+        return cls(
+            id=alert.id,
+            user_id=alert.user_id,
+            symbol=alert.symbol.upper(),
+            name=alert.name,
+            indicator_type=alert.indicator_type,
+            condition=alert.condition,
+            indicator_period=alert.indicator_period,
+            indicator_periods=tuple(alert.indicator_periods) if alert.indicator_periods else None,
+            indicator_threshold=float(alert.indicator_threshold) if alert.indicator_threshold is not None else None,
+            indicator_parameters=tuple(sorted(alert.indicator_parameters.items())) if alert.indicator_parameters else None,
+            target_value=float(alert.target_value) if alert.target_value is not None else None,
+            priority=alert.priority or 1,
+            last_triggered=alert.last_triggered
+        )
+
+    @property
+    def parameters(self) -> Dict[str, float]:
+        return dict(self.indicator_parameters or ())
+
+    @property
+    def indicator_name(self) -> str:
+        """指标显示名称，例如 MA20"""
+        if self.indicator_periods:
+            return f"{self.indicator_type}({','.join(map(str, self.indicator_periods))})"
+        return f"{self.indicator_type}{self.indicator_period or ''}"
+
+
+def compute_indicator(
+    bars: pd.DataFrame,
+    indicator_type: str,
+    period: Optional[int] = None,
+    periods: Optional[Tuple[int, ...]] = None,
+    parameters: Optional[Dict[str, float]] = None
+) -> Dict[str, np.ndarray]:
+    """
+    计算指标序列
+    
+    Args:
+        bars: 包含 open/high/low/close/volume 列的K线数据
+        indicator_type: 指标类型
+        period: 指标周期
+        periods: 多个周期（均线缠绕）
+        parameters: 其他参数
+    
+    Returns:
+        指标序列字典，value 为主值，signal/upper/lower 为辅助线（如有）
+    """
+    parameters = parameters or {}
+    close = bars["close"].to_numpy(dtype=float)
+    
+    if indicator_type == IndicatorType.PRICE:
+        return {"value": close}
+    
+    if indicator_type == IndicatorType.VOLUME:
+        return {"value": bars["volume"].to_numpy(dtype=float)}
+    
+    if indicator_type == IndicatorType.MA:
+        return {"value": indicators.sma(close, period or 20)}
+    
+    if indicator_type == IndicatorType.EMA:
+        return {"value": indicators.ema(close, period or 12)}
+    
+    if indicator_type == IndicatorType.RSI:
+        return {"value": indicators.rsi(close, period or 14)}
+    
+    if indicator_type == IndicatorType.MACD:
+        dif, dea, hist = indicators.macd(
+            close,
+            fast=int(parameters.get("fast", 12)),
+            slow=int(parameters.get("slow", 26)),
+            signal=int(parameters.get("signal", 9))
+        )
+        return {"value": dif, "signal": dea, "histogram": hist}
+    
+    if indicator_type == IndicatorType.BOLL:
+        upper, middle, lower = indicators.bollinger(
+            close,
+            period=period or 20,
+            std_dev=float(parameters.get("std_dev", 2.0))
+        )
+        return {"value": middle, "upper": upper, "lower": lower}
+    
+    if indicator_type == IndicatorType.KDJ:
+        k, d, j = indicators.kdj(
+            bars["high"].to_numpy(dtype=float),
+            bars["low"].to_numpy(dtype=float),
+            close,
+            n=period or 9,
+            m1=int(parameters.get("m1", 3)),
+            m2=int(parameters.get("m2", 3))
+        )
+        return {"value": k, "signal": d, "j": j}
+    
+    if indicator_type == IndicatorType.MA_CONVERGENCE:
+        return {"value": indicators.ma_convergence(close, periods or (5, 10, 20))}
+    
+    if indicator_type == IndicatorType.MA_PROXIMITY:
+        return {"value": indicators.ma_proximity(close, period or 20)}
+    
+    raise ValueError(f"不支持的指标类型: {indicator_type}")
+
+
+def _resolve_operands(
+    rule: AlertRule,
+    close: np.ndarray,
+    series: Dict[str, np.ndarray]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """确定比较主体和参照线（均为逐K线数组）"""
+    value = series["value"]
+    condition = rule.condition
+    level = rule.target_value if rule.target_value is not None else rule.indicator_threshold
+    
+    # 叠加类指标：价格与指标线比较，布林带按方向选择上下轨
+    if rule.indicator_type in OVERLAY_INDICATORS:
+        line = value
+        if rule.indicator_type == IndicatorType.BOLL:
+            if condition in (AlertCondition.ABOVE, AlertCondition.CROSS_ABOVE):
+                line = series["upper"]
+            elif condition in (AlertCondition.BELOW, AlertCondition.CROSS_BELOW):
+                line = series["lower"]
+        return close, line
+    
+    if level is None and rule.indicator_type == IndicatorType.RSI:
+        level = RSI_DEFAULT_LEVELS.get(condition)
+    
+    # MACD/KDJ 未指定阈值时比较快慢线（金叉/死叉）
+    if level is None and "signal" in series:
+        return value, series["signal"]
+    
+    if level is None:
+        return value, np.full(len(value), np.nan)
+    
+    return value, np.full(len(value), float(level))
+
+
+def evaluate_signals(
+    rule: AlertRule,
+    close: np.ndarray,
+    series: Dict[str, np.ndarray]
+) -> np.ndarray:
+    """
+    计算每根K线是否满足预警条件
+    
+    Args:
+        rule: 预警规则
+        close: 收盘价序列
+        series: compute_indicator 返回的指标序列
+    
+    Returns:
+        布尔数组，与K线一一对应
+    """
+    subject, line = _resolve_operands(rule, close, series)
+    prev_subject = np.concatenate(([np.nan], subject[:-1]))
+    prev_line = np.concatenate(([np.nan], line[:-1]))
+    threshold = rule.indicator_threshold
+    condition = rule.condition
+    
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if condition == AlertCondition.ABOVE:
+            return subject > line
+        
+        if condition == AlertCondition.BELOW:
+            return subject < line
+        
+        if condition == AlertCondition.CROSS_ABOVE:
+            return (prev_subject <= prev_line) & (subject > line)
+        
+        if condition == AlertCondition.CROSS_BELOW:
+            return (prev_subject >= prev_line) & (subject < line)
+        
+        if condition == AlertCondition.EQUAL:
+            return np.abs(subject - line) <= np.abs(line) * EQUAL_TOLERANCE
+        
+        if condition == AlertCondition.PERCENT_CHANGE:
+            percent = threshold if threshold is not None else rule.target_value
+            if percent is None:
+                return np.zeros(len(subject), dtype=bool)
+            change = np.abs(subject / prev_subject - 1) * 100
+            return change >= percent
+        
+        if condition in (AlertCondition.CONVERGING, AlertCondition.DIVERGING):
+            if rule.indicator_type != IndicatorType.MA_CONVERGENCE:
+                return np.zeros(len(subject), dtype=bool)
+            limit = threshold if threshold is not None else 2.0
+            if condition == AlertCondition.CONVERGING:
+                return subject <= limit
+            # 发散：由缠绕状态转为超出阈值
+            return (prev_subject <= limit) & (subject > limit)
+        
+        if condition in (AlertCondition.NEAR, AlertCondition.WITHIN_RANGE):
+            if rule.indicator_type != IndicatorType.MA_PROXIMITY:
+                return np.zeros(len(subject), dtype=bool)
+            if condition == AlertCondition.NEAR:
+                return subject <= (threshold if threshold is not None else 2.0)
+            return subject <= (threshold if threshold is not None else 1.0) / 2
+    
+    return np.zeros(len(subject), dtype=bool)
+
+
+def evaluate_latest(
+    rule: AlertRule,
+    close: np.ndarray,
+    series: Dict[str, np.ndarray]
+) -> bool:
+    """只评估最新一根K线（交叉类条件需要前一根）"""
+    if len(close) == 0:
+        return False
+    tail = {name: values[-2:] for name, values in series.items()}
+    return bool(evaluate_signals(rule, close[-2:], tail)[-1])
@@ -0,0 +1,68 @@
+"""
+预警版本号
+
+每个用户一个版本号，预警增删改和触发计数写入时更新。预警列表的 ETag 由版本号和查询参数
+计算，客户端带 If-None-Match 再次请求且版本未变时直接返回304，不执行列表查询。
+
+版本号取自进程内单调递增的计数器，失效即删除条目、下次读取时分配新号，因此不会重复使用
+旧版本号；ETag 中带进程标识，重启后旧 ETag 全部失效。其他 worker 进程的写入无法通知到
+本进程，继续返回304会让用户读不到自己刚写入的数据，因此多 worker 时不启用版本号
+（current 返回 None，列表不带 ETag）。
+"""
+import itertools
+import threading
+import uuid
+from typing import Dict, Iterable, Optional
+
+from app.core.config import settings
+
+
+class AlertVersions:
+    """按用户维护预警版本号（线程安全）"""
+
+    def __init__(self, enabled: Optional[bool] = None, max_size: Optional[int] = None):
+        self.enabled = settings.WORKER_PROCESSES <= 1 if enabled is None else enabled
+        self.max_size = max_size or settings.CACHE_MAX_SIZE
+        self.epoch = uuid.uuid4().hex[:8]
+        self._counter = itertools.count(1)
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self.bumps = 0
+
+    def current(self, user_id: str) -> Optional[str]:
+        """用户当前的预警版本（未启用时返回 None）"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            version = self._versions.get(user_id)
+            if version is None:
+                if len(self._versions) >= self.max_size:
+                    # 淘汰最早分配的条目（再次访问时分配新版本号，只会多一次完整响应）
+                    self._versions.pop(next(iter(self._versions)))
+                version = next(self._counter)
+                self._versions[user_id] = version
+            return f"{self.epoch}.{version}"
+
+    def bump(self, user_id: str):
+        """用户的预警发生变化"""
+        with self._lock:
+            if self._versions.pop(user_id, None) is not None:
+                self.bumps += 1
+
+    def bump_many(self, user_ids: Iterable[str]):
+        with self._lock:
+            for user_id in set(user_ids):
+                if self._versions.pop(user_id, None) is not None:
+                    self.bumps += 1
+
+    def get_stats(self) -> dict:
+        return {
+            "users": len(self._versions),
+            "enabled": self.enabled,
+            "bumps": self.bumps
+        }
+
+
+# 全局预警版本号
+alert_versions = AlertVersions()
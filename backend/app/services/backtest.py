@@ -0,0 +1,125 @@
+"""
+预警规则回测
+
+在整段历史K线上一次性向量化评估规则（与实时评估共用 compute_indicator /
+evaluate_signals），返回每个本应触发的时间点和汇总统计。
+10年日线约2500根K线，评估耗时为毫秒级，可用于前端交互式调参预览。
+"""
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.core.config import settings
+from app.services.alert_rules import AlertRule, compute_indicator, evaluate_signals
+from app.services.market_data import MarketDataProvider
+
+
+# 统计触发后收益的前瞻K线数
+DEFAULT_HORIZONS = (1, 5, 20)
+
+# 回测专用行情源：历史数据变化慢，缓存时间比实时监控长，便于反复调参
+history_provider = MarketDataProvider(period="1y", cache_ttl=settings.CACHE_TTL)
+
+
+def slice_bars(
+    bars: pd.DataFrame,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None
+) -> pd.DataFrame:
+    """按时间范围截取K线（包含两端）"""
+    tz = getattr(bars.index, "tz", None)
+    return bars.loc[_align_timestamp(start, tz):_align_timestamp(end, tz)]
+
+
+def _align_timestamp(value: Optional[datetime], tz) -> Optional[pd.Timestamp]:
+    """
+    把请求中的时间转换到行情索引的时区
+    
+    不带时区的时间按交易所本地时间理解；带时区的时间换算到索引时区
+    （索引不带时区时换算为UTC后去掉时区）。
+    """
+    if value is None:
+        return None
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        return timestamp.tz_localize(tz) if tz is not None else timestamp
+    return timestamp.tz_convert(tz)
+
+
+def _forward_returns(close: np.ndarray, hits: np.ndarray, horizon: int) -> Dict[str, Any]:
+    """触发后第 horizon 根K线相对触发价的收益统计（百分比）"""
+    hits = hits[hits + horizon < len(close)]
+    if len(hits) == 0:
+        return {"count": 0, "mean": None, "median": None, "win_rate": None}
+    
+    returns = (close[hits + horizon] / close[hits] - 1) * 100
+    return {
+        "count": int(len(returns)),
+        "mean": round(float(returns.mean()), 4),
+        "median": round(float(np.median(returns)), 4),
+        "win_rate": round(float((returns > 0).mean()), 4)
+    }
+
+
+def run_backtest(
+    rule: AlertRule,
+    bars: pd.DataFrame,
+    horizons: Sequence[int] = DEFAULT_HORIZONS
+) -> Dict[str, Any]:
+    """
+    回测预警规则
+    
+    Args:
+        rule: 预警规则
+        bars: 包含 open/high/low/close/volume 列、按时间升序的K线数据
+        horizons: 统计触发后收益的前瞻K线数
+    
+    Returns:
+        包含 triggers（逐次触发）和 summary（汇总统计）的字典
+    """
+    started = time.perf_counter()
+    
+    close = bars["close"].to_numpy(dtype=float)
+    series = compute_indicator(
+        bars,
+        rule.indicator_type,
+        rule.indicator_period,
+        rule.indicator_periods,
+        rule.parameters
+    )
+    signals = evaluate_signals(rule, close, series)
+    hits = np.flatnonzero(signals)
+    
+    # 连续满足条件的K线算作一次信号，只统计起始K线
+    onsets = signals & ~np.concatenate(([False], signals[:-1]))
+    onset_hits = np.flatnonzero(onsets)
+    gaps = np.diff(onset_hits)
+    
+    # 整列转换为Python对象后再组装，避免逐元素调用numpy/pandas标量方法
+    timestamps = bars.index[hits].to_pydatetime().tolist()
+    prices = np.round(close[hits], 4).tolist()
+    values = np.round(series["value"][hits], 4)
+    values = np.where(np.isfinite(values), values, None).tolist()
+    triggers = [
+        {"timestamp": timestamp, "price": price, "indicator_value": value, "is_onset": onset}
+        for timestamp, price, value, onset in zip(timestamps, prices, values, onsets[hits].tolist())
+    ]
+    
+    summary = {
+        "bars": int(len(close)),
+        "start": bars.index[0].to_pydatetime() if len(bars) else None,
+        "end": bars.index[-1].to_pydatetime() if len(bars) else None,
+        "trigger_count": int(len(hits)),
+        "signal_count": int(len(onset_hits)),
+        "trigger_ratio": round(len(hits) / len(close), 4) if len(close) else 0.0,
+        "avg_bars_between_signals": round(float(gaps.mean()), 2) if len(gaps) else None,
+        "forward_returns": {
+            str(horizon): _forward_returns(close, onset_hits, horizon) for horizon in horizons
+        },
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+    }
+    
+    return {"triggers": triggers, "summary": summary}
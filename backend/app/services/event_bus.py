@@ -0,0 +1,125 @@
+"""
+进程内事件总线
+
+WebSocket 推送使用的发布/订阅：每个连接一个有界队列，
+按主题（user:<用户ID>、symbol:<股票代码>）索引订阅者。
+发布只遍历该主题的订阅者，空闲连接不产生任何数据库或CPU开销。
+主题出现或消失时通知监听者（跨进程转发据此向领导者进程上报本进程订阅的主题）。
+"""
+import asyncio
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+
+class Subscription:
+    """一个订阅者（通常对应一个WebSocket连接）"""
+    
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.topics: Set[str] = set()
+        self.dropped = 0
+    
+    def put(self, event: dict):
+        """非阻塞投递，队列满时丢弃最旧的事件（慢消费者不影响发布方）"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+    
+    def deliver(self, topic: str, event: dict):
+        """接收发布到某个主题的事件"""
+        self.put(event)
+
+
+class EventBus:
+    """主题订阅的事件总线"""
+    
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._topics: Dict[str, Set[Subscription]] = defaultdict(set)
+        self._subscriptions: Set[Subscription] = set()
+        self._topic_listeners: List[Callable[[str, bool], None]] = []
+        self.published = 0
+        self.delivered = 0
+    
+    def subscribe(self, topics: Iterable[str] = (), subscription: Optional[Subscription] = None) -> Subscription:
+        """创建订阅（也可传入自定义的订阅者）"""
+        subscription = subscription or Subscription(self.queue_size)
+        self._subscriptions.add(subscription)
+        self.add_topics(subscription, topics)
+        return subscription
+    
+    def add_topic_listener(self, listener: Callable[[str, bool], None]):
+        """注册主题变化监听：listener(topic, True) 表示主题有了第一个订阅者，False 表示最后一个订阅者已离开"""
+        self._topic_listeners.append(listener)
+    
+    def _notify_topic(self, topic: str, active: bool):
+        for listener in self._topic_listeners:
+            listener(topic, active)
+    
+    @property
+    def topics(self) -> List[str]:
+        return list(self._topics)
+    
+    def add_topics(self, subscription: Subscription, topics: Iterable[str]):
+        for topic in topics:
+            is_new = topic not in self._topics
+            self._topics[topic].add(subscription)
+            subscription.topics.add(topic)
+            if is_new:
+                self._notify_topic(topic, True)
+    
+    def remove_topics(self, subscription: Subscription, topics: Iterable[str]):
+        for topic in topics:
+            subscribers = self._topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[topic]
+                    self._notify_topic(topic, False)
+            subscription.topics.discard(topic)
+    
+    def unsubscribe(self, subscription: Subscription):
+        """取消订阅（连接断开时调用）"""
+        self.remove_topics(subscription, list(subscription.topics))
+        self._subscriptions.discard(subscription)
+    
+    def has_subscribers(self, topic: str) -> bool:
+        return topic in self._topics
+    
+    def publish(self, topic: str, event: dict) -> int:
+        """
+        向主题发布事件（需在事件循环线程中调用）
+        
+        Returns:
+            收到事件的订阅者数
+        """
+        subscribers = self._topics.get(topic)
+        self.published += 1
+        if not subscribers:
+            return 0
+        for subscription in list(subscribers):
+            subscription.deliver(topic, event)
+        self.delivered += len(subscribers)
+        return len(subscribers)
+    
+    def get_stats(self) -> dict:
+        return {
+            "connections": len(self._subscriptions),
+            "topics": len(self._topics),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": sum(subscription.dropped for subscription in self._subscriptions)
+        }
+
+
+def user_topic(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def symbol_topic(symbol: str) -> str:
+    return f"symbol:{symbol.upper()}"
+
+
+# 全局事件总线
+event_bus = EventBus()
@@ -0,0 +1,184 @@
+"""
+跨进程事件转发
+
+推送事件（触发、行情）只在运行后台评估的领导者进程中产生，事件总线是进程内的。
+多 worker 部署时领导者在 EVENT_RELAY_SOCKET 上监听 Unix 套接字，其他 worker 作为客户端连接：
+客户端上报本进程有订阅者的主题，领导者为每个客户端登记一个订阅者，只把这些主题的事件
+转发过去，客户端再发布到本进程的事件总线。领导者判断"是否有订阅者"时因此也能看到其他进程的连接。
+
+消息为每行一个JSON：
+  客户端 -> 领导者: {"op": "subscribe" | "unsubscribe", "topics": [...]}
+  领导者 -> 客户端: {"topic": "...", "event": {...}}
+领导权转移时原连接断开，客户端按 LEADER_RETRY_INTERVAL 重连新的领导者（同一个套接字路径）。
+"""
+import asyncio
+import json
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+from app.core.config import settings
+from app.services.event_bus import EventBus, Subscription, event_bus
+from app.services.leader import LeaderElection, leader_election
+
+
+class RelaySubscription(Subscription):
+    """领导者进程中代表一个 worker 的订阅者，队列中保存 (主题, 事件)"""
+    
+    def deliver(self, topic: str, event: dict):
+        self.put((topic, event))
+
+
+class EventRelay:
+    """领导者到其他 worker 的事件转发"""
+    
+    def __init__(
+        self,
+        bus: Optional[EventBus] = None,
+        socket_path: Optional[str] = None,
+        retry_interval: Optional[float] = None,
+        queue_size: int = 1000,
+        election: Optional[LeaderElection] = None
+    ):
+        self.bus = bus or event_bus
+        self.election = election or leader_election
+        self.socket_path = Path(socket_path or settings.EVENT_RELAY_SOCKET)
+        self.retry_interval = retry_interval or settings.LEADER_RETRY_INTERVAL
+        self.queue_size = queue_size
+        
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._client_task: Optional[asyncio.Task] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._peers = set()
+        
+        # 运行统计
+        self.forwarded = 0
+        self.received = 0
+        
+        self.bus.add_topic_listener(self._on_topic_changed)
+    
+    @property
+    def is_connected(self) -> bool:
+        return self._writer is not None
+    
+    # ---- 领导者：接受其他 worker 的连接 ----
+    
+    async def start_serving(self):
+        """领导者进程开始监听（由 start_singleton_tasks 调用）"""
+        if self._server is not None:
+            return
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        # 只有持有领导者锁的进程会监听，残留的套接字文件来自已退出的领导者
+        self.socket_path.unlink(missing_ok=True)
+        self._server = await asyncio.start_unix_server(self._serve_peer, path=str(self.socket_path))
+        logger.info(f"✅ 推送事件转发已启动: {self.socket_path}")
+    
+    async def stop_serving(self):
+        if self._server is None:
+            return
+        self._server.close()
+        for writer in list(self._peers):
+            writer.close()
+        await self._server.wait_closed()
+        self._server = None
+        self.socket_path.unlink(missing_ok=True)
+    
+    async def _serve_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """一个 worker 的连接：按其上报的主题订阅，转发事件"""
+        subscription = self.bus.subscribe(subscription=RelaySubscription(self.queue_size))
+        self._peers.add(writer)
+        
+        async def forward():
+            while True:
+                topic, event = await subscription.queue.get()
+                writer.write(json.dumps({"topic": topic, "event": event}, ensure_ascii=False).encode() + b"\n")
+                await writer.drain()
+                self.forwarded += 1
+        
+        sender = asyncio.create_task(forward())
+        try:
+            while line := await reader.readline():
+                try:
+                    message = json.loads(line)
+                    topics = [topic for topic in message["topics"] if isinstance(topic, str)]
+                except (ValueError, KeyError, TypeError):
+                    logger.warning(f"忽略无效的转发订阅消息: {line[:100]!r}")
+                    continue
+                if message.get("op") == "subscribe":
+                    self.bus.add_topics(subscription, topics)
+                elif message.get("op") == "unsubscribe":
+                    self.bus.remove_topics(subscription, topics)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            sender.cancel()
+            self.bus.unsubscribe(subscription)
+            self._peers.discard(writer)
+            writer.close()
+    
+    # ---- 其他 worker：连接领导者 ----
+    
+    async def start(self):
+        """启动客户端（所有 worker 都启动，当前是领导者时不连接）"""
+        if self._client_task is None:
+            self._client_task = asyncio.create_task(self._follow(), name="event-relay")
+    
+    async def stop(self):
+        if self._client_task is not None:
+            self._client_task.cancel()
+            try:
+                await self._client_task
+            except asyncio.CancelledError:
+                pass
+            self._client_task = None
+        await self.stop_serving()
+    
+    async def _follow(self):
+        while True:
+            if self.election.is_leader:
+                await asyncio.sleep(self.retry_interval)
+                continue
+            try:
+                reader, writer = await asyncio.open_unix_connection(str(self.socket_path))
+            except OSError:
+                await asyncio.sleep(self.retry_interval)
+                continue
+            
+            logger.info("✅ 已连接领导者进程的推送事件转发")
+            self._writer = writer
+            self._send("subscribe", self.bus.topics)
+            try:
+                while line := await reader.readline():
+                    message = json.loads(line)
+                    self.bus.publish(message["topic"], message["event"])
+                    self.received += 1
+            except (ConnectionError, ValueError, KeyError) as e:
+                logger.warning(f"推送事件转发连接异常: {e}")
+            finally:
+                self._writer = None
+                writer.close()
+            logger.warning("领导者进程的推送事件转发已断开，稍后重连")
+            await asyncio.sleep(self.retry_interval)
+    
+    def _on_topic_changed(self, topic: str, active: bool):
+        self._send("subscribe" if active else "unsubscribe", [topic])
+    
+    def _send(self, op: str, topics):
+        """向领导者上报订阅变化（未连接时跳过，重连后会上报完整的主题列表）"""
+        if self._writer is None or not topics:
+            return
+        self._writer.write(json.dumps({"op": op, "topics": list(topics)}).encode() + b"\n")
+    
+    def get_stats(self) -> dict:
+        return {
+            "serving": self._server is not None,
+            "peers": len(self._peers),
+            "connected": self.is_connected,
+            "forwarded": self.forwarded,
+            "received": self.received
+        }
+
+
+# 全局事件转发
+event_relay = EventRelay()
@@ -0,0 +1,278 @@
+"""
+参数网格寻优
+
+在多只股票上扫描均线周期组合和阈值（例如 [3..60] 内所有三均线组合的缠绕阈值）。
+每个进程按股票缓存一次前缀和及全部周期的均线矩阵，所有网格点共享；
+"股票 × 网格分块" 作为任务分发到进程池，分块完成即返回部分结果，
+总耗时随CPU核数近似线性下降。
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.core.config import settings
+from app.models.stock_alert import IndicatorType, AlertCondition
+
+
+# 支持寻优的指标和条件（与 alert_rules.evaluate_signals 的语义一致）
+GRID_CONDITIONS = {
+    IndicatorType.MA_CONVERGENCE.value: (AlertCondition.CONVERGING.value, AlertCondition.DIVERGING.value),
+    IndicatorType.MA_PROXIMITY.value: (AlertCondition.NEAR.value, AlertCondition.WITHIN_RANGE.value),
+}
+
+# 每个进程缓存的股票均线矩阵数量
+_MA_CACHE_SIZE = 16
+_ma_cache: Dict[Tuple[str, int, float], np.ndarray] = {}
+
+
+@dataclass(frozen=True)
+class GridSpec:
+    """网格定义"""
+    indicator_type: str
+    condition: str
+    period_min: int
+    period_max: int
+    thresholds: Tuple[float, ...]
+    period_step: int = 1
+    periods_count: int = 3
+    horizon: int = 5
+    min_signals: int = 3
+    top_k: int = 10
+
+    def __post_init__(self):
+        conditions = GRID_CONDITIONS.get(self.indicator_type)
+        if conditions is None:
+            raise ValueError(f"不支持寻优的指标类型: {self.indicator_type}")
+        if self.condition not in conditions:
+            raise ValueError(f"{self.indicator_type} 不支持条件 {self.condition}")
+        if not 1 <= self.period_min <= self.period_max:
+            raise ValueError("周期范围无效")
+        if not self.thresholds:
+            raise ValueError("至少需要一个阈值")
+
+    @property
+    def periods(self) -> List[int]:
+        return list(range(self.period_min, self.period_max + 1, self.period_step))
+
+    def combos(self) -> np.ndarray:
+        """全部周期组合，形状 (组合数, 每组周期数)"""
+        if self.indicator_type == IndicatorType.MA_PROXIMITY:
+            return np.array(self.periods, dtype=np.int32).reshape(-1, 1)
+        combos = list(itertools.combinations(self.periods, self.periods_count))
+        return np.array(combos, dtype=np.int32).reshape(-1, self.periods_count)
+
+    @property
+    def size(self) -> int:
+        """每只股票的网格点数（按组合数公式计算，不生成组合）"""
+        n_periods = len(range(self.period_min, self.period_max + 1, self.period_step))
+        if self.indicator_type == IndicatorType.MA_PROXIMITY:
+            return n_periods * len(self.thresholds)
+        return math.comb(n_periods, self.periods_count) * len(self.thresholds)
+
+
+def _moving_averages(symbol: str, close: np.ndarray, period_max: int) -> np.ndarray:
+    """
+    全部周期的均线矩阵，第 p 行为 p 日均线（共享一次前缀和）
+    
+    同一进程处理同一股票的后续分块时直接复用。
+    """
+    key = (symbol, len(close), float(close[-1]))
+    cached = _ma_cache.get(key)
+    if cached is not None and len(cached) > period_max:
+        return cached
+    
+    n = len(close)
+    csum = np.concatenate(([0.0], np.cumsum(close)))
+    mas = np.full((period_max + 1, n), np.nan)
+    for period in range(1, min(period_max, n) + 1):
+        mas[period, period - 1:] = (csum[period:] - csum[:-period]) / period
+    
+    if len(_ma_cache) >= _MA_CACHE_SIZE:
+        _ma_cache.pop(next(iter(_ma_cache)))
+    _ma_cache[key] = mas
+    return mas
+
+
+def evaluate_chunk(symbol: str, close: np.ndarray, combos: np.ndarray, spec: GridSpec) -> Dict[str, Any]:
+    """
+    评估一个网格分块（在进程池中执行）
+    
+    Args:
+        symbol: 股票代码
+        close: 收盘价序列
+        combos: 本分块的周期组合
+        spec: 网格定义
+    
+    Returns:
+        分块统计和达到最少信号数的前 top_k 个结果
+    """
+    close = np.asarray(close, dtype=float)
+    mas = _moving_averages(symbol, close, spec.period_max)
+    selected = mas[combos]  # (C, k, n)
+    
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if spec.indicator_type == IndicatorType.MA_CONVERGENCE:
+            values = (selected.max(axis=1) - selected.min(axis=1)) / selected.mean(axis=1) * 100
+        else:
+            values = np.abs(close - selected[:, 0]) / selected[:, 0] * 100
+        
+        thresholds = np.asarray(spec.thresholds, dtype=float)[:, None, None]
+        if spec.condition == AlertCondition.WITHIN_RANGE:
+            thresholds = thresholds / 2
+        
+        signals = values[None] <= thresholds  # (T, C, n)
+        if spec.condition == AlertCondition.DIVERGING:
+            previous = np.concatenate((np.full(values.shape[:1] + (1,), np.nan), values[:, :-1]), axis=1)
+            signals = (previous[None] <= thresholds) & ~signals & ~np.isnan(values)[None]
+        
+        # 连续满足条件只算一次信号
+        onsets = signals.copy()
+        onsets[..., 1:] &= ~signals[..., :-1]
+        
+        # 信号后第 horizon 根K线的收益（百分比），超出序列末尾的信号不计收益
+        forward = np.zeros(len(close))
+        valid = np.zeros(len(close), dtype=bool)
+        if spec.horizon < len(close):
+            forward[:-spec.horizon] = (close[spec.horizon:] / close[:-spec.horizon] - 1) * 100
+            valid[:-spec.horizon] = True
+        
+        # 信号是稀疏的：只取出信号位置按 (阈值, 组合) 聚合，不把 (T, C, n) 布尔矩阵转成浮点
+        signal_count = np.count_nonzero(onsets, axis=-1)
+        t_index, c_index, bar_index = np.nonzero(onsets)
+        group = t_index * onsets.shape[1] + c_index
+        cells = signal_count.size
+        return_count = np.bincount(group, weights=valid[bar_index], minlength=cells).reshape(signal_count.shape)
+        return_sum = np.bincount(group, weights=forward[bar_index], minlength=cells).reshape(signal_count.shape)
+        wins = np.bincount(group, weights=forward[bar_index] > 0, minlength=cells).reshape(signal_count.shape)
+        mean_return = return_sum / return_count
+        win_rate = wins / return_count
+    
+    eligible = np.argwhere((signal_count >= spec.min_signals) & (return_count > 0))
+    scores = mean_return[eligible[:, 0], eligible[:, 1]]
+    best = eligible[np.argsort(-scores)[:spec.top_k]]
+    
+    return {
+        "symbol": symbol,
+        "evaluated": int(signal_count.size),
+        "best": [
+            {
+                "symbol": symbol,
+                "periods": combos[c].tolist(),
+                "threshold": float(spec.thresholds[t]),
+                "signals": int(signal_count[t, c]),
+                "mean_return": round(float(mean_return[t, c]), 4),
+                "win_rate": round(float(win_rate[t, c]), 4)
+            }
+            for t, c in best
+        ]
+    }
+
+
+class GridOptimizer:
+    """网格寻优执行器（进程池）"""
+    
+    def __init__(self, workers: Optional[int] = None, chunk_size: Optional[int] = None):
+        self.workers = workers or settings.OPTIMIZER_WORKERS or os.cpu_count() or 1
+        self.chunk_size = chunk_size or settings.OPTIMIZER_CHUNK_SIZE
+        self._executor: Optional[ProcessPoolExecutor] = None
+        
+        # 运行统计
+        self.runs = 0
+        self.points_evaluated = 0
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn 避免在已有事件循环和线程的进程中 fork
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"🧮 网格寻优进程池已启动 ({self.workers} 个进程)")
+        return self._executor
+    
+    def shutdown(self):
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+    
+    async def run(self, closes: Dict[str, np.ndarray], spec: GridSpec) -> AsyncIterator[Dict[str, Any]]:
+        """
+        执行寻优，逐个返回分块结果，最后返回汇总
+        
+        Args:
+            closes: 股票代码 -> 收盘价序列
+            spec: 网格定义
+        
+        Yields:
+            {"type": "progress", ...} 分块结果；最后一条为 {"type": "result", ...}
+        """
+        started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        
+        combos = spec.combos()
+        chunks = [combos[i:i + self.chunk_size] for i in range(0, len(combos), self.chunk_size)]
+        futures = [
+            loop.run_in_executor(executor, evaluate_chunk, symbol, close, chunk, spec)
+            for symbol, close in closes.items()
+            for chunk in chunks
+        ]
+        
+        self.runs += 1
+        best: List[Dict[str, Any]] = []
+        per_symbol: Dict[str, List[Dict[str, Any]]] = {symbol: [] for symbol in closes}
+        evaluated = 0
+        
+        try:
+            for done, future in enumerate(asyncio.as_completed(futures), start=1):
+                chunk = await future
+                evaluated += chunk["evaluated"]
+                self.points_evaluated += chunk["evaluated"]
+                
+                best = heapq.nlargest(spec.top_k, best + chunk["best"], key=lambda row: row["mean_return"])
+                symbol_best = per_symbol[chunk["symbol"]] + chunk["best"]
+                per_symbol[chunk["symbol"]] = heapq.nlargest(spec.top_k, symbol_best, key=lambda row: row["mean_return"])
+                
+                yield {
+                    "type": "progress",
+                    "done": done,
+                    "total": len(futures),
+                    "symbol": chunk["symbol"],
+                    "best": chunk["best"]
+                }
+        finally:
+            # 客户端中途断开时取消尚未开始的分块
+            for future in futures:
+                future.cancel()
+        
+        yield {
+            "type": "result",
+            "evaluated": evaluated,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3),
+            "best": best,
+            "per_symbol": per_symbol
+        }
+    
+    def get_stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "chunk_size": self.chunk_size,
+            "is_started": self._executor is not None,
+            "runs": self.runs,
+            "points_evaluated": self.points_evaluated
+        }
+
+
+# 全局网格寻优实例
+grid_optimizer = GridOptimizer()
@@ -0,0 +1,116 @@
+"""
+健康状态采样
+
+/health 原先在请求内调用 psutil.cpu_percent(interval=1) 并执行数据库计数查询，
+每次探测都在事件循环里阻塞一秒以上。采样器在后台线程中按 HEALTH_CHECK_INTERVAL
+定期刷新 CPU、内存、磁盘和数据库状态，/health 直接返回最近一次的快照。
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Optional
+
+import psutil
+from loguru import logger
+
+from app.core.config import settings
+from app.database.database import check_database_health, get_database_stats
+
+
+class HealthSampler:
+    """系统与数据库状态的后台采样器"""
+
+    def __init__(self, interval: Optional[float] = None, disk_path: str = "/"):
+        self.interval = interval or settings.HEALTH_CHECK_INTERVAL
+        self.disk_path = disk_path
+
+        self._task: Optional[asyncio.Task] = None
+        self._started = time.monotonic()
+        self.snapshot: Optional[dict] = None
+        self.sampled_at: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+
+    def sample_once(self) -> dict:
+        """
+        采集一次（阻塞调用，在线程中执行）
+
+        cpu_percent(interval=None) 返回距上次调用以来的平均占用，不会休眠；
+        两次采样间隔即为统计窗口。
+        """
+        started = time.perf_counter()
+
+        db_health = check_database_health()
+        db_stats = get_database_stats()
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+
+        snapshot = {
+            "status": "healthy" if db_health else "unhealthy",
+            "database": {
+                "status": "connected" if db_health else "disconnected",
+                **db_stats
+            },
+            "system": {
+                "cpu_percent": psutil.cpu_percent(interval=None),
+                "memory_percent": memory.percent,
+                "disk_percent": (disk.used / disk.total) * 100,
+                "uptime": time.monotonic() - self._started
+            }
+        }
+
+        self.snapshot = snapshot
+        self.sampled_at = datetime.now()
+        self.last_duration = time.perf_counter() - started
+        return snapshot
+
+    def get_snapshot(self) -> dict:
+        """最近一次采样结果（尚未完成首次采样时状态为 starting）"""
+        if self.snapshot is None:
+            return {"status": "starting"}
+        return {
+            **self.snapshot,
+            "sampled_at": self.sampled_at.isoformat(),
+            "sample_age": (datetime.now() - self.sampled_at).total_seconds()
+        }
+
+    async def start(self):
+        """启动后台采样，并同步完成首次采样"""
+        if self._task is not None and not self._task.done():
+            return
+        # 首次调用只建立 CPU 统计基线
+        psutil.cpu_percent(interval=None)
+        try:
+            await asyncio.to_thread(self.sample_once)
+        except Exception as e:
+            logger.error(f"健康状态采样失败: {e}")
+        self._task = asyncio.create_task(self._run(), name="health-sampler")
+
+    async def stop(self):
+        """停止后台采样"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.sample_once)
+            except Exception as e:
+                logger.error(f"健康状态采样失败: {e}")
+
+    def get_stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "running": self._task is not None and not self._task.done(),
+            "sampled_at": self.sampled_at.isoformat() if self.sampled_at else None,
+            "last_duration": self.last_duration
+        }
+
+
+# 全局健康状态采样器
+health_sampler = HealthSampler()
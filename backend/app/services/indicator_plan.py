@@ -0,0 +1,153 @@
+"""
+共享指标计算计划
+
+大量用户会在同一只热门股票上创建相同的模板规则（如 MA20突破）。
+计划把规则按 (股票, 指标类型, 周期, 参数) 去重，每个不同的指标序列
+每轮只计算一次，再按 (条件, 目标值, 阈值) 去重评估，最后分发给所有订阅的规则。
+评估成本随不同指标数量而不是预警数量增长。
+"""
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.models.stock_alert import IndicatorType
+from app.services.alert_rules import AlertRule, compute_indicator, evaluate_latest
+
+
+# 各指标未配置周期时的默认周期
+DEFAULT_PERIODS = {
+    IndicatorType.MA.value: 20,
+    IndicatorType.EMA.value: 12,
+    IndicatorType.RSI.value: 14,
+    IndicatorType.BOLL.value: 20,
+    IndicatorType.KDJ.value: 9,
+    IndicatorType.MA_PROXIMITY.value: 20,
+}
+
+# 各指标使用的参数及默认值（其他参数不影响计算结果，去重时忽略）
+DEFAULT_PARAMETERS = {
+    IndicatorType.MACD.value: {"fast": 12, "slow": 26, "signal": 9},
+    IndicatorType.BOLL.value: {"std_dev": 2.0},
+    IndicatorType.KDJ.value: {"m1": 3, "m2": 3},
+}
+
+DEFAULT_CONVERGENCE_PERIODS = (5, 10, 20)
+
+
+class IndicatorKey(NamedTuple):
+    """指标序列的唯一标识（已按默认值归一化）"""
+    symbol: str
+    indicator_type: str
+    period: Optional[int]
+    periods: Optional[Tuple[int, ...]]
+    parameters: Optional[Tuple[Tuple[str, float], ...]]
+
+    @classmethod
+    def from_rule(cls, rule: AlertRule) -> "IndicatorKey":
+        indicator_type = rule.indicator_type
+        
+        period = None
+        if indicator_type in DEFAULT_PERIODS:
+            period = rule.indicator_period or DEFAULT_PERIODS[indicator_type]
+        
+        periods = None
+        if indicator_type == IndicatorType.MA_CONVERGENCE.value:
+            # 缠绕程度与周期顺序无关
+            periods = tuple(sorted(set(rule.indicator_periods or DEFAULT_CONVERGENCE_PERIODS)))
+        
+        parameters = None
+        if indicator_type in DEFAULT_PARAMETERS:
+            merged = {**DEFAULT_PARAMETERS[indicator_type], **rule.parameters}
+            parameters = tuple(
+                (name, float(merged[name])) for name in sorted(DEFAULT_PARAMETERS[indicator_type])
+            )
+        
+        return cls(rule.symbol, indicator_type, period, periods, parameters)
+
+    def compute(self, bars: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """计算该指标序列"""
+        return compute_indicator(
+            bars,
+            self.indicator_type,
+            period=self.period,
+            periods=self.periods,
+            parameters=dict(self.parameters or ())
+        )
+
+
+class SignalKey(NamedTuple):
+    """同一指标上的评估条件（相同条件的规则共享评估结果）"""
+    condition: str
+    target_value: Optional[float]
+    threshold: Optional[float]
+
+    @classmethod
+    def from_rule(cls, rule: AlertRule) -> "SignalKey":
+        return cls(rule.condition, rule.target_value, rule.indicator_threshold)
+
+
+class IndicatorPlan:
+    """规则索引：股票 -> 指标 -> 条件 -> 订阅规则列表"""
+    
+    def __init__(self, rules: List[AlertRule]):
+        self.index: Dict[str, Dict[IndicatorKey, Dict[SignalKey, List[AlertRule]]]] = defaultdict(
+            lambda: defaultdict(lambda: defaultdict(list))
+        )
+        self.rule_count = 0
+        for rule in rules:
+            self.add(rule)
+    
+    def add(self, rule: AlertRule):
+        """加入一条规则"""
+        key = IndicatorKey.from_rule(rule)
+        self.index[rule.symbol][key][SignalKey.from_rule(rule)].append(rule)
+        self.rule_count += 1
+    
+    @property
+    def symbols(self) -> List[str]:
+        return sorted(self.index)
+    
+    def rules_for(self, symbol: str) -> List[AlertRule]:
+        """某只股票订阅的全部规则"""
+        return [
+            rule
+            for signals in self.index.get(symbol, {}).values()
+            for rules in signals.values()
+            for rule in rules
+        ]
+    
+    def evaluate(
+        self,
+        symbol: str,
+        bars: pd.DataFrame
+    ) -> List[Tuple[AlertRule, Dict[str, np.ndarray]]]:
+        """
+        评估某只股票的所有规则
+        
+        Returns:
+            触发的 (规则, 指标序列) 列表
+        """
+        close = bars["close"].to_numpy(dtype=float)
+        triggered = []
+        
+        for key, signals in self.index.get(symbol, {}).items():
+            series = key.compute(bars)
+            for rules in signals.values():
+                # 同组规则的评估语义完全一致，用第一条代表
+                if evaluate_latest(rules[0], close, series):
+                    triggered.extend((rule, series) for rule in rules)
+        
+        return triggered
+    
+    def get_stats(self) -> dict:
+        """计划规模统计"""
+        return {
+            "rules": self.rule_count,
+            "symbols": len(self.index),
+            "indicators": sum(len(keys) for keys in self.index.values()),
+            "signals": sum(
+                len(signals) for keys in self.index.values() for signals in keys.values()
+            )
+        }
@@ -0,0 +1,127 @@
+"""
+技术指标计算
+
+所有函数以 numpy 数组为输入输出，整段历史一次性向量化计算，
+数据不足的位置填充 NaN，便于实时评估和历史回测共用。
+"""
+from typing import Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    """简单移动平均（前缀和实现）"""
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    result = np.full(n, np.nan)
+    if period <= 0 or period > n:
+        return result
+    
+    csum = np.concatenate(([0.0], np.cumsum(values)))
+    result[period - 1:] = (csum[period:] - csum[:-period]) / period
+    return result
+
+
+def multi_sma(values: np.ndarray, periods: Sequence[int]) -> np.ndarray:
+    """共享一次前缀和计算多个周期的移动平均，返回 (len(periods), n) 矩阵"""
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    csum = np.concatenate(([0.0], np.cumsum(values)))
+    
+    result = np.full((len(periods), n), np.nan)
+    for row, period in enumerate(periods):
+        if 0 < period <= n:
+            result[row, period - 1:] = (csum[period:] - csum[:-period]) / period
+    return result
+
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    """指数移动平均"""
+    series = pd.Series(np.asarray(values, dtype=float))
+    result = series.ewm(span=period, adjust=False, min_periods=period).mean()
+    return result.to_numpy()
+
+
+def rsi(values: np.ndarray, period: int = 14) -> np.ndarray:
+    """相对强弱指数（Wilder 平滑）"""
+    series = pd.Series(np.asarray(values, dtype=float))
+    delta = series.diff()
+    gain = delta.clip(lower=0)
+    loss = -delta.clip(upper=0)
+    
+    avg_gain = gain.ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+    avg_loss = loss.ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+    
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        result = 100 - 100 / (1 + rs)
+    
+    # 只有上涨没有下跌时 RSI 为 100
+    result[(avg_loss == 0) & avg_gain.notna()] = 100.0
+    return result.to_numpy()
+
+
+def macd(
+    values: np.ndarray,
+    fast: int = 12,
+    slow: int = 26,
+    signal: int = 9
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """MACD，返回 (DIF, DEA, MACD柱)"""
+    dif = ema(values, fast) - ema(values, slow)
+    dea = pd.Series(dif).ewm(span=signal, adjust=False, min_periods=signal).mean().to_numpy()
+    return dif, dea, (dif - dea) * 2
+
+
+def bollinger(
+    values: np.ndarray,
+    period: int = 20,
+    std_dev: float = 2.0
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """布林带，返回 (上轨, 中轨, 下轨)"""
+    series = pd.Series(np.asarray(values, dtype=float))
+    middle = series.rolling(period).mean()
+    std = series.rolling(period).std(ddof=0)
+    return (
+        (middle + std_dev * std).to_numpy(),
+        middle.to_numpy(),
+        (middle - std_dev * std).to_numpy()
+    )
+
+
+def kdj(
+    high: np.ndarray,
+    low: np.ndarray,
+    close: np.ndarray,
+    n: int = 9,
+    m1: int = 3,
+    m2: int = 3
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """KDJ指标，返回 (K, D, J)"""
+    high = pd.Series(np.asarray(high, dtype=float))
+    low = pd.Series(np.asarray(low, dtype=float))
+    close = pd.Series(np.asarray(close, dtype=float))
+    
+    lowest = low.rolling(n).min()
+    highest = high.rolling(n).max()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsv = (close - lowest) / (highest - lowest) * 100
+    
+    k = rsv.ewm(alpha=1 / m1, adjust=False).mean()
+    d = k.ewm(alpha=1 / m2, adjust=False).mean()
+    j = 3 * k - 2 * d
+    return k.to_numpy(), d.to_numpy(), j.to_numpy()
+
+
+def ma_convergence(values: np.ndarray, periods: Sequence[int] = (5, 10, 20)) -> np.ndarray:
+    """均线缠绕程度：(最大均线 - 最小均线) / 均线平均值 * 100%"""
+    mas = multi_sma(values, periods)
+    return (mas.max(axis=0) - mas.min(axis=0)) / mas.mean(axis=0) * 100
+
+
+def ma_proximity(values: np.ndarray, period: int = 20) -> np.ndarray:
+    """股价与均线的距离百分比"""
+    values = np.asarray(values, dtype=float)
+    ma = sma(values, period)
+    return np.abs(values - ma) / ma * 100
@@ -0,0 +1,156 @@
+"""
+多进程领导者选举
+
+uvicorn 以多个 worker 进程运行时，lifespan 会在每个进程中执行。
+后台评估、清理等单例任务只能由一个进程运行，否则会重复拉取行情和重复触发。
+各 worker 竞争同一个文件上的排他咨询锁（flock）：持有锁的进程成为领导者；
+领导者进程退出（包括崩溃）时操作系统自动释放锁，其余 worker 每隔
+LEADER_RETRY_INTERVAL 秒重试，在一个检查周期内完成接管。
+所有 worker 都继续处理API请求。
+"""
+import asyncio
+import os
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+from loguru import logger
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows 只支持单 worker，直接视为领导者
+    fcntl = None
+
+
+class LeaderElection:
+    """基于文件锁的领导者选举"""
+    
+    def __init__(self, lock_path: Optional[str] = None, retry_interval: Optional[float] = None):
+        self.lock_path = Path(lock_path or settings.LEADER_LOCK_FILE)
+        self.retry_interval = retry_interval or min(
+            settings.LEADER_RETRY_INTERVAL, settings.MONITOR_CHECK_INTERVAL
+        )
+        self.is_leader = False
+        self._fd: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def try_acquire(self) -> bool:
+        """尝试获取领导权（非阻塞）"""
+        if self.is_leader:
+            return True
+        if fcntl is None:
+            self.is_leader = True
+            return True
+        
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        
+        # 记录领导者进程号，便于排查
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        self.is_leader = True
+        return True
+    
+    def release(self):
+        """释放领导权"""
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self.is_leader = False
+    
+    def leader_exists(self) -> bool:
+        """是否有进程（包括本进程）持有领导权"""
+        if self.is_leader:
+            return True
+        if fcntl is None or not self.lock_path.exists():
+            return False
+        
+        fd = os.open(self.lock_path, os.O_RDONLY)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            return False
+        except BlockingIOError:
+            return True
+        finally:
+            os.close(fd)
+    
+    def leader_pid(self) -> Optional[int]:
+        """当前领导者进程号"""
+        if self.is_leader:
+            return os.getpid()
+        try:
+            return int(self.lock_path.read_text().strip()) if self.leader_exists() else None
+        except (OSError, ValueError):
+            return None
+    
+    async def start(
+        self,
+        on_elected: Callable[[], Awaitable[None]],
+        on_failed: Optional[Callable[[], Awaitable[None]]] = None
+    ):
+        """
+        参与选举；当选后调用 on_elected 启动单例任务
+        
+        Args:
+            on_elected: 当选时执行的协程函数
+            on_failed: on_elected 抛出异常时执行的清理协程（停止已启动的部分任务）
+        """
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run(on_elected, on_failed), name="leader-election")
+    
+    async def stop(self):
+        """退出选举并释放领导权"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.release()
+    
+    async def _run(
+        self,
+        on_elected: Callable[[], Awaitable[None]],
+        on_failed: Optional[Callable[[], Awaitable[None]]]
+    ):
+        while True:
+            while not self.try_acquire():
+                await asyncio.sleep(self.retry_interval)
+            
+            logger.info(f"👑 进程 {os.getpid()} 成为领导者，启动后台任务")
+            try:
+                await on_elected()
+                return
+            except Exception as e:
+                # 启动失败时不能继续持有锁，否则没有进程运行后台任务，其他 worker 也无法接管
+                logger.error(f"领导者后台任务启动失败，释放领导权后重试: {e}")
+                if on_failed is not None:
+                    try:
+                        await on_failed()
+                    except Exception as cleanup_error:
+                        logger.error(f"停止领导者后台任务失败: {cleanup_error}")
+                self.release()
+                await asyncio.sleep(self.retry_interval)
+    
+    def get_status(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "is_leader": self.is_leader,
+            "leader_pid": self.leader_pid(),
+            "worker_processes": settings.WORKER_PROCESSES
+        }
+
+
+# 全局领导者选举实例
+leader_election = LeaderElection()
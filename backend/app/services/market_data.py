@@ -0,0 +1,89 @@
+"""
+行情数据获取
+
+后端评估预警所需的日K线数据，带重试和短期内存缓存。
+数据源调用是阻塞的，异步代码中应通过 asyncio.to_thread 调用。
+"""
+import time
+import threading
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+from loguru import logger
+
+from app.core.config import settings
+
+
+REQUIRED_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+class MarketDataProvider:
+    """行情数据提供者（Yahoo Finance）"""
+    
+    def __init__(self, period: str = "6mo", interval: str = "1d", cache_ttl: Optional[int] = None):
+        self.period = period
+        self.interval = interval
+        self.cache_ttl = cache_ttl if cache_ttl is not None else settings.MONITOR_CHECK_INTERVAL // 2
+        self._cache: Dict[Tuple[str, str], Tuple[float, pd.DataFrame]] = {}
+        self._lock = threading.Lock()
+        
+        # 缓存命中统计
+        self.hits = 0
+        self.misses = 0
+    
+    def get_history(self, symbol: str, period: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """
+        获取K线历史数据
+        
+        Args:
+            symbol: 股票代码
+            period: 历史长度（yfinance 格式），默认使用实例配置
+        
+        Returns:
+            包含 open/high/low/close/volume 列的DataFrame，失败返回None
+        """
+        period = period or self.period
+        key = (symbol, period)
+        
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached and time.time() - cached[0] < self.cache_ttl:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        
+        for attempt in range(1, settings.API_RETRY_ATTEMPTS + 1):
+            try:
+                df = self._fetch(symbol, period)
+                if df is not None and not df.empty:
+                    with self._lock:
+                        self._cache[key] = (time.time(), df)
+                    return df
+                logger.warning(f"行情数据为空: {symbol}")
+                return None
+            
+            except Exception as e:
+                logger.warning(f"获取行情失败 {symbol} (第{attempt}次): {e}")
+                if attempt < settings.API_RETRY_ATTEMPTS:
+                    time.sleep(settings.API_RETRY_DELAY * attempt)
+        
+        # 全部重试失败时退回过期缓存
+        return cached[1] if cached else None
+    
+    def _fetch(self, symbol: str, period: str) -> Optional[pd.DataFrame]:
+        """从 Yahoo Finance 拉取数据"""
+        import yfinance as yf
+        
+        df = yf.Ticker(symbol).history(
+            period=period,
+            interval=self.interval,
+            timeout=settings.YAHOO_FINANCE_TIMEOUT
+        )
+        if df is None or df.empty:
+            return None
+        
+        df.columns = [col.lower() for col in df.columns]
+        if not all(col in df.columns for col in REQUIRED_COLUMNS):
+            return None
+        
+        return df[REQUIRED_COLUMNS].dropna()
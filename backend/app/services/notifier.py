@@ -0,0 +1,307 @@
+"""
+预警通知分发
+
+评估器只把触发事件放入有界异步队列，不等待网络IO。
+聚合任务在短时间窗口内合并同一目的地（Webhook / 邮件收件人）的多条触发，
+再交给多个发送 worker 投递；HTTP 和 SMTP 连接复用，临时性失败按指数退避重试。
+用户没有登记邮箱，邮件是管理员通知：只发送 email_users 中用户的触发，收件人固定为 email_to。
+待发送批次的队列同样有界：目的地变慢时聚合任务等待，入口队列随之填满并丢弃新的触发，内存不会无限增长。
+"""
+import asyncio
+import smtplib
+import threading
+import time
+from collections import defaultdict
+from email.message import EmailMessage
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+from loguru import logger
+
+from app.core.config import settings
+from app.models.alert_trigger import AlertTrigger
+
+
+class SMTPConnection:
+    """可复用的SMTP连接（阻塞IO，在线程中调用）"""
+    
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = True,
+        timeout: float = 10.0
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._lock = threading.Lock()
+    
+    def _connect(self) -> smtplib.SMTP:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            smtp.starttls()
+        if self.username and self.password:
+            smtp.login(self.username, self.password)
+        return smtp
+    
+    def send(self, message: EmailMessage):
+        """发送邮件，连接失效时重连一次"""
+        with self._lock:
+            if self._smtp is not None:
+                try:
+                    self._smtp.noop()
+                except (smtplib.SMTPException, OSError):
+                    self._smtp = None
+            if self._smtp is None:
+                self._smtp = self._connect()
+            try:
+                self._smtp.send_message(message)
+            except (smtplib.SMTPServerDisconnected, OSError):
+                self._smtp = None
+                raise
+    
+    def close(self):
+        with self._lock:
+            if self._smtp is not None:
+                try:
+                    self._smtp.quit()
+                except Exception:
+                    pass
+                self._smtp = None
+
+
+# 可重试的 HTTP 4xx 状态码（其余 4xx 视为请求本身有误，重试不会成功）
+RETRYABLE_CLIENT_ERRORS = {408, 429}
+
+
+def is_permanent_failure(error: Exception) -> bool:
+    """发送失败是否为永久性错误（HTTP 4xx、SMTP 5xx），不再重试"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return 400 <= status < 500 and status not in RETRYABLE_CLIENT_ERRORS
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600
+    return False
+
+
+class NotificationDispatcher:
+    """通知分发器"""
+    
+    def __init__(
+        self,
+        webhook_url: Optional[str] = None,
+        smtp: Optional[SMTPConnection] = None,
+        email_from: Optional[str] = None,
+        email_to: Optional[List[str]] = None,
+        email_users: Optional[List[str]] = None,
+        queue_size: Optional[int] = None,
+        batch_queue_size: Optional[int] = None,
+        workers: Optional[int] = None,
+        coalesce_window: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        retry_delay: Optional[float] = None
+    ):
+        self.webhook_url = webhook_url
+        self.smtp = smtp
+        self.email_from = email_from
+        self.email_to = email_to or []
+        self.email_users = set(email_users or [])
+        self.queue_size = queue_size or settings.NOTIFICATION_QUEUE_SIZE
+        self.batch_queue_size = batch_queue_size or settings.NOTIFICATION_BATCH_QUEUE_SIZE
+        self.workers = workers or settings.NOTIFICATION_WORKERS
+        self.coalesce_window = coalesce_window if coalesce_window is not None else settings.NOTIFICATION_COALESCE_WINDOW
+        self.max_retries = max_retries if max_retries is not None else settings.NOTIFICATION_MAX_RETRIES
+        self.retry_delay = retry_delay if retry_delay is not None else settings.NOTIFICATION_RETRY_DELAY
+        
+        self._queue: Optional[asyncio.Queue] = None
+        self._batches: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._http: Optional[httpx.AsyncClient] = None
+        
+        # 运行统计
+        self.enqueued = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.failed = 0
+        self.payloads_sent = 0
+        self.last_latency: Optional[float] = None
+        self.max_latency = 0.0
+        self._latency_total = 0.0
+    
+    @classmethod
+    def from_settings(cls) -> "NotificationDispatcher":
+        """根据配置创建分发器"""
+        smtp = None
+        if settings.ENABLE_EMAIL_NOTIFICATIONS and settings.SMTP_HOST:
+            smtp = SMTPConnection(
+                host=settings.SMTP_HOST,
+                port=settings.SMTP_PORT,
+                username=settings.SMTP_USERNAME,
+                password=settings.SMTP_PASSWORD,
+                use_tls=settings.SMTP_USE_TLS
+            )
+        return cls(
+            webhook_url=settings.WEBHOOK_URL if settings.ENABLE_WEBHOOK_NOTIFICATIONS else None,
+            smtp=smtp,
+            email_from=settings.SMTP_FROM or settings.SMTP_USERNAME,
+            email_to=settings.NOTIFICATION_EMAIL_TO,
+            email_users=settings.NOTIFICATION_EMAIL_USER_IDS
+        )
+    
+    @property
+    def is_enabled(self) -> bool:
+        return bool(self.webhook_url or self._email_enabled)
+    
+    @property
+    def _email_enabled(self) -> bool:
+        return bool(self.smtp and self.email_to and self.email_users)
+    
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+    
+    async def start(self):
+        """启动聚合任务和发送 worker"""
+        if self.is_running or not self.is_enabled:
+            return
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._batches = asyncio.Queue(maxsize=self.batch_queue_size)
+        self._http = httpx.AsyncClient(timeout=10.0)
+        self._tasks = [asyncio.create_task(self._collect(), name="notification-collector")]
+        self._tasks.extend(
+            asyncio.create_task(self._deliver(), name=f"notification-worker-{i}")
+            for i in range(self.workers)
+        )
+        logger.info(f"✅ 通知分发已启动，{self.workers} 个发送 worker")
+    
+    async def stop(self):
+        """停止分发（放弃未发送的通知）"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+        if self.smtp is not None:
+            await asyncio.to_thread(self.smtp.close)
+    
+    def publish(self, trigger: dict):
+        """提交一条触发通知（非阻塞，队列满时丢弃）"""
+        if not self.is_running:
+            return
+        try:
+            self._queue.put_nowait((time.monotonic(), trigger))
+            self.enqueued += 1
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning(f"通知队列已满，丢弃触发通知: {trigger.get('alert_id')}")
+    
+    async def _collect(self):
+        """收到第一条后等待一个窗口，合并窗口内同一目的地的触发"""
+        while True:
+            items = [await self._queue.get()]
+            await asyncio.sleep(self.coalesce_window)
+            while not self._queue.empty():
+                items.append(self._queue.get_nowait())
+            
+            groups: Dict[Tuple[str, str], List[Tuple[float, dict]]] = defaultdict(list)
+            for item in items:
+                if self.webhook_url:
+                    groups[("webhook", self.webhook_url)].append(item)
+                if self._email_enabled and item[1].get("user_id") in self.email_users:
+                    for recipient in self.email_to:
+                        groups[("email", recipient)].append(item)
+            
+            # 批次队列满时在此等待（背压），期间新触发留在入口队列，超出容量由 publish 丢弃
+            for destination, batch in groups.items():
+                await self._batches.put((destination, batch))
+    
+    async def _deliver(self):
+        """发送 worker：带指数退避的重试"""
+        while True:
+            (channel, target), batch = await self._batches.get()
+            triggers = [AlertTrigger(**trigger).to_dict() for _, trigger in batch]
+            
+            for attempt in range(self.max_retries + 1):
+                try:
+                    if channel == "webhook":
+                        await self._send_webhook(target, triggers)
+                    else:
+                        await asyncio.to_thread(self._send_email, target, triggers)
+                    self._record_delivery(batch)
+                    break
+                except Exception as e:
+                    if attempt >= self.max_retries or is_permanent_failure(e):
+                        self.failed += len(batch)
+                        logger.error(f"通知发送失败 ({channel} {target}): {e}")
+                        break
+                    delay = self.retry_delay * (2 ** attempt)
+                    logger.warning(f"通知发送失败，{delay:.1f}s 后重试 ({channel} {target}): {e}")
+                    await asyncio.sleep(delay)
+    
+    async def _send_webhook(self, url: str, triggers: List[dict]):
+        """POST 合并后的触发列表"""
+        by_user: Dict[str, List[dict]] = defaultdict(list)
+        for trigger in triggers:
+            by_user[trigger["userId"]].append(trigger)
+        
+        response = await self._http.post(url, json={
+            "event": "alert_triggered",
+            "count": len(triggers),
+            "users": by_user
+        })
+        response.raise_for_status()
+    
+    def _send_email(self, recipient: str, triggers: List[dict]):
+        """发送合并后的预警邮件"""
+        message = EmailMessage()
+        message["From"] = self.email_from or "stock-monitor@localhost"
+        message["To"] = recipient
+        message["Subject"] = (
+            f"股票预警: {triggers[0]['message']}" if len(triggers) == 1
+            else f"股票预警: {len(triggers)} 条预警触发"
+        )
+        message.set_content("\n".join(
+            f"[{trigger['timestamp']}] {trigger['message']}" for trigger in triggers
+        ))
+        self.smtp.send(message)
+    
+    def _record_delivery(self, batch: List[Tuple[float, dict]]):
+        """记录投递延迟（从入队到发送成功）"""
+        now = time.monotonic()
+        self.payloads_sent += 1
+        for enqueued_at, _ in batch:
+            latency = now - enqueued_at
+            self.delivered += 1
+            self._latency_total += latency
+            self.last_latency = latency
+            self.max_latency = max(self.max_latency, latency)
+    
+    def get_stats(self) -> dict:
+        return {
+            "is_running": self.is_running,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "pending_batches": self._batches.qsize() if self._batches else 0,
+            "enqueued": self.enqueued,
+            "dropped": self.dropped,
+            "delivered": self.delivered,
+            "failed": self.failed,
+            "payloads_sent": self.payloads_sent,
+            "avg_latency": self._latency_total / self.delivered if self.delivered else None,
+            "last_latency": self.last_latency,
+            "max_latency": self.max_latency
+        }
+
+
+# 全局通知分发器
+notification_dispatcher = NotificationDispatcher.from_settings()
@@ -0,0 +1,136 @@
+"""
+价格阈值索引
+
+PRICE 类型的 ABOVE / BELOW / EQUAL 预警占规则的绝大多数。
+索引为每只股票、每种条件维护一个按目标价排序的列表，
+新价格通过二分查找在 O(log n + k) 内定位全部满足的阈值，无需逐条检查。
+"""
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.models.stock_alert import StockAlert, IndicatorType, AlertCondition
+from app.services.alert_rules import AlertRule, EQUAL_TOLERANCE
+
+
+INDEXED_CONDITIONS = (
+    AlertCondition.ABOVE.value,
+    AlertCondition.BELOW.value,
+    AlertCondition.EQUAL.value,
+)
+
+# 大于任意预警ID的哨兵，用于在 (价格, ID) 元组上做二分
+_MAX_ID = "\uffff"
+
+
+class PriceThresholdIndex:
+    """按股票和条件分组的有序价格阈值索引"""
+    
+    def __init__(self):
+        # symbol -> condition -> [(target_value, alert_id), ...]（有序）
+        self._books: Dict[str, Dict[str, List[Tuple[float, str]]]] = defaultdict(
+            lambda: {condition: [] for condition in INDEXED_CONDITIONS}
+        )
+        self._rules: Dict[str, AlertRule] = {}
+        self._lock = threading.RLock()
+        self.is_loaded = False
+    
+    @staticmethod
+    def accepts(rule: AlertRule) -> bool:
+        """规则是否由索引负责评估"""
+        return (
+            rule.indicator_type == IndicatorType.PRICE.value
+            and rule.condition in INDEXED_CONDITIONS
+            and rule.target_value is not None
+        )
+    
+    def load(self, rules: Iterable[AlertRule]):
+        """用全部活跃规则重建索引"""
+        with self._lock:
+            self._books.clear()
+            self._rules.clear()
+            for rule in rules:
+                self.add(rule)
+            self.is_loaded = True
+    
+    def add(self, rule: AlertRule):
+        """加入或替换一条规则（不符合条件的规则会被忽略）"""
+        with self._lock:
+            self.remove(rule.id)
+            if not self.accepts(rule):
+                return
+            insort(self._books[rule.symbol][rule.condition], (rule.target_value, rule.id))
+            self._rules[rule.id] = rule
+    
+    def remove(self, alert_id: str):
+        """移除一条规则"""
+        with self._lock:
+            rule = self._rules.pop(alert_id, None)
+            if rule is None:
+                return
+            book = self._books[rule.symbol][rule.condition]
+            entry = (rule.target_value, rule.id)
+            position = bisect_left(book, entry)
+            if position < len(book) and book[position] == entry:
+                del book[position]
+            if not any(self._books[rule.symbol].values()):
+                del self._books[rule.symbol]
+    
+    def sync_alert(self, alert: StockAlert):
+        """根据数据库中的最新状态更新索引（供API写操作调用）"""
+        if alert.is_active and not alert.is_deleted:
+            self.add(AlertRule.from_model(alert))
+        else:
+            self.remove(alert.id)
+    
+    def get(self, alert_id: str) -> Optional[AlertRule]:
+        return self._rules.get(alert_id)
+    
+    @property
+    def symbols(self) -> List[str]:
+        with self._lock:
+            return sorted(self._books)
+    
+    def __len__(self) -> int:
+        return len(self._rules)
+    
+    def match(self, symbol: str, price: float) -> List[AlertRule]:
+        """
+        当前价格满足的全部规则
+        
+        ABOVE: 目标价 < 价格；BELOW: 目标价 > 价格；EQUAL: 价格在目标价 ±0.1% 内
+        """
+        with self._lock:
+            books = self._books.get(symbol)
+            if not books:
+                return []
+            
+            above = books[AlertCondition.ABOVE.value]
+            below = books[AlertCondition.BELOW.value]
+            equal = books[AlertCondition.EQUAL.value]
+            
+            ids = [alert_id for _, alert_id in above[:bisect_left(above, (price,))]]
+            ids.extend(alert_id for _, alert_id in below[bisect_right(below, (price, _MAX_ID)):])
+            ids.extend(alert_id for _, alert_id in self._equal_range(equal, price, price))
+            return [self._rules[alert_id] for alert_id in ids]
+    
+    @staticmethod
+    def _equal_range(book: List[Tuple[float, str]], low: float, high: float) -> List[Tuple[float, str]]:
+        """目标价在 [low, high] 的误差范围内的条目"""
+        # |p - t| <= t * tol  <=>  p / (1 + tol) <= t <= p / (1 - tol)
+        start = bisect_left(book, (low / (1 + EQUAL_TOLERANCE),))
+        end = bisect_right(book, (high / (1 - EQUAL_TOLERANCE), _MAX_ID))
+        return book[start:end]
+    
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "rules": len(self._rules),
+                "symbols": len(self._books),
+                "is_loaded": self.is_loaded
+            }
+
+
+# 全局价格阈值索引
+price_index = PriceThresholdIndex()
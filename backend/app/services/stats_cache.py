@@ -0,0 +1,78 @@
+"""
+预警统计缓存
+
+仪表盘持续轮询统计接口，统计结果按用户缓存：
+预警增删改和触发记录写入时主动失效；TTL 兜底其他 worker 进程的写入，
+跨天时自动失效（今日触发数按自然日计算）。
+"""
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.core.config import settings
+
+
+class StatsCache:
+    """按用户缓存统计结果（线程安全）"""
+    
+    def __init__(self, ttl: Optional[float] = None, max_size: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else settings.STATS_CACHE_TTL
+        self.max_size = max_size or settings.CACHE_MAX_SIZE
+        self._entries: Dict[str, Tuple[float, date, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        
+        # 命中统计
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+    
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """获取缓存的统计结果，过期或跨天返回None"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > time.monotonic() and entry[1] == date.today():
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+            return None
+    
+    def set(self, user_id: str, value: Dict[str, Any]):
+        """写入统计结果"""
+        with self._lock:
+            if user_id not in self._entries and len(self._entries) >= self.max_size:
+                # 淘汰最早写入的条目
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[user_id] = (time.monotonic() + self.ttl, date.today(), value)
+    
+    def invalidate(self, user_id: str):
+        """预警或触发记录变化后失效该用户的缓存"""
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+    
+    def invalidate_many(self, user_ids: Iterable[str]):
+        with self._lock:
+            for user_id in set(user_ids):
+                if self._entries.pop(user_id, None) is not None:
+                    self.invalidations += 1
+    
+    def clear(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+    
+    def get_stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "invalidations": self.invalidations
+        }
+
+
+# 全局统计缓存实例
+stats_cache = StatsCache()
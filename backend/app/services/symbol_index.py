@@ -0,0 +1,113 @@
+"""
+股票代码前缀索引
+
+内存前缀树，覆盖所有预警涉及的股票代码（已知股票池），
+为输入框自动补全提供不访问数据库的前缀查询。
+索引为所有用户共享，只保存股票代码；预警名称是用户填写的内容，不进入索引。
+"""
+import threading
+from typing import Dict, Iterable, List
+
+from loguru import logger
+
+from app.database.database import get_session_factory
+from app.models.stock_alert import StockAlert, normalize_symbol
+
+
+class _TrieNode:
+    __slots__ = ("children", "is_symbol")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.is_symbol = False
+
+
+class SymbolTrie:
+    """股票代码前缀树（线程安全）"""
+    
+    def __init__(self):
+        self._root = _TrieNode()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.is_loaded = False
+    
+    def add(self, symbol: str):
+        """加入股票代码"""
+        symbol = normalize_symbol(symbol)
+        if not symbol:
+            return
+        
+        with self._lock:
+            node = self._root
+            for char in symbol:
+                node = node.children.setdefault(char, _TrieNode())
+            if not node.is_symbol:
+                node.is_symbol = True
+                self._size += 1
+    
+    def load(self, symbols: Iterable[str]):
+        """批量加载股票代码"""
+        for symbol in symbols:
+            self.add(symbol)
+        self.is_loaded = True
+    
+    def search(self, prefix: str, limit: int = 10) -> List[dict]:
+        """
+        前缀查询
+        
+        Args:
+            prefix: 代码前缀（不区分大小写）
+            limit: 最大返回数量
+        
+        Returns:
+            按代码字典序排列的 [{"symbol"}]
+        """
+        prefix = normalize_symbol(prefix) or ""
+        results: List[dict] = []
+        
+        with self._lock:
+            node = self._root
+            for char in prefix:
+                node = node.children.get(char)
+                if node is None:
+                    return results
+            
+            # 深度优先，子节点按字符排序，保证结果有序且找满 limit 个即停止
+            stack = [(prefix, node)]
+            while stack and len(results) < limit:
+                symbol, current = stack.pop()
+                if current.is_symbol:
+                    results.append({"symbol": symbol})
+                for char in sorted(current.children, reverse=True):
+                    stack.append((symbol + char, current.children[char]))
+        
+        return results
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def get_stats(self) -> dict:
+        return {"symbols": self._size, "is_loaded": self.is_loaded}
+
+
+def load_symbol_universe(trie: "SymbolTrie") -> int:
+    """从数据库加载所有未删除预警涉及的股票代码"""
+    session_factory = get_session_factory()
+    if session_factory is None:
+        return 0
+    
+    db = session_factory()
+    try:
+        rows = db.query(StockAlert.symbol_key).filter(
+            StockAlert.is_deleted == False
+        ).distinct().all()
+    finally:
+        db.close()
+    
+    trie.load(symbol for symbol, in rows)
+    logger.info(f"股票代码前缀索引已加载: {len(trie)} 个代码")
+    return len(trie)
+
+
+# 全局股票代码前缀索引
+symbol_trie = SymbolTrie()
@@ -0,0 +1,229 @@
+"""
+触发记录保留策略
+
+alert_triggers 会随时间无限增长，拖慢各处的 count() 统计。
+保留策略定期执行：
+  - 每个用户只保留最新的 MAX_TRIGGERS_HISTORY 条
+  - 可选：删除早于 TRIGGER_RETENTION_DAYS 天的记录
+  - 可选：删除前按月归档为 gzip 压缩的 JSON Lines 文件
+删除以小批次、各自独立的短事务执行，批次间短暂停顿，避免长时间锁库。
+"""
+import asyncio
+import gzip
+import json
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, delete, func, or_, select
+from loguru import logger
+
+from app.core.config import settings
+from app.database.database import get_session_factory
+from app.models.alert_trigger import AlertTrigger
+from app.services.stats_cache import stats_cache
+
+
+class TriggerRetention:
+    """触发记录清理器"""
+    
+    def __init__(
+        self,
+        max_per_user: Optional[int] = None,
+        retention_days: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        batch_pause: Optional[float] = None,
+        archive_dir: Optional[str] = None
+    ):
+        self.max_per_user = max_per_user or settings.MAX_TRIGGERS_HISTORY
+        self.retention_days = retention_days if retention_days is not None else settings.TRIGGER_RETENTION_DAYS
+        self.batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+        self.batch_pause = batch_pause if batch_pause is not None else settings.RETENTION_BATCH_PAUSE
+        self.archive_dir = archive_dir or (
+            settings.TRIGGER_ARCHIVE_DIR if settings.TRIGGER_ARCHIVE_ENABLED else None
+        )
+        
+        self._task: Optional[asyncio.Task] = None
+        self.last_run: Optional[datetime] = None
+        self.last_deleted = 0
+        self.last_duration: Optional[float] = None
+    
+    def run_once(self) -> int:
+        """
+        执行一次清理
+        
+        Returns:
+            删除的记录数
+        """
+        session_factory = get_session_factory()
+        if session_factory is None:
+            return 0
+        
+        started = time.perf_counter()
+        deleted = 0
+        
+        if self.retention_days:
+            cutoff = datetime.now() - timedelta(days=self.retention_days)
+            deleted += self._delete_in_batches(session_factory, AlertTrigger.timestamp < cutoff)
+        
+        for user_id in self._users_over_limit(session_factory):
+            boundary = self._user_boundary(session_factory, user_id)
+            if boundary is None:
+                continue
+            boundary_ts, boundary_id = boundary
+            deleted += self._delete_in_batches(
+                session_factory,
+                and_(
+                    AlertTrigger.user_id == user_id,
+                    or_(
+                        AlertTrigger.timestamp < boundary_ts,
+                        and_(AlertTrigger.timestamp == boundary_ts, AlertTrigger.id < boundary_id)
+                    )
+                )
+            )
+        
+        self.last_run = datetime.now()
+        self.last_deleted = deleted
+        self.last_duration = time.perf_counter() - started
+        if deleted:
+            # 按时间清理可能涉及任意用户，统一失效
+            stats_cache.clear()
+            logger.info(f"触发记录清理完成: 删除 {deleted} 条，耗时 {self.last_duration:.3f}s")
+        return deleted
+    
+    def _users_over_limit(self, session_factory) -> List[str]:
+        """触发记录超过上限的用户"""
+        db = session_factory()
+        try:
+            rows = db.execute(
+                select(AlertTrigger.user_id)
+                .group_by(AlertTrigger.user_id)
+                .having(func.count(AlertTrigger.id) > self.max_per_user)
+            ).all()
+            return [row[0] for row in rows]
+        finally:
+            db.close()
+    
+    def _user_boundary(self, session_factory, user_id: str):
+        """用户第 max_per_user 条（按时间倒序）记录的 (timestamp, id)，更早的记录将被删除"""
+        db = session_factory()
+        try:
+            return db.execute(
+                select(AlertTrigger.timestamp, AlertTrigger.id)
+                .where(AlertTrigger.user_id == user_id)
+                .order_by(AlertTrigger.timestamp.desc(), AlertTrigger.id.desc())
+                .offset(self.max_per_user - 1)
+                .limit(1)
+            ).first()
+        finally:
+            db.close()
+    
+    def _delete_in_batches(self, session_factory, condition) -> int:
+        """按批次删除满足条件的记录，每批一个短事务"""
+        deleted = 0
+        while True:
+            db = session_factory()
+            try:
+                if self.archive_dir:
+                    rows = db.execute(
+                        select(AlertTrigger)
+                        .where(condition)
+                        .order_by(AlertTrigger.timestamp)
+                        .limit(self.batch_size)
+                    ).scalars().all()
+                    ids = [row.id for row in rows]
+                    # 提交前只在内存中准备归档内容，删除提交成功后才写入文件，
+                    # 删除失败回滚时不会留下重复归档
+                    archive = self._prepare_archive(rows)
+                else:
+                    archive = {}
+                    ids = db.execute(
+                        select(AlertTrigger.id)
+                        .where(condition)
+                        .order_by(AlertTrigger.timestamp)
+                        .limit(self.batch_size)
+                    ).scalars().all()
+                
+                if not ids:
+                    return deleted
+                
+                db.execute(delete(AlertTrigger).where(AlertTrigger.id.in_(ids)))
+                db.commit()
+                deleted += len(ids)
+            
+            except Exception as e:
+                db.rollback()
+                logger.error(f"清理触发记录失败: {e}")
+                return deleted
+            finally:
+                db.close()
+            
+            if archive:
+                try:
+                    self._write_archive(archive)
+                except OSError as e:
+                    logger.error(f"写入触发记录归档失败（{len(ids)} 条已删除的记录未归档）: {e}")
+            
+            if len(ids) < self.batch_size:
+                return deleted
+            time.sleep(self.batch_pause)
+    
+    def _prepare_archive(self, rows: List[AlertTrigger]) -> Dict[str, bytes]:
+        """按月分组并压缩为 gzip 成员（月份 -> 压缩数据）"""
+        by_month = defaultdict(list)
+        for row in rows:
+            month = row.timestamp.strftime("%Y-%m") if row.timestamp else "unknown"
+            by_month[month].append(json.dumps(row.to_dict(), ensure_ascii=False))
+        
+        return {
+            month: gzip.compress(("\n".join(lines) + "\n").encode("utf-8"))
+            for month, lines in by_month.items()
+        }
+    
+    def _write_archive(self, archive: Dict[str, bytes]):
+        """按月追加写入压缩归档文件（gzip 多成员格式，可直接 zcat 读取）"""
+        archive_dir = Path(self.archive_dir)
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        
+        for month, data in archive.items():
+            with open(archive_dir / f"alert_triggers-{month}.jsonl.gz", "ab") as f:
+                f.write(data)
+    
+    async def start(self):
+        """启动定时清理任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="trigger-retention")
+    
+    async def stop(self):
+        """停止定时清理任务"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                logger.error(f"触发记录清理任务失败: {e}")
+            await asyncio.sleep(settings.RETENTION_INTERVAL_MINUTES * 60)
+    
+    def get_stats(self) -> dict:
+        return {
+            "max_per_user": self.max_per_user,
+            "retention_days": self.retention_days,
+            "archive_dir": self.archive_dir,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "last_deleted": self.last_deleted,
+            "last_duration": self.last_duration
+        }
+
+
+# 全局触发记录清理器
+trigger_retention = TriggerRetention()
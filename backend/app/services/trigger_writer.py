@@ -0,0 +1,264 @@
+"""
+预警触发批量写入
+
+行情跳空时可能有成百上千条预警同时触发。触发记录先写入内存缓冲，
+按 TRIGGER_FLUSH_INTERVAL 在一个事务内批量插入 AlertTrigger 并批量
+更新 StockAlert 的触发次数和最后触发时间。
+冷却期由内存中的最后触发时间表判断，不再逐条查询数据库。
+批量写入失败的记录放回缓冲区重试；同一记录失败 max_retries 次后改为逐条写入，
+单独写不进的记录（如约束冲突）记录日志后丢弃，不再拖累后续批次。
+"""
+import asyncio
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.exc import OperationalError
+from loguru import logger
+
+from app.core.config import settings
+from app.database.database import get_session_factory
+from app.models.stock_alert import StockAlert
+from app.models.alert_trigger import AlertTrigger
+from app.services.alert_versions import alert_versions
+from app.services.stats_cache import stats_cache
+
+
+class TriggerWriter:
+    """触发记录写缓冲"""
+    
+    def __init__(
+        self,
+        flush_interval: Optional[float] = None,
+        cooldown_minutes: Optional[int] = None,
+        max_buffer: int = 10000,
+        max_retries: Optional[int] = None
+    ):
+        self.flush_interval = flush_interval or settings.TRIGGER_FLUSH_INTERVAL
+        self.cooldown = timedelta(
+            minutes=cooldown_minutes if cooldown_minutes is not None else settings.ALERT_COOLDOWN_MINUTES
+        )
+        self.max_buffer = max_buffer
+        self.max_retries = max_retries if max_retries is not None else settings.TRIGGER_FLUSH_MAX_RETRIES
+        
+        self._buffer: List[dict] = []
+        self._last_fired: Dict[str, datetime] = {}
+        # 触发记录ID -> 批量写入失败次数（只在 flush 中访问）
+        self._attempts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        
+        # 运行统计
+        self.total_written = 0
+        self.total_suppressed = 0
+        self.total_dropped = 0
+        self.total_failed = 0
+        self.last_flush_size = 0
+        self.last_flush_duration: Optional[float] = None
+    
+    def in_cooldown(self, alert_id: str, now: datetime, last_triggered: Optional[datetime] = None) -> bool:
+        """
+        预警是否处于冷却期
+        
+        Args:
+            alert_id: 预警ID
+            now: 当前时间
+            last_triggered: 数据库中的最后触发时间，内存表没有记录时使用（如刚启动）
+        """
+        last = self._last_fired.get(alert_id, last_triggered)
+        return last is not None and now - last < self.cooldown
+    
+    def submit(self, trigger: dict, last_triggered: Optional[datetime] = None) -> bool:
+        """
+        提交一条触发记录
+        
+        Returns:
+            是否被接受（冷却期内或缓冲区已满时返回 False）
+        """
+        alert_id = trigger["alert_id"]
+        now = trigger["timestamp"]
+        
+        with self._lock:
+            if self.in_cooldown(alert_id, now, last_triggered):
+                self.total_suppressed += 1
+                return False
+            if len(self._buffer) >= self.max_buffer:
+                self.total_dropped += 1
+                logger.warning(f"触发写缓冲已满，丢弃触发记录: {alert_id}")
+                return False
+            self._last_fired[alert_id] = now
+            self._buffer.append(trigger)
+            return True
+    
+    def _prune_cooldowns(self, now: datetime):
+        """清理已过冷却期的记录，避免内存表无限增长"""
+        with self._lock:
+            self._last_fired = {
+                alert_id: fired
+                for alert_id, fired in self._last_fired.items()
+                if now - fired < self.cooldown
+            }
+    
+    @property
+    def pending(self) -> int:
+        return len(self._buffer)
+    
+    def flush(self) -> int:
+        """
+        将缓冲区写入数据库（单个事务）
+        
+        Returns:
+            写入的触发记录数
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+            
+            started = time.perf_counter()
+            session_factory = get_session_factory()
+            if session_factory is None:
+                self._requeue(batch)
+                return 0
+            
+            # 已达重试上限的记录逐条写入，其余仍按一个事务批量写入
+            exhausted = []
+            if self._attempts:
+                exhausted = [trigger for trigger in batch if self._attempts.get(trigger["id"], 0) >= self.max_retries]
+                batch = [trigger for trigger in batch if self._attempts.get(trigger["id"], 0) < self.max_retries]
+            written = self._write_one_by_one(session_factory, exhausted) if exhausted else []
+            
+            if batch:
+                try:
+                    self._write(session_factory, batch)
+                except Exception as e:
+                    logger.error(f"批量写入触发记录失败: {e}")
+                    for trigger in batch:
+                        self._attempts[trigger["id"]] = self._attempts.get(trigger["id"], 0) + 1
+                    self._requeue(batch)
+                else:
+                    for trigger in batch:
+                        self._attempts.pop(trigger["id"], None)
+                    written.extend(batch)
+            
+            if not written:
+                return 0
+            
+            stats_cache.invalidate_many(trigger["user_id"] for trigger in written)
+            alert_versions.bump_many(trigger["user_id"] for trigger in written)
+            self._prune_cooldowns(datetime.now())
+            self.total_written += len(written)
+            self.last_flush_size = len(written)
+            self.last_flush_duration = time.perf_counter() - started
+            logger.info(f"批量写入 {len(written)} 条触发记录，耗时 {self.last_flush_duration:.3f}s")
+            return len(written)
+    
+    def _write(self, session_factory, batch: List[dict]):
+        """在一个事务内插入触发记录并更新预警的触发次数（失败时回滚并抛出异常）"""
+        # 同一预警在一批中可能多次触发，合并为一次计数更新
+        counts = Counter(trigger["alert_id"] for trigger in batch)
+        latest: Dict[str, datetime] = {}
+        for trigger in batch:
+            alert_id = trigger["alert_id"]
+            latest[alert_id] = max(latest.get(alert_id, trigger["timestamp"]), trigger["timestamp"])
+        
+        db = session_factory()
+        try:
+            db.execute(insert(AlertTrigger), batch)
+            db.connection().execute(
+                update(StockAlert)
+                .where(StockAlert.id == bindparam("b_id"))
+                .values(
+                    trigger_count=StockAlert.trigger_count + bindparam("b_count"),
+                    last_triggered=bindparam("b_last")
+                ),
+                [
+                    {"b_id": alert_id, "b_count": count, "b_last": latest[alert_id]}
+                    for alert_id, count in counts.items()
+                ]
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+    
+    def _write_one_by_one(self, session_factory, triggers: List[dict]) -> List[dict]:
+        """
+        逐条写入多次批量失败的记录，丢弃单独也写不进的记录
+        
+        数据库不可用（OperationalError）不是某条记录的问题，剩余记录放回缓冲区下次再逐条写入。
+        
+        Returns:
+            写入成功的记录
+        """
+        written = []
+        for position, trigger in enumerate(triggers):
+            try:
+                self._write(session_factory, [trigger])
+            except OperationalError as e:
+                logger.error(f"逐条写入触发记录失败，数据库不可用: {e}")
+                self._requeue(triggers[position:])
+                break
+            except Exception as e:
+                self._attempts.pop(trigger["id"], None)
+                self.total_failed += 1
+                logger.error(f"丢弃无法写入的触发记录 {trigger['id']} (预警 {trigger['alert_id']}): {e}")
+            else:
+                self._attempts.pop(trigger["id"], None)
+                written.append(trigger)
+        return written
+    
+    def _requeue(self, batch: List[dict]):
+        """写入失败时放回缓冲区，下次重试"""
+        with self._lock:
+            room = max(0, self.max_buffer - len(self._buffer))
+            self.total_dropped += max(0, len(batch) - room)
+            for trigger in batch[room:]:
+                self._attempts.pop(trigger["id"], None)
+            self._buffer = batch[:room] + self._buffer
+    
+    async def start(self):
+        """启动定时刷新任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="trigger-writer")
+    
+    async def stop(self):
+        """停止定时刷新任务并写入剩余记录"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.error(f"触发写缓冲刷新失败: {e}")
+    
+    def get_stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "total_written": self.total_written,
+            "total_suppressed": self.total_suppressed,
+            "total_dropped": self.total_dropped,
+            "total_failed": self.total_failed,
+            "last_flush_size": self.last_flush_size,
+            "last_flush_duration": self.last_flush_duration
+        }
+
+
+# 全局触发写缓冲
+trigger_writer = TriggerWriter()
@@ -0,0 +1,145 @@
+"""
+预警列表分页基准
+
+生成百万级 stock_alerts 数据（SQLite 临时库），对比：
+  - 只有单列索引 vs 复合索引
+  - offset 分页 vs 游标分页（不同页深）
+  - 活跃预警加载 (user_id, is_active) 和按股票查找 (symbol, is_active)
+
+用法（在 backend 目录下）:
+    python -m benchmarks.alert_pagination --rows 1000000
+"""
+import argparse
+import random
+import statistics
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, desc, insert, select, text
+
+from app.core.pagination import encode_cursor, keyset_before
+from app.database.base import Base
+from app.models.stock_alert import StockAlert
+from app.models.alert_trigger import AlertTrigger  # noqa: F401  注册外键引用的表
+
+
+COMPOSITE_INDEXES = [index for index in StockAlert.__table__.indexes if len(index.columns) > 1]
+SYMBOLS = [f"SYM{i:04d}" for i in range(2000)]
+
+
+def populate(engine, rows: int, users: int, heavy_rows: int, batch: int = 50000):
+    """写入测试数据：heavy_rows 行属于同一个大用户，其余随机分布"""
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+    
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch):
+            chunk = []
+            for i in range(offset, min(offset + batch, rows)):
+                chunk.append({
+                    "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "symbol": rng.choice(SYMBOLS),
+                    "name": "bench",
+                    "indicator_type": "PRICE",
+                    "condition": "ABOVE",
+                    "target_value": 100,
+                    "is_active": rng.random() < 0.7,
+                    "trigger_count": 0,
+                    "user_id": "heavy" if i < heavy_rows else f"user{rng.randrange(users)}",
+                    "priority": 1,
+                    "is_deleted": rng.random() < 0.05,
+                    "created_at": start + timedelta(seconds=i * 30 + rng.randrange(30)),
+                    "updated_at": start
+                })
+            conn.execute(insert(StockAlert), chunk)
+
+
+def timed(engine, statement, repeat: int) -> float:
+    """执行 repeat 次，返回中位数耗时(毫秒)"""
+    durations = []
+    with engine.connect() as conn:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            conn.execute(statement).fetchall()
+            durations.append((time.perf_counter() - started) * 1000)
+    return statistics.median(durations)
+
+
+def query_plan(engine, statement) -> str:
+    compiled = statement.compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+    return " | ".join(row[-1] for row in rows)
+
+
+def listing(user_id: str, page_size: int):
+    return select(StockAlert.id, StockAlert.symbol, StockAlert.created_at).where(
+        StockAlert.user_id == user_id,
+        StockAlert.is_deleted == False
+    ).order_by(desc(StockAlert.created_at), desc(StockAlert.id)).limit(page_size)
+
+
+def cursor_at(engine, user_id: str, depth: int) -> str:
+    """定位到第 depth 行之后的游标（只用于构造测试参数，不计时）"""
+    with engine.connect() as conn:
+        row = conn.execute(listing(user_id, 1).offset(depth - 1)).first()
+    return encode_cursor(row.created_at, row.id)
+
+
+def run_suite(engine, label: str, depths, page_size: int, repeat: int):
+    print(f"\n== {label} ==")
+    for depth in depths:
+        offset_stmt = listing("heavy", page_size).offset(depth)
+        print(f"offset  depth={depth:>7}: {timed(engine, offset_stmt, repeat):8.2f} ms  [{query_plan(engine, offset_stmt)}]")
+        if depth:
+            cursor = cursor_at(engine, "heavy", depth)
+            keyset_stmt = listing("heavy", page_size).where(
+                keyset_before(StockAlert.created_at, StockAlert.id, cursor)
+            )
+            print(f"cursor  depth={depth:>7}: {timed(engine, keyset_stmt, repeat):8.2f} ms  [{query_plan(engine, keyset_stmt)}]")
+    
+    active_stmt = select(StockAlert.id).where(StockAlert.user_id == "user1", StockAlert.is_active == True)
+    print(f"user active alerts     : {timed(engine, active_stmt, repeat):8.2f} ms  [{query_plan(engine, active_stmt)}]")
+    symbol_stmt = select(StockAlert.id).where(StockAlert.symbol == "SYM0001", StockAlert.is_active == True)
+    print(f"symbol active alerts   : {timed(engine, symbol_stmt, repeat):8.2f} ms  [{query_plan(engine, symbol_stmt)}]")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预警列表分页基准")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="预警总行数")
+    parser.add_argument("--users", type=int, default=10000, help="普通用户数")
+    parser.add_argument("--heavy-rows", type=int, default=200_000, help="大用户的预警行数")
+    parser.add_argument("--page-size", type=int, default=100, help="每页行数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个查询重复次数")
+    parser.add_argument("--db", type=str, default=None, help="SQLite文件路径（默认临时文件）")
+    args = parser.parse_args()
+    
+    db_path = Path(args.db or Path(tempfile.mkdtemp()) / "bench_alerts.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+    
+    if not db_path.exists() or db_path.stat().st_size == 0:
+        Base.metadata.create_all(engine)
+        started = time.perf_counter()
+        populate(engine, args.rows, args.users, args.heavy_rows)
+        print(f"写入 {args.rows} 行，耗时 {time.perf_counter() - started:.1f}s ({db_path})")
+    
+    depths = [0, 1000, 10000, min(100000, args.heavy_rows - args.page_size)]
+    
+    for index in COMPOSITE_INDEXES:
+        index.drop(engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    run_suite(engine, "单列索引", depths, args.page_size, args.repeat)
+    
+    for index in COMPOSITE_INDEXES:
+        index.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    run_suite(engine, "复合索引", depths, args.page_size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+预警列表响应序列化基准
+
+对比两条路径的逐行开销：
+  - 原路径：to_dict() -> StockAlertResponse(**dict) 校验 -> 返回模型列表，
+    FastAPI 再把模型转回字典、按 response_model 校验一遍、序列化后 json.dumps 输出
+  - 快速路径：to_dict() -> FastJSONResponse 一次性序列化（orjson / pydantic-core）
+
+分别测量纯序列化阶段和经过完整 FastAPI 路由的端到端耗时，并校验两者输出的JSON一致。
+
+用法（在 backend 目录下）:
+    python -m benchmarks.alert_serialization --rows 1000 --repeat 50
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import TypeAdapter
+from pydantic_core import to_json
+
+from app.core import responses
+from app.core.responses import FastJSONResponse, dumps_json
+from app.models.stock_alert import StockAlert, StockAlertResponse
+
+
+def make_alerts(rows: int) -> List[StockAlert]:
+    """生成未入库的预警行（与数据库读出的行结构相同）"""
+    rng = random.Random(42)
+    now = datetime(2024, 6, 1, 9, 30)
+    shapes = [
+        {"indicator_type": "PRICE", "condition": "ABOVE", "target_value": 150.5},
+        {"indicator_type": "MA", "indicator_period": 20, "condition": "CROSS_BELOW"},
+        {"indicator_type": "MA_CONVERGENCE", "indicator_periods": [5, 10, 20],
+         "indicator_threshold": 2.0, "condition": "CONVERGING"},
+        {"indicator_type": "RSI", "indicator_period": 14, "condition": "ABOVE", "target_value": 70.0},
+    ]
+    alerts = []
+    for i in range(rows):
+        alerts.append(StockAlert(
+            id=str(uuid.uuid4()),
+            symbol=rng.choice(["AAPL", "TSLA", "IONQ", "MSFT", "NVDA"]),
+            name="Benchmark Inc",
+            is_active=rng.random() < 0.8,
+            trigger_count=rng.randint(0, 50),
+            last_triggered=now - timedelta(minutes=rng.randint(0, 10_000)) if i % 3 else None,
+            created_at=now - timedelta(seconds=i),
+            description="基准测试预警规则",
+            priority=rng.randint(1, 5),
+            tags=["bench", "watchlist"],
+            **shapes[i % len(shapes)]
+        ))
+    return alerts
+
+
+# 与 FastAPI serialize_response 对 response_model=List[StockAlertResponse] 的处理一致：
+# 模型转字典、再校验、按 JSON 模式导出，最后 JSONResponse 用 json.dumps 编码
+_response_adapter = TypeAdapter(List[StockAlertResponse])
+
+
+def legacy_render(alerts: List[StockAlert]) -> bytes:
+    models = [StockAlertResponse(**alert.to_dict()) for alert in alerts]
+    validated = _response_adapter.validate_python([model.model_dump() for model in models])
+    content = _response_adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_render(alerts: List[StockAlert]) -> bytes:
+    return dumps_json([alert.to_dict() for alert in alerts])
+
+
+def to_json_render(alerts: List[StockAlert]) -> bytes:
+    return to_json([alert.to_dict() for alert in alerts])
+
+
+def timed(func, repeat: int) -> float:
+    """多次执行取中位数（毫秒）"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def build_app(alerts: List[StockAlert]) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/legacy", response_model=List[StockAlertResponse])
+    async def legacy():
+        return [StockAlertResponse(**alert.to_dict()) for alert in alerts]
+
+    @app.get("/fast", response_model=List[StockAlertResponse])
+    async def fast():
+        return FastJSONResponse([alert.to_dict() for alert in alerts])
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预警列表响应序列化基准")
+    parser.add_argument("--rows", type=int, default=1000, help="每次响应的预警行数")
+    parser.add_argument("--repeat", type=int, default=50, help="重复次数（取中位数）")
+    args = parser.parse_args()
+
+    alerts = make_alerts(args.rows)
+    print(f"行数: {args.rows}  JSON后端: {'orjson' if responses.orjson is not None else 'pydantic-core'}")
+
+    print("\n[序列化阶段]")
+    stages = [
+        ("原路径（三次处理）", lambda: legacy_render(alerts)),
+        ("快速路径", lambda: fast_render(alerts)),
+        ("快速路径（pydantic-core）", lambda: to_json_render(alerts)),
+    ]
+    baseline = None
+    for label, func in stages:
+        elapsed = timed(func, args.repeat)
+        baseline = baseline or elapsed
+        per_row = elapsed * 1000 / args.rows
+        print(f"  {label:<24} {elapsed:8.2f} ms  {per_row:6.2f} µs/行  x{baseline / elapsed:.1f}")
+
+    print("\n[端到端 FastAPI 路由]")
+    with TestClient(build_app(alerts)) as client:
+        legacy_body = client.get("/legacy").json()
+        fast_body = client.get("/fast").json()
+        assert legacy_body == fast_body, "两条路径输出不一致"
+        baseline = None
+        for path in ("/legacy", "/fast"):
+            elapsed = timed(lambda: client.get(path), args.repeat)
+            baseline = baseline or elapsed
+            per_row = elapsed * 1000 / args.rows
+            print(f"  GET {path:<20} {elapsed:8.2f} ms  {per_row:6.2f} µs/行  x{baseline / elapsed:.1f}")
+    print("  输出一致: ✓")
+
+
+if __name__ == "__main__":
+    main()
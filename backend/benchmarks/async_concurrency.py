@@ -0,0 +1,120 @@
+"""
+同步 / 异步数据库会话并发基准
+
+同时发起多个慢查询请求，并在期间持续探测一个不访问数据库的接口：
+  - 同步会话：async 路由中的阻塞查询占住事件循环，请求排队串行，探测延迟≈慢查询总时长
+  - 异步会话：等待数据库时事件循环继续调度，探测请求立即返回
+
+用法（在 backend 目录下）:
+    python -m benchmarks.async_concurrency --rows 300000 --requests 8
+"""
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database.base import Base, get_db, get_async_read_db
+from app.database.database import db_manager
+from benchmarks.alert_pagination import populate
+
+
+# 无法走索引的慢查询
+SLOW_QUERY = text("SELECT COUNT(*) FROM stock_alerts WHERE name LIKE '%zz%' OR description LIKE '%zz%'")
+
+app = FastAPI()
+
+
+@app.get("/sync/slow")
+async def sync_slow(db: Session = Depends(get_db)):
+    return {"count": db.execute(SLOW_QUERY).scalar()}
+
+
+@app.get("/async/slow")
+async def async_slow(db: AsyncSession = Depends(get_async_read_db)):
+    return {"count": (await db.execute(SLOW_QUERY)).scalar()}
+
+
+@app.get("/ping")
+async def ping():
+    return {}
+
+
+async def run_scenario(client: httpx.AsyncClient, path: str, requests: int, probe_interval: float) -> dict:
+    """并发发起 requests 个慢请求，同时每隔 probe_interval 秒探测一次 /ping"""
+    probe_latencies = []
+    
+    async def probe(stop: asyncio.Event):
+        # 从计划发出时刻计时：事件循环被阻塞时 sleep 超时的部分也计入延迟
+        scheduled = time.perf_counter()
+        while not stop.is_set():
+            await client.get("/ping")
+            probe_latencies.append((time.perf_counter() - scheduled) * 1000)
+            scheduled = time.perf_counter() + probe_interval
+            await asyncio.sleep(probe_interval)
+    
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(stop))
+    await asyncio.sleep(probe_interval)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(client.get(path) for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    
+    stop.set()
+    await prober
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "probe_p50_ms": round(statistics.median(probe_latencies), 2),
+        "probe_max_ms": round(max(probe_latencies), 2),
+        "probes": len(probe_latencies)
+    }
+
+
+async def main_async(args):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # 预热，并测量单个慢查询耗时
+        started = time.perf_counter()
+        await client.get("/async/slow")
+        print(f"单个慢查询约 {(time.perf_counter() - started) * 1000:.0f} ms，并发 {args.requests} 个请求")
+        
+        for label, path in (("同步会话", "/sync/slow"), ("异步会话", "/async/slow")):
+            result = await run_scenario(client, path, args.requests, args.probe_interval)
+            print(
+                f"{label}: 总耗时 {result['elapsed_s']}s, /ping 延迟 p50 {result['probe_p50_ms']} ms, "
+                f"最大 {result['probe_max_ms']} ms ({result['probes']} 次探测)"
+            )
+    
+    await db_manager.close_async()
+    db_manager.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同步/异步数据库会话并发基准")
+    parser.add_argument("--rows", type=int, default=300_000, help="预警行数")
+    parser.add_argument("--requests", type=int, default=8, help="并发慢请求数")
+    parser.add_argument("--probe-interval", type=float, default=0.01, help="探测间隔(秒)")
+    parser.add_argument("--db", type=str, default=None, help="SQLite文件路径（默认临时文件）")
+    args = parser.parse_args()
+    
+    db_path = Path(args.db or Path(tempfile.mkdtemp()) / "bench_async.db")
+    if not db_path.exists() or db_path.stat().st_size == 0:
+        engine = create_engine(f"sqlite:///{db_path}")
+        Base.metadata.create_all(engine)
+        populate(engine, args.rows, users=1000, heavy_rows=0)
+        engine.dispose()
+    
+    db_manager.initialize(db_type="sqlite", sqlite_path=str(db_path))
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+触发历史分页基准
+
+生成 alert_triggers 数据（SQLite 临时库），其中一个大用户有 --heavy-rows 条触发记录，对比：
+  - 只有单列索引 vs 复合索引
+  - offset 分页 vs 游标分页（不同页深）
+  - 未读列表和全部标记已读（单条 UPDATE）
+
+用法（在 backend 目录下）:
+    python -m benchmarks.trigger_pagination --heavy-rows 100000
+"""
+import argparse
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from sqlalchemy import create_engine, desc, insert, select, text, update
+
+from app.core.pagination import encode_cursor, keyset_before
+from app.database.base import Base
+from app.models.stock_alert import StockAlert  # noqa: F401  注册外键引用的表
+from app.models.alert_trigger import AlertTrigger
+
+from benchmarks.alert_pagination import query_plan, timed
+
+
+COMPOSITE_INDEXES = [index for index in AlertTrigger.__table__.indexes if len(index.columns) > 1]
+
+
+def populate(engine, rows: int, users: int, heavy_rows: int, batch: int = 50000):
+    """写入测试数据：heavy_rows 行属于同一个大用户，其余随机分布；约10%未读"""
+    rng = random.Random(42)
+    start = datetime(2020, 1, 1)
+
+    with engine.begin() as conn:
+        for offset in range(0, rows, batch):
+            chunk = []
+            for i in range(offset, min(offset + batch, rows)):
+                chunk.append({
+                    "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "alert_id": "bench",
+                    "symbol": "SYM0001",
+                    "current_price": 100,
+                    "condition": "ABOVE",
+                    "message": "bench",
+                    "user_id": "heavy" if i % (rows // heavy_rows) == 0 else f"user{rng.randrange(users)}",
+                    "is_read": rng.random() >= 0.1,
+                    "severity": 1,
+                    "timestamp": start + timedelta(seconds=i * 10, microseconds=rng.randrange(1_000_000))
+                })
+            conn.execute(insert(AlertTrigger), chunk)
+
+
+def listing(user_id: str, page_size: int):
+    return select(AlertTrigger).where(
+        AlertTrigger.user_id == user_id
+    ).order_by(desc(AlertTrigger.timestamp), desc(AlertTrigger.id)).limit(page_size)
+
+
+def cursor_at(engine, user_id: str, depth: int) -> str:
+    """定位到第 depth 行之后的游标（只用于构造测试参数，不计时）"""
+    with engine.connect() as conn:
+        row = conn.execute(listing(user_id, 1).offset(depth - 1)).first()
+    return encode_cursor(row.timestamp, row.id)
+
+
+def run_suite(engine, label: str, depths, page_size: int, repeat: int):
+    print(f"\n== {label} ==")
+    for depth in depths:
+        offset_stmt = listing("heavy", page_size).offset(depth)
+        print(f"offset  depth={depth:>7}: {timed(engine, offset_stmt, repeat):8.2f} ms  [{query_plan(engine, offset_stmt)}]")
+        if depth:
+            cursor = cursor_at(engine, "heavy", depth)
+            keyset_stmt = listing("heavy", page_size).where(
+                keyset_before(AlertTrigger.timestamp, AlertTrigger.id, cursor)
+            )
+            print(f"cursor  depth={depth:>7}: {timed(engine, keyset_stmt, repeat):8.2f} ms  [{query_plan(engine, keyset_stmt)}]")
+
+    unread_stmt = listing("heavy", page_size).where(AlertTrigger.is_read == False)
+    print(f"unread first page      : {timed(engine, unread_stmt, repeat):8.2f} ms  [{query_plan(engine, unread_stmt)}]")
+
+
+def mark_all_read(engine, user_id: str) -> float:
+    """全部标记已读后回滚，返回耗时(毫秒)"""
+    with engine.connect() as conn:
+        with conn.begin() as transaction:
+            started = time.perf_counter()
+            conn.execute(
+                update(AlertTrigger)
+                .where(AlertTrigger.user_id == user_id, AlertTrigger.is_read == False)
+                .values(is_read=True)
+            )
+            elapsed = (time.perf_counter() - started) * 1000
+            transaction.rollback()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="触发历史分页基准")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="触发记录总行数")
+    parser.add_argument("--users", type=int, default=10000, help="普通用户数")
+    parser.add_argument("--heavy-rows", type=int, default=100_000, help="大用户的触发记录行数")
+    parser.add_argument("--page-size", type=int, default=50, help="每页行数")
+    parser.add_argument("--repeat", type=int, default=5, help="每个查询重复次数")
+    parser.add_argument("--db", type=str, default=None, help="SQLite文件路径（默认临时文件）")
+    args = parser.parse_args()
+
+    db_path = Path(args.db or Path(tempfile.mkdtemp()) / "bench_triggers.db")
+    engine = create_engine(f"sqlite:///{db_path}")
+
+    if not db_path.exists() or db_path.stat().st_size == 0:
+        Base.metadata.create_all(engine)
+        started = time.perf_counter()
+        populate(engine, args.rows, args.users, args.heavy_rows)
+        print(f"写入 {args.rows} 行，耗时 {time.perf_counter() - started:.1f}s ({db_path})")
+
+    depths = [0, 1000, 10000, args.heavy_rows - args.page_size]
+
+    for index in COMPOSITE_INDEXES:
+        index.drop(engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    run_suite(engine, "单列索引", depths, args.page_size, args.repeat)
+    print(f"mark all read          : {mark_all_read(engine, 'heavy'):8.2f} ms")
+
+    for index in COMPOSITE_INDEXES:
+        index.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    run_suite(engine, "复合索引", depths, args.page_size, args.repeat)
+    print(f"mark all read          : {mark_all_read(engine, 'heavy'):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
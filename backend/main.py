@@ -2,6 +2,7 @@
 股票监控系统后端主应用
 """
 import sys
+import math
 import asyncio
 from contextlib import asynccontextmanager
 from pathlib import Path
@@ -9,9 +10,10 @@ from pathlib import Path
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.middleware.base import BaseHTTPMiddleware
 from loguru import logger
 import uvicorn
 
@@ -19,8 +21,58 @@ import uvicorn
 sys.path.append(str(Path(__file__).parent))
 
 from app.core.config import settings, ensure_directories
-from app.database.database import init_database, close_database, get_database_stats, check_database_health
-from app.api.v1 import alerts
+from app.core.metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    metrics,
+    http_requests_total,
+    http_request_duration_seconds,
+    http_requests_in_progress
+)
+from app.core.rate_limit import rate_limiter
+from app.database.database import (
+    READ_YOUR_WRITES_COOKIE,
+    db_manager,
+    init_database,
+    close_database,
+    close_async_database,
+    check_database_health,
+    request_read_state
+)
+from app.api.v1 import alerts, backtest, monitor, stream, triggers
+from app.services.alert_monitor import alert_monitor
+from app.services.alert_versions import alert_versions
+from app.services.trigger_retention import trigger_retention
+from app.services.notifier import notification_dispatcher
+from app.services.event_bus import event_bus
+from app.services.event_relay import event_relay
+from app.services.leader import leader_election
+from app.services.backtest import history_provider
+from app.services.grid_search import grid_optimizer
+from app.services.health_sampler import health_sampler
+from app.services.stats_cache import stats_cache
+from app.services.symbol_index import symbol_trie, load_symbol_universe
+
+
+async def start_singleton_tasks():
+    """启动只能在一个进程中运行的后台任务（由当选的领导者进程调用）"""
+    # 启动后台预警监控
+    if settings.MONITOR_ENABLED:
+        await alert_monitor.start()
+    
+    # 启动触发记录定期清理
+    if settings.TRIGGER_RETENTION_ENABLED:
+        await trigger_retention.start()
+    
+    # 向其他 worker 转发推送事件
+    if settings.WORKER_PROCESSES > 1:
+        await event_relay.start_serving()
+
+
+async def stop_singleton_tasks():
+    """停止领导者进程的后台任务"""
+    await event_relay.stop_serving()
+    await trigger_retention.stop()
+    await alert_monitor.stop()
 
 
 @asynccontextmanager
@@ -36,8 +88,20 @@ async def lifespan(app: FastAPI):
         # 初始化数据库
         init_database()
         
-        # 这里可以添加其他初始化任务
-        # 比如启动后台监控任务、连接Redis等
+        # 加载股票代码前缀索引（自动补全）
+        if settings.SYMBOL_TRIE_ENABLED:
+            await asyncio.to_thread(load_symbol_universe, symbol_trie)
+        
+        # 后台采样系统和数据库状态，/health 直接返回快照
+        await health_sampler.start()
+        
+        # 启动通知分发（未配置Webhook/邮件时不启动）
+        await notification_dispatcher.start()
+        
+        # 多 worker 时只有领导者进程运行后台监控和清理，其他 worker 从领导者接收推送事件
+        await leader_election.start(on_elected=start_singleton_tasks, on_failed=stop_singleton_tasks)
+        if settings.WORKER_PROCESSES > 1:
+            await event_relay.start()
         
         logger.success("✅ 应用启动完成")
         
@@ -51,7 +115,16 @@ async def lifespan(app: FastAPI):
     logger.info("🛑 关闭股票监控系统后端...")
     
     try:
+        # 停止后台任务
+        await stop_singleton_tasks()
+        await event_relay.stop()
+        await notification_dispatcher.stop()
+        await leader_election.stop()
+        await health_sampler.stop()
+        grid_optimizer.shutdown()
+        
         # 关闭数据库连接
+        await close_async_database()
         close_database()
         
         # 这里可以添加其他清理任务
@@ -72,6 +145,62 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+
+def client_ip(request: Request) -> str:
+    """
+    客户端IP
+    
+    反向代理后按 RATE_LIMIT_TRUSTED_PROXIES 从 X-Forwarded-For 右侧取地址：每层代理在末尾追加
+    它看到的对端地址，左侧的条目由客户端任意填写，不能用于限流。
+    """
+    hops = settings.RATE_LIMIT_TRUSTED_PROXIES
+    if hops > 0:
+        forwarded = [part.strip() for part in request.headers.get("x-forwarded-for", "").split(",") if part.strip()]
+        if len(forwarded) >= hops:
+            return forwarded[-hops]
+    return request.client.host if request.client else "unknown"
+
+
+# API限流中间件：注册在CORS之前（位于CORS内层），429响应同样带CORS头；预检请求由CORS直接应答，不消耗令牌
+async def rate_limit_requests(request: Request, call_next):
+    """
+    按客户端IP限制 API 请求频率
+    
+    X-User-Id 由客户端任意填写，不参与限流键，否则每次换一个值就能拿到新的令牌桶。
+    """
+    if (
+        not settings.RATE_LIMIT_ENABLED
+        or request.method == "OPTIONS"
+        or not request.url.path.startswith(settings.API_V1_PREFIX)
+    ):
+        return await call_next(request)
+    
+    allowed, remaining, wait = rate_limiter.hit(client_ip(request))
+    headers = {
+        "X-RateLimit-Limit": str(rate_limiter.limit),
+        "X-RateLimit-Remaining": str(remaining)
+    }
+    
+    if not allowed:
+        headers["Retry-After"] = rate_limiter.retry_after_header(wait)
+        return JSONResponse(
+            status_code=429,
+            headers=headers,
+            content={
+                "success": False,
+                "message": "请求过于频繁，请稍后再试",
+                "status_code": 429,
+                "path": str(request.url)
+            }
+        )
+    
+    response = await call_next(request)
+    response.headers.update(headers)
+    return response
+
+
+app.add_middleware(BaseHTTPMiddleware, dispatch=rate_limit_requests)
+
 # 添加CORS中间件
 app.add_middleware(
     CORSMiddleware,
@@ -132,17 +261,76 @@ async def general_exception_handler(request: Request, exc: Exception):
     )
 
 
+def route_template(request: Request) -> str:
+    """
+    请求匹配到的路由模板（如 /api/v1/alerts/{alert_id}）
+    
+    把路径中的参数值替换回参数名，用模板而不是实际路径作为指标标签，避免每个ID产生一条时间序列。
+    """
+    if request.scope.get("endpoint") is None:
+        return "unmatched"
+    path_params = request.scope.get("path_params")
+    if not path_params:
+        return request.scope["path"]
+    names = {str(value): name for name, value in path_params.items()}
+    return "/".join(
+        f"{{{names[segment]}}}" if segment in names else segment
+        for segment in request.scope["path"].split("/")
+    )
+
+
+# 读己之写中间件：写入后的主库读取窗口通过Cookie随客户端携带，不依赖处理写入的进程
+@app.middleware("http")
+async def read_your_writes(request: Request, call_next):
+    """请求Cookie中的截止时间未到时读请求走主库；本次请求提交了写入则下发新的截止时间"""
+    if not db_manager.replica_engines:
+        return await call_next(request)
+    
+    try:
+        primary_until = float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0))
+    except ValueError:
+        primary_until = 0.0
+    state = {"primary_until": primary_until}
+    token = request_read_state.set(state)
+    try:
+        response = await call_next(request)
+    finally:
+        request_read_state.reset(token)
+    
+    if "wrote_until" in state:
+        response.set_cookie(
+            READ_YOUR_WRITES_COOKIE,
+            f"{state['wrote_until']:.3f}",
+            max_age=math.ceil(settings.DATABASE_READ_YOUR_WRITES_SECONDS),
+            path=settings.API_V1_PREFIX,
+            httponly=True,
+            samesite="lax"
+        )
+    return response
+
+
 # 请求日志中间件
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    """记录请求日志"""
+    """记录请求日志和请求指标"""
     start_time = asyncio.get_event_loop().time()
     
-    # 处理请求
-    response = await call_next(request)
-    
-    # 计算处理时间
-    process_time = asyncio.get_event_loop().time() - start_time
+    if settings.METRICS_ENABLED:
+        http_requests_in_progress.inc()
+    status_code = 500
+    try:
+        # 处理请求
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        # 计算处理时间
+        process_time = asyncio.get_event_loop().time() - start_time
+        
+        if settings.METRICS_ENABLED:
+            http_requests_in_progress.dec()
+            route = route_template(request)
+            http_request_duration_seconds.observe(process_time, request.method, route)
+            http_requests_total.inc(request.method, route, str(status_code))
     
     # 记录日志
     logger.info(
@@ -168,9 +356,14 @@ async def root():
         "docs_url": "/docs" if settings.DEBUG else "文档已禁用",
         "endpoints": {
             "health": "/health",
+            "liveness": "/health/live",
+            "readiness": "/health/ready",
             "alerts": f"{settings.API_V1_PREFIX}/alerts",
             "triggers": f"{settings.API_V1_PREFIX}/triggers",
-            "stats": f"{settings.API_V1_PREFIX}/alerts/stats"
+            "stats": f"{settings.API_V1_PREFIX}/alerts/stats",
+            "backtest": f"{settings.API_V1_PREFIX}/alerts/backtest",
+            "monitor": f"{settings.API_V1_PREFIX}/monitor/status",
+            "stream": f"{settings.API_V1_PREFIX}/ws/alerts"
         }
     }
 
@@ -178,33 +371,26 @@ async def root():
 # 健康检查
 @app.get("/health")
 async def health_check():
-    """健康检查"""
+    """健康检查（返回后台采样的快照，不在请求内查询数据库或等待CPU采样）"""
     try:
-        # 检查数据库连接
-        db_health = check_database_health()
-        db_stats = get_database_stats()
-        
-        # 检查系统资源
-        import psutil
-        cpu_percent = psutil.cpu_percent(interval=1)
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
+        snapshot = health_sampler.get_snapshot()
         
         return {
-            "status": "healthy" if db_health else "unhealthy",
+            **snapshot,
             "timestamp": asyncio.get_event_loop().time(),
             "version": settings.APP_VERSION,
             "environment": settings.ENVIRONMENT,
-            "database": {
-                "status": "connected" if db_health else "disconnected",
-                **db_stats
-            },
-            "system": {
-                "cpu_percent": cpu_percent,
-                "memory_percent": memory.percent,
-                "disk_percent": (disk.used / disk.total) * 100,
-                "uptime": asyncio.get_event_loop().time()
-            }
+            "sampler": health_sampler.get_stats(),
+            "monitor": alert_monitor.get_status(),
+            "leader": leader_election.get_status(),
+            "optimizer": grid_optimizer.get_stats(),
+            "stats_cache": stats_cache.get_stats(),
+            "alert_versions": alert_versions.get_stats(),
+            "rate_limit": rate_limiter.get_stats(),
+            "symbols": symbol_trie.get_stats(),
+            "retention": trigger_retention.get_stats(),
+            "notifications": notification_dispatcher.get_stats(),
+            "stream": {**event_bus.get_stats(), "relay": event_relay.get_stats()}
         }
         
     except Exception as e:
@@ -216,6 +402,52 @@ async def health_check():
         }
 
 
+@app.get("/health/live")
+async def liveness_check():
+    """存活检查（进程能处理请求即可，不访问任何依赖）"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """就绪检查（实时检测数据库连接，不可用时返回503）"""
+    db_health = await asyncio.to_thread(check_database_health)
+    
+    return JSONResponse(
+        status_code=200 if db_health else 503,
+        content={
+            "status": "ready" if db_health else "not_ready",
+            "database": "connected" if db_health else "disconnected",
+            "leader": leader_election.is_leader
+        }
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    """Prometheus 指标（当前 worker 进程）"""
+    if not settings.METRICS_ENABLED:
+        raise StarletteHTTPException(status_code=404, detail="指标收集未启用")
+    return PlainTextResponse(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+def _cache_samples() -> dict:
+    """各缓存的命中/未命中次数（由缓存自身统计，抓取时读取）"""
+    caches = {
+        "stats": stats_cache,
+        "market_data": alert_monitor.data_provider,
+        "market_history": history_provider
+    }
+    samples = {}
+    for name, cache in caches.items():
+        samples[(name, "hit")] = cache.hits
+        samples[(name, "miss")] = cache.misses
+    return samples
+
+
+metrics.counter("cache_requests_total", "缓存查询次数", ("cache", "result"), collect=_cache_samples)
+
+
 # 注册API路由
 app.include_router(
     alerts.router,
@@ -223,6 +455,30 @@ app.include_router(
     tags=["alerts"]
 )
 
+app.include_router(
+    triggers.router,
+    prefix=settings.API_V1_PREFIX,
+    tags=["triggers"]
+)
+
+app.include_router(
+    backtest.router,
+    prefix=settings.API_V1_PREFIX,
+    tags=["backtest"]
+)
+
+app.include_router(
+    monitor.router,
+    prefix=settings.API_V1_PREFIX,
+    tags=["monitor"]
+)
+
+app.include_router(
+    stream.router,
+    prefix=settings.API_V1_PREFIX,
+    tags=["stream"]
+)
+
 
 # 配置日志
 def setup_logging():
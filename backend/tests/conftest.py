@@ -0,0 +1,27 @@
+"""
+测试公共配置
+
+导入应用前把数据库、领导者锁指向临时目录，并关闭后台监控和限流。
+"""
+import os
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="stock-monitor-tests-")
+os.environ.setdefault("SQLITE_PATH", os.path.join(_TMP_DIR, "test.db"))
+os.environ.setdefault("LEADER_LOCK_FILE", os.path.join(_TMP_DIR, "leader.lock"))
+os.environ.setdefault("MONITOR_ENABLED", "false")
+os.environ.setdefault("SYMBOL_TRIE_ENABLED", "false")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
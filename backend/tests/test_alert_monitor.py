@@ -0,0 +1,71 @@
+"""
+预警监控轮次测试：规则只在预警表变化时重新加载
+"""
+import asyncio
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import update
+
+from app.database.database import get_session_factory
+from app.models.stock_alert import StockAlert
+from app.services.alert_monitor import AlertMonitor
+
+
+class StaticProvider:
+    """每只股票返回同一段K线"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_history(self, symbol, period=None):
+        self.calls += 1
+        index = pd.date_range("2024-01-01", periods=30, freq="D")
+        return pd.DataFrame({
+            "open": 50.0, "high": 50.0, "low": 50.0, "close": 50.0, "volume": 1000.0
+        }, index=index)
+
+
+def _age_all_alerts():
+    """把所有预警的 updated_at 改到过去，使签名稳定（SQLite 只有秒级精度）"""
+    db = get_session_factory()()
+    try:
+        db.execute(update(StockAlert).values(updated_at=datetime(2020, 1, 1)))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _create_ma_alert(client, symbol: str) -> dict:
+    response = client.post(
+        "/api/v1/alerts",
+        headers={"X-User-Id": "monitor-user"},
+        json={"symbol": symbol, "name": symbol, "indicator": {"type": "MA", "period": 5}, "condition": "ABOVE"}
+    )
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_rules_reload_only_when_alert_table_changes(client):
+    _create_ma_alert(client, "MSFT")
+    _age_all_alerts()
+
+    monitor = AlertMonitor(data_provider=StaticProvider(), interval=60)
+    asyncio.run(monitor.run_cycle())
+    asyncio.run(monitor.run_cycle())
+    assert monitor.rule_reloads == 1
+    assert "MSFT" in monitor.monitored_symbols
+
+    _create_ma_alert(client, "NVDA")
+    asyncio.run(monitor.run_cycle())
+    assert monitor.rule_reloads == 2
+    assert "NVDA" in monitor.monitored_symbols
+
+    # 刚修改的一秒内签名不可信，每轮都重新加载
+    asyncio.run(monitor.run_cycle())
+    assert monitor.rule_reloads == 3
+
+    _age_all_alerts()
+    asyncio.run(monitor.run_cycle())
+    asyncio.run(monitor.run_cycle())
+    assert monitor.rule_reloads == 4
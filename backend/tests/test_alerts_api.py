@@ -0,0 +1,73 @@
+"""
+预警API路由测试
+"""
+
+
+def _create_alert(client, user_id: str, symbol: str = "AAPL") -> str:
+    response = client.post(
+        "/api/v1/alerts",
+        headers={"X-User-Id": user_id},
+        json={
+            "symbol": symbol,
+            "name": symbol,
+            "indicator": {"type": "PRICE"},
+            "condition": "ABOVE",
+            "target_value": 100
+        }
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_batch_delete_is_not_shadowed_by_alert_id_route(client):
+    headers = {"X-User-Id": "batch-delete-user"}
+    kept = _create_alert(client, "batch-delete-user", "MSFT")
+    deleted = [_create_alert(client, "batch-delete-user") for _ in range(2)]
+
+    response = client.request("DELETE", "/api/v1/alerts/batch-delete", headers=headers, json=deleted)
+    assert response.status_code == 200, response.text
+    assert response.json()["deleted_count"] == 2
+
+    remaining = client.get("/api/v1/alerts", headers=headers).json()
+    assert [alert["id"] for alert in remaining] == [kept]
+
+
+def test_symbol_is_normalized_once_for_storage_and_search(client):
+    headers = {"X-User-Id": "symbol-user"}
+    alert_id = _create_alert(client, "symbol-user", " tsla ")
+
+    alert = client.get(f"/api/v1/alerts/{alert_id}", headers=headers).json()
+    assert alert["symbol"] == "TSLA"
+
+    found = client.get("/api/v1/alerts", headers=headers, params={"symbol": "ts"}).json()
+    assert [item["id"] for item in found] == [alert_id]
+
+
+def test_alert_list_etag_is_revalidated_until_alerts_change(client):
+    headers = {"X-User-Id": "etag-user"}
+    _create_alert(client, "etag-user")
+
+    first = client.get("/api/v1/alerts", headers=headers)
+    etag = first.headers["ETag"]
+    cached = client.get("/api/v1/alerts", headers={**headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+
+    # 查询参数不同，ETag 也不同
+    filtered = client.get("/api/v1/alerts", headers={**headers, "If-None-Match": etag}, params={"symbol": "AA"})
+    assert filtered.status_code == 200
+    assert filtered.headers["ETag"] != etag
+
+    _create_alert(client, "etag-user", "MSFT")
+    changed = client.get("/api/v1/alerts", headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert len(changed.json()) == len(first.json()) + 1
+
+
+def test_alert_templates_support_if_none_match(client):
+    first = client.get("/api/v1/alert-templates")
+    assert first.status_code == 200
+    cached = client.get("/api/v1/alert-templates", headers={"If-None-Match": first.headers["ETag"]})
+    assert cached.status_code == 304
+    assert cached.content == b""
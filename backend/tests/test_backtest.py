@@ -0,0 +1,87 @@
+"""
+回测测试：K线截取、信号起点和前瞻收益统计
+
+运行（在 backend 目录下）:
+    python -m pytest -q tests
+"""
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import pytest
+
+from app.services.alert_rules import AlertRule
+from app.services.backtest import run_backtest, slice_bars
+
+
+def _bars(tz=None) -> pd.DataFrame:
+    index = pd.date_range("2024-01-01 09:30", periods=10, freq="D", tz=tz)
+    return pd.DataFrame({"close": range(10)}, index=index)
+
+
+def test_slice_bars_naive_range_on_tz_index():
+    bars = _bars("America/New_York")
+    sliced = slice_bars(bars, datetime(2024, 1, 3, 9, 30), datetime(2024, 1, 5, 9, 30))
+    assert sliced["close"].tolist() == [2, 3, 4]
+
+
+def test_slice_bars_aware_range_on_tz_index():
+    bars = _bars("America/New_York")
+    # 2024-01-03 22:30 +08:00 == 2024-01-03 09:30 America/New_York
+    start = datetime(2024, 1, 3, 22, 30, tzinfo=timezone(timedelta(hours=8)))
+    end = datetime(2024, 1, 5, 14, 30, tzinfo=timezone.utc)
+    sliced = slice_bars(bars, start, end)
+    assert sliced["close"].tolist() == [2, 3, 4]
+
+
+def test_slice_bars_on_naive_index():
+    bars = _bars()
+    assert slice_bars(bars, datetime(2024, 1, 3, 9, 30), None)["close"].tolist() == list(range(2, 10))
+    aware_end = datetime(2024, 1, 2, 9, 30, tzinfo=timezone.utc)
+    assert slice_bars(bars, None, aware_end)["close"].tolist() == [0, 1]
+
+
+def _price_rule(condition: str = "ABOVE", target: float = 100.0) -> AlertRule:
+    return AlertRule(
+        id="rule", user_id="u", symbol="TEST", name="TEST",
+        indicator_type="PRICE", condition=condition, target_value=target
+    )
+
+
+def test_run_backtest_counts_onsets_and_forward_returns():
+    closes = [99.0, 101.0, 102.0, 99.0, 103.0, 104.0, 98.0, 97.0]
+    bars = pd.DataFrame(
+        {"open": closes, "high": closes, "low": closes, "close": closes, "volume": 1.0},
+        index=pd.date_range("2024-01-01", periods=len(closes), freq="D")
+    )
+    result = run_backtest(_price_rule(), bars, horizons=(1, 3, 10))
+    summary = result["summary"]
+
+    assert [trigger["price"] for trigger in result["triggers"]] == [101.0, 102.0, 103.0, 104.0]
+    assert [trigger["is_onset"] for trigger in result["triggers"]] == [True, False, True, False]
+    assert summary["trigger_count"] == 4
+    assert summary["signal_count"] == 2
+    assert summary["trigger_ratio"] == 0.5
+    assert summary["avg_bars_between_signals"] == 3.0
+
+    # 只统计信号起点（第1、4根）的前瞻收益
+    one_bar = summary["forward_returns"]["1"]
+    expected = [(102 / 101 - 1) * 100, (104 / 103 - 1) * 100]
+    assert one_bar["count"] == 2
+    assert one_bar["mean"] == pytest.approx(sum(expected) / 2, abs=1e-4)
+    assert one_bar["win_rate"] == 1.0
+
+    three_bars = summary["forward_returns"]["3"]
+    assert three_bars["count"] == 2
+    assert three_bars["mean"] == pytest.approx(((103 / 101 - 1) * 100 + (97 / 103 - 1) * 100) / 2, abs=1e-4)
+    assert three_bars["win_rate"] == 0.5
+
+    # 前瞻K线超出序列末尾的信号不计收益
+    assert summary["forward_returns"]["10"] == {"count": 0, "mean": None, "median": None, "win_rate": None}
+
+
+def test_run_backtest_without_signals():
+    bars = pd.DataFrame({"close": [90.0, 91.0, 92.0]}, index=pd.date_range("2024-01-01", periods=3))
+    summary = run_backtest(_price_rule(), bars, horizons=(1,))["summary"]
+    assert summary["signal_count"] == 0
+    assert summary["avg_bars_between_signals"] is None
+    assert summary["forward_returns"]["1"]["count"] == 0
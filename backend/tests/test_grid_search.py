@@ -0,0 +1,88 @@
+"""
+网格寻优分块评估测试：向量化结果与逐点循环一致
+"""
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services.grid_search import GridSpec, evaluate_chunk
+
+
+def _brute_force(close: np.ndarray, combos: np.ndarray, spec: GridSpec) -> dict:
+    """逐个 (阈值, 组合, K线) 计算信号起点和前瞻收益"""
+    series = pd.Series(close)
+    results = {}
+    for threshold in spec.thresholds:
+        limit = threshold / 2 if spec.condition == "WITHIN_RANGE" else threshold
+        for combo in combos:
+            mas = [series.rolling(int(period)).mean().to_numpy() for period in combo]
+            values = []
+            for i in range(len(close)):
+                row = [ma[i] for ma in mas]
+                if any(math.isnan(v) for v in row):
+                    values.append(math.nan)
+                elif spec.indicator_type == "MA_CONVERGENCE":
+                    values.append((max(row) - min(row)) / (sum(row) / len(row)) * 100)
+                else:
+                    values.append(abs(close[i] - row[0]) / row[0] * 100)
+
+            signals = []
+            for i, value in enumerate(values):
+                hit = not math.isnan(value) and value <= limit
+                if spec.condition == "DIVERGING":
+                    previous = values[i - 1] if i else math.nan
+                    hit = not math.isnan(previous) and previous <= limit and not hit and not math.isnan(value)
+                signals.append(hit)
+
+            onsets = [hit and not (i and signals[i - 1]) for i, hit in enumerate(signals)]
+            returns = [
+                (close[i + spec.horizon] / close[i] - 1) * 100
+                for i, onset in enumerate(onsets)
+                if onset and i + spec.horizon < len(close)
+            ]
+            if sum(onsets) >= spec.min_signals and returns:
+                results[(tuple(int(p) for p in combo), float(threshold))] = (
+                    sum(onsets),
+                    round(sum(returns) / len(returns), 4),
+                    round(sum(r > 0 for r in returns) / len(returns), 4)
+                )
+    return results
+
+
+@pytest.mark.parametrize("indicator_type, condition, periods_count", [
+    ("MA_CONVERGENCE", "CONVERGING", 3),
+    ("MA_CONVERGENCE", "DIVERGING", 2),
+    ("MA_PROXIMITY", "NEAR", 1),
+    ("MA_PROXIMITY", "WITHIN_RANGE", 1),
+])
+def test_evaluate_chunk_matches_brute_force(indicator_type, condition, periods_count):
+    rng = np.random.default_rng(3)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 160)))
+    spec = GridSpec(
+        indicator_type=indicator_type,
+        condition=condition,
+        period_min=2,
+        period_max=9,
+        thresholds=(0.5, 1.5, 4.0),
+        periods_count=periods_count,
+        horizon=3,
+        min_signals=2,
+        top_k=10_000
+    )
+    combos = spec.combos()
+
+    result = evaluate_chunk(f"GRID-{indicator_type}-{condition}", close, combos, spec)
+    vectorized = {
+        (tuple(item["periods"]), item["threshold"]): (item["signals"], item["mean_return"], item["win_rate"])
+        for item in result["best"]
+    }
+
+    assert result["evaluated"] == len(combos) * len(spec.thresholds)
+    assert vectorized == _brute_force(close, combos, spec)
+    assert vectorized, "测试数据应至少产生一个有效结果"
+
+    # best 按平均收益降序
+    means = [item["mean_return"] for item in result["best"]]
+    assert means == sorted(means, reverse=True)
@@ -0,0 +1,63 @@
+"""
+均线缠绕/接近的两份实现保持一致
+
+stock-monitor/app.py（独立部署的 Flask 服务）的 TechnicalAnalyzer 与 backend 的
+app.services.indicators 各有一份实现，这里用同一段收盘价比较两者的结果。
+stock-monitor 的依赖（pandas_ta、flask 等）未安装时跳过。
+"""
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.services import indicators
+
+STOCK_MONITOR_APP = Path(__file__).resolve().parents[2] / "stock-monitor" / "app.py"
+
+
+@pytest.fixture(scope="module")
+def stock_monitor(tmp_path_factory):
+    for module in ("pandas_ta", "flask", "flask_cors", "yfinance"):
+        pytest.importorskip(module)
+
+    # 导入时会在当前目录创建日志文件和缓存库
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.chdir(tmp_path_factory.mktemp("stock-monitor"))
+    try:
+        spec = importlib.util.spec_from_file_location("stock_monitor_app", STOCK_MONITOR_APP)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        yield module
+    finally:
+        monkeypatch.undo()
+
+
+def _close() -> pd.Series:
+    values = np.random.default_rng(7).uniform(90, 110, 300)
+    return pd.Series(values, index=pd.date_range("2023-01-02", periods=300, freq="B"))
+
+
+@pytest.mark.parametrize("periods", [(5, 10, 20), (20, 5, 60), (3, 250)])
+def test_ma_convergence_matches_backend(stock_monitor, periods):
+    close = _close()
+    flask_ratio = stock_monitor.TechnicalAnalyzer.calculate_ma_convergence(close, periods)["convergence_ratio"]
+    backend_ratio = indicators.ma_convergence(close.to_numpy(), periods)
+    np.testing.assert_allclose(flask_ratio.to_numpy(), backend_ratio, equal_nan=True)
+
+
+@pytest.mark.parametrize("period", [1, 20, 120])
+def test_ma_proximity_matches_backend(stock_monitor, period):
+    close = _close()
+    flask_distance = stock_monitor.TechnicalAnalyzer.calculate_ma_proximity(close, period)["distance"]
+    backend_distance = indicators.ma_proximity(close.to_numpy(), period)
+    np.testing.assert_allclose(flask_distance.to_numpy(), backend_distance, equal_nan=True)
+
+
+def test_history_period_covers_longest_ma(stock_monitor):
+    bars = stock_monitor.HISTORY_PERIOD_BARS
+    margin = stock_monitor.HISTORY_BARS_MARGIN
+    for period in range(1, stock_monitor.MAX_MA_PERIOD + 1):
+        history = stock_monitor.history_period_for(period)
+        assert bars[history] - margin >= period
@@ -0,0 +1,218 @@
+"""
+通知分发测试：Webhook 使用本地HTTP服务，邮件替换 smtplib.SMTP
+"""
+import asyncio
+import json
+import smtplib
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.services import notifier
+from app.services.notifier import NotificationDispatcher, SMTPConnection, is_permanent_failure
+
+
+def _trigger(user_id: str = "u1", message: str = "AAPL 突破 100") -> dict:
+    return {
+        "id": f"t-{user_id}-{message}",
+        "alert_id": "a1",
+        "symbol": "AAPL",
+        "current_price": 101.0,
+        "condition": "ABOVE",
+        "message": message,
+        "user_id": user_id,
+        "timestamp": datetime(2024, 1, 2, 9, 30)
+    }
+
+
+@pytest.fixture
+def webhook_server():
+    """按预设状态码序列应答的本地Webhook服务，记录收到的请求体"""
+    state = {"statuses": [], "bodies": []}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            state["bodies"].append(json.loads(body))
+            status = state["statuses"].pop(0) if state["statuses"] else 200
+            self.send_response(status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state["url"] = f"http://127.0.0.1:{server.server_address[1]}/hook"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+async def _run(dispatcher: NotificationDispatcher, triggers, until):
+    """启动分发器、提交触发，等待 until() 为真后停止"""
+    await dispatcher.start()
+    for trigger in triggers:
+        dispatcher.publish(trigger)
+    for _ in range(200):
+        if until():
+            break
+        await asyncio.sleep(0.01)
+    await dispatcher.stop()
+
+
+def _webhook_dispatcher(url: str, **kwargs) -> NotificationDispatcher:
+    options = {"workers": 1, "coalesce_window": 0.05, "max_retries": 3, "retry_delay": 0.01}
+    options.update(kwargs)
+    return NotificationDispatcher(webhook_url=url, **options)
+
+
+def test_webhook_coalesces_triggers_in_window(webhook_server):
+    dispatcher = _webhook_dispatcher(webhook_server["url"])
+    triggers = [_trigger("u1", "m1"), _trigger("u1", "m2"), _trigger("u2", "m3")]
+    asyncio.run(_run(dispatcher, triggers, lambda: dispatcher.delivered == 3))
+
+    assert len(webhook_server["bodies"]) == 1
+    body = webhook_server["bodies"][0]
+    assert body["count"] == 3
+    assert sorted(body["users"]) == ["u1", "u2"]
+    assert dispatcher.payloads_sent == 1
+
+
+def test_webhook_retries_transient_failures(webhook_server, monkeypatch):
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def recording_sleep(delay):
+        # 重试延迟取 0.003 的倍数，与合并窗口和测试轮询的等待区分开
+        if round(delay / 0.003, 6).is_integer():
+            delays.append(delay)
+        await real_sleep(delay)
+
+    monkeypatch.setattr(notifier.asyncio, "sleep", recording_sleep)
+    webhook_server["statuses"] = [503, 429]
+    dispatcher = _webhook_dispatcher(webhook_server["url"], retry_delay=0.003)
+    asyncio.run(_run(dispatcher, [_trigger()], lambda: dispatcher.delivered or dispatcher.failed))
+
+    assert dispatcher.delivered == 1
+    assert dispatcher.failed == 0
+    assert len(webhook_server["bodies"]) == 3
+    assert delays == pytest.approx([0.003, 0.006])
+
+
+def test_webhook_gives_up_after_max_retries(webhook_server):
+    webhook_server["statuses"] = [500] * 10
+    dispatcher = _webhook_dispatcher(webhook_server["url"], max_retries=2)
+    asyncio.run(_run(dispatcher, [_trigger()], lambda: dispatcher.failed))
+
+    assert dispatcher.failed == 1
+    assert len(webhook_server["bodies"]) == 3
+
+
+def test_webhook_does_not_retry_permanent_failure(webhook_server):
+    webhook_server["statuses"] = [400]
+    dispatcher = _webhook_dispatcher(webhook_server["url"])
+    asyncio.run(_run(dispatcher, [_trigger()], lambda: dispatcher.failed))
+
+    assert dispatcher.failed == 1
+    assert len(webhook_server["bodies"]) == 1
+
+
+def test_is_permanent_failure_for_smtp_errors():
+    assert is_permanent_failure(smtplib.SMTPRecipientsRefused({"x@example.com": (550, b"no")}))
+    assert is_permanent_failure(smtplib.SMTPDataError(554, b"rejected"))
+    assert not is_permanent_failure(smtplib.SMTPDataError(451, b"try later"))
+    assert not is_permanent_failure(smtplib.SMTPServerDisconnected())
+    assert not is_permanent_failure(OSError("connection reset"))
+
+
+class FakeSMTP:
+    """记录发送内容的 smtplib.SMTP 替身，failures 中的异常依次抛出"""
+    instances = []
+    failures = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        pass
+
+    def noop(self):
+        return 250, b"ok"
+
+    def send_message(self, message):
+        if FakeSMTP.failures:
+            raise FakeSMTP.failures.pop(0)
+        self.sent.append(message)
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def fake_smtp(monkeypatch):
+    FakeSMTP.instances = []
+    FakeSMTP.failures = []
+    monkeypatch.setattr(notifier.smtplib, "SMTP", FakeSMTP)
+    return FakeSMTP
+
+
+def _email_dispatcher(**kwargs) -> NotificationDispatcher:
+    options = {
+        "smtp": SMTPConnection("smtp.test", 25, use_tls=False),
+        "email_to": ["admin@example.com"],
+        "email_users": ["admin"],
+        "workers": 1,
+        "coalesce_window": 0.05,
+        "max_retries": 2,
+        "retry_delay": 0.01
+    }
+    options.update(kwargs)
+    return NotificationDispatcher(**options)
+
+
+def _sent_messages(fake_smtp):
+    return [message for instance in fake_smtp.instances for message in instance.sent]
+
+
+def test_email_only_sends_configured_users(fake_smtp):
+    dispatcher = _email_dispatcher()
+    triggers = [_trigger("admin", "m1"), _trigger("other", "m2"), _trigger("admin", "m3")]
+    asyncio.run(_run(dispatcher, triggers, lambda: dispatcher.delivered == 2))
+
+    messages = _sent_messages(fake_smtp)
+    assert len(messages) == 1
+    assert messages[0]["To"] == "admin@example.com"
+    assert "2 条预警触发" in messages[0]["Subject"]
+    assert "m2" not in messages[0].get_content()
+
+
+def test_email_disabled_without_user_filter(fake_smtp):
+    assert not _email_dispatcher(email_users=[]).is_enabled
+
+
+def test_email_reconnects_after_disconnect(fake_smtp):
+    fake_smtp.failures = [smtplib.SMTPServerDisconnected()]
+    dispatcher = _email_dispatcher()
+    asyncio.run(_run(dispatcher, [_trigger("admin")], lambda: dispatcher.delivered))
+
+    assert dispatcher.delivered == 1
+    assert len(fake_smtp.instances) == 2
+    assert len(_sent_messages(fake_smtp)) == 1
+
+
+def test_email_does_not_retry_rejected_recipient(fake_smtp):
+    fake_smtp.failures = [smtplib.SMTPRecipientsRefused({"admin@example.com": (550, b"no such user")})]
+    dispatcher = _email_dispatcher()
+    asyncio.run(_run(dispatcher, [_trigger("admin")], lambda: dispatcher.failed))
+
+    assert dispatcher.failed == 1
+    assert _sent_messages(fake_smtp) == []
@@ -0,0 +1,89 @@
+"""
+游标分页测试：游标编解码，逐页翻完列表不重复、不遗漏
+"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.core.pagination import decode_cursor, encode_cursor
+from app.database.database import get_session_factory
+from app.models.alert_trigger import AlertTrigger
+
+
+@pytest.mark.parametrize("timestamp", [
+    datetime(2024, 3, 1, 9, 30, 0, 123456),
+    datetime(2024, 3, 1, 9, 30, 0),
+])
+def test_cursor_round_trip(timestamp):
+    cursor = encode_cursor(timestamp, "row-1")
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (timestamp, "row-1")
+
+
+def test_invalid_cursor_is_rejected(client):
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+    for path in ("/api/v1/alerts", "/api/v1/triggers"):
+        response = client.get(path, headers={"X-User-Id": "cursor-user"}, params={"cursor": "not-a-cursor"})
+        assert response.status_code == 400
+
+
+def _collect_pages(client, path: str, user_id: str, limit: int = 2) -> list:
+    ids, params = [], {"limit": limit}
+    while True:
+        response = client.get(path, headers={"X-User-Id": user_id}, params=params)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        ids.extend(item["id"] for item in page)
+        next_cursor = response.headers.get("X-Next-Cursor")
+        if next_cursor is None:
+            assert len(page) < limit
+            return ids
+        params = {"limit": limit, "cursor": next_cursor}
+
+
+def test_alert_pages_cover_every_alert_once(client):
+    # created_at 取数据库时间（秒级），同一秒内创建的预警时间相同，靠 id 区分
+    user_id = "alert-pages-user"
+    created = set()
+    for i in range(5):
+        response = client.post("/api/v1/alerts", headers={"X-User-Id": user_id}, json={
+            "symbol": "AAPL", "name": f"a{i}", "indicator": {"type": "PRICE"}, "condition": "ABOVE", "target_value": 100
+        })
+        assert response.status_code == 200, response.text
+        created.add(response.json()["id"])
+
+    ids = _collect_pages(client, "/api/v1/alerts", user_id)
+    assert len(ids) == len(created)
+    assert set(ids) == created
+
+
+def test_trigger_pages_cover_equal_timestamps(client):
+    user_id = "trigger-pages-user"
+    base = datetime(2024, 3, 1, 9, 30, 0, 500000)
+    # 三个时刻，每个时刻多条记录；包括微秒为0的时刻
+    timestamps = [base] * 3 + [base - timedelta(microseconds=500000)] * 3 + [base + timedelta(seconds=1)] * 2
+    db = get_session_factory()()
+    try:
+        rows = [
+            AlertTrigger(
+                id=str(uuid.uuid4()),
+                alert_id="paged-alert",
+                symbol="AAPL",
+                current_price=101.0,
+                condition="ABOVE",
+                message="AAPL 突破 100",
+                user_id=user_id,
+                timestamp=timestamp
+            )
+            for timestamp in timestamps
+        ]
+        db.add_all(rows)
+        db.commit()
+        expected = [row.id for row in sorted(rows, key=lambda row: (row.timestamp, row.id), reverse=True)]
+    finally:
+        db.close()
+
+    assert _collect_pages(client, "/api/v1/triggers", user_id) == expected
+    assert _collect_pages(client, "/api/v1/triggers", user_id, limit=3) == expected
@@ -0,0 +1,65 @@
+"""
+价格阈值索引测试：二分查找的匹配结果与逐条评估一致
+"""
+import random
+
+import pandas as pd
+
+from app.services.alert_rules import AlertRule, compute_indicator, evaluate_signals
+from app.services.price_index import PriceThresholdIndex
+
+
+def _rule(alert_id: str, condition: str, target: float, symbol: str = "AAPL") -> AlertRule:
+    return AlertRule(alert_id, "index-user", symbol, alert_id, "PRICE", condition, target_value=target)
+
+
+def _brute_force(rules, symbol: str, price: float) -> set:
+    """逐条规则在最后一根K线上评估"""
+    bars = pd.DataFrame({"close": [price], "volume": [0.0]})
+    close = bars["close"].to_numpy(dtype=float)
+    return {
+        rule.id for rule in rules
+        if rule.symbol == symbol
+        and evaluate_signals(rule, close, compute_indicator(bars, rule.indicator_type))[-1]
+    }
+
+
+def test_match_agrees_with_rule_evaluation():
+    rng = random.Random(11)
+    # 目标价和价格都取 0.5 的整数倍且不低于50，避开 EQUAL 误差范围的边界
+    rules = [
+        _rule(f"r{i}", rng.choice(["ABOVE", "BELOW", "EQUAL"]), rng.randrange(100, 400) / 2,
+              rng.choice(["AAPL", "MSFT"]))
+        for i in range(300)
+    ]
+    index = PriceThresholdIndex()
+    index.load(rules)
+    assert len(index) == 300
+
+    for price in [rng.randrange(90, 410) / 2 for _ in range(200)] + [50.0, 200.0]:
+        for symbol in ("AAPL", "MSFT"):
+            matched = {rule.id for rule in index.match(symbol, price)}
+            assert matched == _brute_force(rules, symbol, price), (symbol, price)
+
+
+def test_add_replaces_and_remove_deletes():
+    index = PriceThresholdIndex()
+    index.load([_rule("a", "ABOVE", 100), _rule("b", "BELOW", 100), _rule("c", "EQUAL", 100)])
+    assert {rule.id for rule in index.match("AAPL", 100)} == {"c"}
+    assert {rule.id for rule in index.match("AAPL", 101)} == {"a"}
+
+    # 同一ID重新加入时替换旧阈值
+    index.add(_rule("a", "ABOVE", 120))
+    assert index.match("AAPL", 101) == []
+    assert [rule.id for rule in index.match("AAPL", 121)] == ["a"]
+
+    # 不由索引负责的规则加入时移除旧条目
+    index.add(AlertRule("b", "index-user", "AAPL", "b", "RSI", "ABOVE", target_value=70))
+    assert index.get("b") is None
+    assert index.match("AAPL", 99) == []
+
+    index.remove("a")
+    index.remove("c")
+    index.remove("missing")
+    assert len(index) == 0
+    assert index.symbols == []
@@ -0,0 +1,51 @@
+"""
+令牌桶限流测试：突发、匀速补充和最久未访问的桶淘汰
+"""
+import pytest
+
+from app.core.rate_limit import RateLimiter, parse_rate
+
+
+def test_parse_rate():
+    assert parse_rate("100/minute") == (100, 60.0)
+    assert parse_rate(" 10/Seconds ") == (10, 1.0)
+    with pytest.raises(ValueError):
+        parse_rate("100 per minute")
+
+
+def test_burst_then_refill_at_constant_rate():
+    limiter = RateLimiter(limit=5, period=10, max_keys=10)  # 每2秒补充1个令牌
+
+    assert [limiter.hit("a", now=0.0)[:2] for _ in range(5)] == [(True, 4), (True, 3), (True, 2), (True, 1), (True, 0)]
+    allowed, remaining, wait = limiter.hit("a", now=0.0)
+    assert (allowed, remaining) == (False, 0)
+    assert wait == pytest.approx(2.0)
+    assert RateLimiter.retry_after_header(wait) == "2"
+
+    # 1秒只补充半个令牌
+    allowed, _, wait = limiter.hit("a", now=1.0)
+    assert not allowed and wait == pytest.approx(1.0)
+
+    assert limiter.hit("a", now=2.0)[0]
+    assert not limiter.hit("a", now=2.0)[0]
+
+    # 长时间空闲后最多补满到容量
+    assert limiter.hit("a", now=1000.0)[:2] == (True, 4)
+    assert limiter.get_stats()["allowed"] == 7
+    assert limiter.get_stats()["rejected"] == 3
+
+
+def test_least_recently_used_bucket_is_evicted():
+    limiter = RateLimiter(limit=1, period=60, max_keys=2)
+    assert limiter.hit("a", now=0.0)[0]
+    assert limiter.hit("b", now=0.0)[0]
+    assert not limiter.hit("a", now=1.0)[0]  # a 变为最近访问
+
+    # 表满时新客户端照常放行，淘汰最久未访问的 b
+    assert limiter.hit("c", now=2.0)[0]
+    assert limiter.get_stats()["keys"] == 2
+    assert limiter.get_stats()["evicted"] == 1
+
+    # a 仍在限流中；b 被淘汰后重新获得完整的桶
+    assert not limiter.hit("a", now=3.0)[0]
+    assert limiter.hit("b", now=3.0)[0]
@@ -0,0 +1,33 @@
+"""
+读己之写测试：写入后的主库读取窗口由Cookie携带，不依赖处理写入的进程
+"""
+from app.database.database import READ_YOUR_WRITES_COOKIE, db_manager
+
+
+def test_write_cookie_routes_reads_to_primary_on_any_worker(client, monkeypatch):
+    # 模拟配置了副本（会话工厂没有副本，查询实际仍走主库，只检查路由决策）
+    monkeypatch.setattr(db_manager, "replica_engines", [object()])
+    decisions = []
+    real_can_read_replica = db_manager.can_read_replica
+
+    def recording_can_read_replica(user_id):
+        decisions.append(real_can_read_replica(user_id))
+        return decisions[-1]
+
+    monkeypatch.setattr(db_manager, "can_read_replica", recording_can_read_replica)
+    headers = {"X-User-Id": "ryw-user"}
+
+    response = client.post("/api/v1/alerts", headers=headers, json={
+        "symbol": "AAPL", "name": "a", "indicator": {"type": "PRICE"}, "condition": "ABOVE", "target_value": 1
+    })
+    assert response.status_code == 200, response.text
+    assert READ_YOUR_WRITES_COOKIE in response.cookies
+
+    # 清空进程内记录，相当于下一个请求落到了没有处理写入的 worker
+    monkeypatch.setattr(db_manager, "_recent_writers", {})
+    assert client.get("/api/v1/alerts", headers=headers).status_code == 200
+    assert decisions[-1] is False
+
+    client.cookies.clear()
+    assert client.get("/api/v1/alerts", headers=headers).status_code == 200
+    assert decisions[-1] is True
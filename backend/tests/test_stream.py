@@ -0,0 +1,67 @@
+"""
+实时推送测试：跨进程事件转发和订阅校验
+"""
+import asyncio
+import types
+
+from app.services.event_bus import EventBus, symbol_topic
+from app.services.event_relay import EventRelay
+
+
+async def _wait_until(condition, timeout: float = 2.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("等待超时")
+
+
+def test_relay_forwards_only_topics_subscribed_on_follower(tmp_path):
+    async def scenario():
+        socket_path = str(tmp_path / "relay.sock")
+        leader_bus, follower_bus = EventBus(), EventBus()
+        leader = EventRelay(bus=leader_bus, socket_path=socket_path, retry_interval=0.05)
+        follower = EventRelay(
+            bus=follower_bus,
+            socket_path=socket_path,
+            retry_interval=0.05,
+            election=types.SimpleNamespace(is_leader=False)
+        )
+        await leader.start_serving()
+        await follower.start()
+        try:
+            # 连接前已有的订阅在连接后整体上报
+            local = follower_bus.subscribe([symbol_topic("AAPL")])
+            await _wait_until(lambda: leader_bus.has_subscribers(symbol_topic("AAPL")))
+            assert not leader_bus.has_subscribers(symbol_topic("MSFT"))
+
+            leader_bus.publish(symbol_topic("MSFT"), {"type": "quote", "symbol": "MSFT"})
+            leader_bus.publish(symbol_topic("AAPL"), {"type": "quote", "symbol": "AAPL", "price": 1.5})
+            event = await asyncio.wait_for(local.queue.get(), timeout=2)
+            assert event == {"type": "quote", "symbol": "AAPL", "price": 1.5}
+
+            # 连接后新增和取消的订阅逐条上报
+            follower_bus.add_topics(local, [symbol_topic("MSFT")])
+            await _wait_until(lambda: leader_bus.has_subscribers(symbol_topic("MSFT")))
+            follower_bus.unsubscribe(local)
+            await _wait_until(lambda: not leader_bus.topics)
+            assert local.queue.empty()
+        finally:
+            await follower.stop()
+            await leader.stop_serving()
+
+    asyncio.run(scenario())
+
+
+def test_subscribe_rejects_symbols_without_active_alerts(client):
+    response = client.post("/api/v1/alerts", headers={"X-User-Id": "stream-owner"}, json={
+        "symbol": "IONQ", "name": "IonQ", "indicator": {"type": "PRICE"}, "condition": "ABOVE", "target_value": 1
+    })
+    assert response.status_code == 200, response.text
+
+    with client.websocket_connect("/api/v1/ws/alerts?user_id=stream-viewer") as websocket:
+        assert websocket.receive_json() == {"type": "subscribed", "symbols": []}
+        websocket.send_json({"action": "subscribe", "symbols": [" ionq ", "NOPE"]})
+        error = websocket.receive_json()
+        assert error["type"] == "error" and error["symbols"] == ["NOPE"]
+        assert websocket.receive_json() == {"type": "subscribed", "symbols": ["IONQ"]}
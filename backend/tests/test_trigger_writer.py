@@ -0,0 +1,65 @@
+"""
+触发写缓冲测试：批量写入失败的重试上限和逐条写入
+"""
+import uuid
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.database.database import get_session_factory
+from app.models.alert_trigger import AlertTrigger
+from app.services.trigger_writer import TriggerWriter
+
+
+def _trigger(message="AAPL 突破 100") -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "alert_id": str(uuid.uuid4()),
+        "symbol": "AAPL",
+        "current_price": 101.0,
+        "indicator_value": None,
+        "condition": "ABOVE",
+        "message": message,
+        "user_id": "writer-user",
+        "severity": 1,
+        "is_read": False,
+        "timestamp": datetime.now()
+    }
+
+
+def _stored_ids(ids):
+    db = get_session_factory()()
+    try:
+        return set(db.scalars(select(AlertTrigger.id).where(AlertTrigger.id.in_(ids))))
+    finally:
+        db.close()
+
+
+def test_bad_row_is_dropped_after_max_retries(client):
+    writer = TriggerWriter(cooldown_minutes=0, max_retries=2)
+    good, bad = _trigger(), _trigger(message=None)  # message 非空约束，整批插入失败
+    assert writer.submit(good) and writer.submit(bad)
+
+    assert writer.flush() == 0
+    assert writer.flush() == 0
+    assert writer.pending == 2
+
+    # 达到重试上限后逐条写入：好记录写入，坏记录丢弃
+    assert writer.flush() == 1
+    assert writer.pending == 0
+    assert writer.total_failed == 1
+    assert _stored_ids([good["id"], bad["id"]]) == {good["id"]}
+
+
+def test_new_triggers_still_batch_after_bad_row_is_isolated(client):
+    writer = TriggerWriter(cooldown_minutes=0, max_retries=1)
+    bad = _trigger(message=None)
+    writer.submit(bad)
+    assert writer.flush() == 0
+
+    fresh = [_trigger() for _ in range(3)]
+    for trigger in fresh:
+        writer.submit(trigger)
+    assert writer.flush() == 3
+    assert writer.total_failed == 1
+    assert _stored_ids([trigger["id"] for trigger in fresh]) == {trigger["id"] for trigger in fresh}
@@ -11,11 +11,13 @@ import logging
 import time
 import random
 import sqlite3
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 import sqlite3
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pandas_ta as ta
 import requests
@@ -87,6 +89,7 @@ init_cache_db()
 STOCK_DATA = {}  # 股票数据缓存
 MONITOR_RULES = {}  # 监控规则
 ALERTS = []  # 预警记录
+MA_STATES = OrderedDict()  # 均线增量计算状态 (symbol, periods) -> RollingMAState，按最近使用排序
 
 # API请求计数器
 API_USAGE = {
@@ -416,6 +419,311 @@ class TechnicalAnalyzer:
             logger.error(f"计算技术指标失败: {e}")
             return df
 
+    @staticmethod
+    def rolling_means(close: pd.Series, periods: Sequence[int]) -> pd.DataFrame:
+        """
+        基于同一份前缀和一次性计算多个周期的简单移动平均
+        
+        Args:
+            close: 收盘价序列
+            periods: 均线周期列表
+            
+        Returns:
+            DataFrame: 每个周期一列 (sma_<period>)，数据不足的位置为 NaN
+        """
+        periods = _normalize_periods(periods)
+        values = close.to_numpy(dtype=float)
+        n = len(values)
+        csum = np.concatenate(([0.0], np.cumsum(values)))
+        
+        columns = {}
+        for period in periods:
+            ma = np.full(n, np.nan)
+            if period <= n:
+                ma[period - 1:] = (csum[period:] - csum[:-period]) / period
+            columns[f'sma_{period}'] = ma
+        
+        return pd.DataFrame(columns, index=close.index)
+    
+    @staticmethod
+    def calculate_ma_convergence(
+        close: pd.Series,
+        periods: Sequence[int] = (5, 10, 20),
+        threshold: float = 2.0
+    ) -> pd.DataFrame:
+        """
+        计算均线缠绕序列：(最大均线 - 最小均线) / 均线平均值 * 100%
+        
+        Args:
+            close: 收盘价序列
+            periods: 参与缠绕判断的均线周期
+            threshold: 缠绕阈值(%)，缠绕程度不超过该值视为缠绕
+            
+        Returns:
+            DataFrame: 各均线列 + convergence_ratio + is_converging
+        """
+        result = TechnicalAnalyzer.rolling_means(close, periods)
+        ma_values = result.to_numpy()
+        
+        # 任一均线尚未形成时整行为 NaN
+        spread = ma_values.max(axis=1) - ma_values.min(axis=1)
+        ratio = spread / ma_values.mean(axis=1) * 100
+        
+        result['convergence_ratio'] = ratio
+        result['is_converging'] = ratio <= threshold
+        return result
+    
+    @staticmethod
+    def calculate_ma_proximity(
+        close: pd.Series,
+        period: int = 20,
+        threshold: float = 2.0
+    ) -> pd.DataFrame:
+        """
+        计算股价与均线的距离序列
+        
+        Args:
+            close: 收盘价序列
+            period: 均线周期
+            threshold: 接近阈值(%)，范围内震荡使用阈值的一半
+            
+        Returns:
+            DataFrame: sma_<period> + distance + is_near + is_within_range + direction
+        """
+        result = TechnicalAnalyzer.rolling_means(close, [period])
+        ma = result[f'sma_{period}'].to_numpy()
+        prices = close.to_numpy(dtype=float)
+        
+        distance = np.abs(prices - ma) / ma * 100
+        result['distance'] = distance
+        result['is_near'] = distance <= threshold
+        result['is_within_range'] = distance <= threshold / 2
+        result['direction'] = np.sign(prices - ma)
+        return result
+
+
+# 均线周期限制（查询参数可任意组合周期，每种组合都会缓存一份增量状态）
+MAX_MA_PERIOD = 250
+MAX_MA_PERIODS = 5
+MA_STATES_MAX_SIZE = 256
+
+# yfinance 历史长度及其大致交易日数（从短到长）
+HISTORY_PERIOD_BARS = OrderedDict([('1mo', 21), ('3mo', 63), ('6mo', 126), ('1y', 252), ('2y', 504)])
+# 交易日数因节假日浮动，选择历史长度时预留的K线数
+HISTORY_BARS_MARGIN = 5
+
+
+def history_period_for(max_period: int) -> str:
+    """能覆盖 max_period 周期均线的最短历史长度"""
+    for period, bars in HISTORY_PERIOD_BARS.items():
+        if bars - HISTORY_BARS_MARGIN >= max_period:
+            return period
+    return next(reversed(HISTORY_PERIOD_BARS))
+
+
+def _normalize_periods(periods: Sequence[int]) -> List[int]:
+    """校验并去重均线周期"""
+    normalized = sorted({int(p) for p in periods})
+    if not normalized or normalized[0] <= 0 or normalized[-1] > MAX_MA_PERIOD:
+        raise ValueError(f"无效的均线周期: {list(periods)}（取值 1-{MAX_MA_PERIOD}）")
+    return normalized
+
+
+def parse_periods(raw: str) -> List[int]:
+    """解析查询参数中的均线周期（逗号分隔，最多 MAX_MA_PERIODS 个）"""
+    try:
+        periods = _normalize_periods([int(p) for p in raw.split(',') if p.strip()])
+    except ValueError:
+        raise ValueError(f"无效的均线周期: {raw}（1-{MAX_MA_PERIOD} 的整数，逗号分隔）") from None
+    if len(periods) > MAX_MA_PERIODS:
+        raise ValueError(f"均线周期最多 {MAX_MA_PERIODS} 个")
+    return periods
+
+
+class RollingMAState:
+    """
+    均线增量计算状态
+    
+    维护最近 max(periods) 根K线的收盘价和每个周期的滑动窗口和，
+    新K线到来时以 O(len(periods)) 更新所有均线，无需重算整段历史。
+    """
+    
+    def __init__(self, periods: Sequence[int]):
+        self.periods = _normalize_periods(periods)
+        self._window = deque(maxlen=self.periods[-1])
+        self._sums = {period: 0.0 for period in self.periods}
+        self.last_timestamp = None
+    
+    @classmethod
+    def from_series(cls, close: pd.Series, periods: Sequence[int]) -> 'RollingMAState':
+        """用历史收盘价初始化状态"""
+        state = cls(periods)
+        for value in close.to_numpy(dtype=float)[-state.periods[-1]:]:
+            state.update(value)
+        if len(close) > 0:
+            state.last_timestamp = close.index[-1]
+        return state
+    
+    def update(self, close: float, new_bar: bool = True):
+        """
+        推入一个收盘价
+        
+        Args:
+            close: 最新收盘价
+            new_bar: True 表示新K线，False 表示修正当前K线（盘中实时价）
+        """
+        close = float(close)
+        window = self._window
+        
+        if not new_bar and window:
+            delta = close - window[-1]
+            for period in self.periods:
+                self._sums[period] += delta
+            window[-1] = close
+            return
+        
+        for period in self.periods:
+            if len(window) >= period:
+                self._sums[period] -= window[-period]
+            self._sums[period] += close
+        window.append(close)
+    
+    def sync(self, close: pd.Series):
+        """将缓存数据中比状态更新的K线增量推入"""
+        if self.last_timestamp is None:
+            new_values = close
+        else:
+            if self.last_timestamp in close.index and self._window:
+                self.update(close.loc[self.last_timestamp], new_bar=False)
+            new_values = close[close.index > self.last_timestamp]
+        
+        for value in new_values.to_numpy(dtype=float):
+            self.update(value)
+        if len(close) > 0:
+            self.last_timestamp = close.index[-1]
+    
+    @property
+    def size(self) -> int:
+        """状态中保留的K线数"""
+        return len(self._window)
+    
+    def moving_averages(self) -> Dict[int, Optional[float]]:
+        """当前各周期均线值，数据不足的周期为 None"""
+        count = len(self._window)
+        return {
+            period: self._sums[period] / period if count >= period else None
+            for period in self.periods
+        }
+    
+    def convergence(
+        self,
+        threshold: float = 2.0,
+        periods: Optional[Sequence[int]] = None
+    ) -> Optional[Dict]:
+        """当前均线缠绕状态（periods 为空时使用全部周期）"""
+        ma_values = self.moving_averages()
+        if periods is not None:
+            ma_values = {period: ma_values[period] for period in _normalize_periods(periods)}
+        if any(value is None for value in ma_values.values()):
+            return None
+        
+        values = list(ma_values.values())
+        ratio = (max(values) - min(values)) / (sum(values) / len(values)) * 100
+        return {
+            'ma_values': ma_values,
+            'convergence_ratio': ratio,
+            'is_converging': ratio <= threshold
+        }
+    
+    def proximity(self, price: float, period: int, threshold: float = 2.0) -> Optional[Dict]:
+        """当前价格与指定均线的距离"""
+        price = float(price)
+        ma = self.moving_averages().get(period)
+        if ma is None:
+            return None
+        
+        distance = abs(price - ma) / ma * 100
+        return {
+            'ma_value': ma,
+            'distance': distance,
+            'is_near': distance <= threshold,
+            'is_within_range': distance <= threshold / 2,
+            'direction': 'above' if price > ma else 'below' if price < ma else 'on'
+        }
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets 降采样，返回保留点的下标
+    
+    首尾点固定保留，中间每个桶选出与前一选中点、下一桶均值点
+    构成三角形面积最大的点，尽量保留曲线的形状（峰谷）。
+    """
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    a = 0
+    
+    for i in range(threshold - 2):
+        start = int(np.floor(i * every)) + 1
+        end = int(np.floor((i + 1) * every)) + 1
+        next_end = min(int(np.floor((i + 2) * every)) + 1, n)
+        
+        avg_x = x[end:next_end].mean()
+        avg_y = np.nanmean(y[end:next_end]) if not np.isnan(y[end:next_end]).all() else y[a]
+        
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) -
+            (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        area = np.where(np.isnan(area), -1.0, area)
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    
+    selected[-1] = n - 1
+    return selected
+
+
+def minmax_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    最小/最大值分桶降采样，返回保留点的下标
+    
+    每个桶保留最小值和最大值两个点（按时间顺序），适合成交量等尖峰数据。
+    """
+    n = len(y)
+    if threshold >= n or threshold < 2:
+        return np.arange(n)
+    
+    buckets = np.array_split(np.arange(n), threshold // 2)
+    filled = np.where(np.isnan(y), np.nanmean(y) if not np.isnan(y).all() else 0.0, y)
+    
+    selected = []
+    for bucket in buckets:
+        values = filled[bucket]
+        selected.append(bucket[int(np.argmin(values))])
+        selected.append(bucket[int(np.argmax(values))])
+    
+    return np.unique(selected)
+
+
+def get_ma_state(symbol: str, df: pd.DataFrame, periods: Sequence[int]) -> RollingMAState:
+    """获取（并增量同步）某只股票的均线状态（LRU，最多保留 MA_STATES_MAX_SIZE 个）"""
+    key: Tuple[str, Tuple[int, ...]] = (symbol, tuple(_normalize_periods(periods)))
+    state = MA_STATES.pop(key, None)
+    # 数据换成更长的历史后，状态中的K线不足以计算长周期均线时重建
+    if state is None or state.size < min(len(df), key[1][-1]):
+        state = RollingMAState.from_series(df['close'], key[1])
+        while len(MA_STATES) >= MA_STATES_MAX_SIZE:
+            MA_STATES.popitem(last=False)
+    else:
+        state.sync(df['close'])
+    MA_STATES[key] = state
+    return state
+
 
 # API路由
 @app.route('/')
@@ -428,6 +736,7 @@ def index():
         'endpoints': {
             'stock_data': '/api/stock/<symbol>',
             'indicators': '/api/indicators/<symbol>',
+            'indicator_series': '/api/indicators/<symbol>/series',
             'health': '/api/health'
         }
     })
@@ -461,7 +770,8 @@ def get_stock_data(symbol):
             
             STOCK_DATA[symbol] = {
                 'data': df,
-                'last_update': datetime.now()
+                'last_update': datetime.now(),
+                'period': '1mo'
             }
         
         df = STOCK_DATA[symbol]['data']
@@ -485,14 +795,25 @@ def get_stock_data(symbol):
 def get_indicators(symbol):
     """获取技术指标"""
     try:
-        # 获取股票数据
-        if symbol not in STOCK_DATA:
-            df = stock_data_provider.get_stock_data(symbol)
+        # 均线缠绕/接近参数（支持自定义周期），先校验再取数据
+        periods = parse_periods(request.args.get('periods', '5,10,20'))
+        threshold = request.args.get('threshold', 2.0, type=float)
+        proximity_period = request.args.get('proximity_period', 20, type=int)
+        if not 1 <= proximity_period <= MAX_MA_PERIOD:
+            raise ValueError(f"proximity_period 取值 1-{MAX_MA_PERIOD}")
+        
+        # 获取股票数据：历史长度按最长的均线周期选择，缓存的历史不够长时重新获取
+        history_period = history_period_for(max(periods + [proximity_period]))
+        cached = STOCK_DATA.get(symbol)
+        if cached is None or \
+           HISTORY_PERIOD_BARS.get(cached.get('period', '1mo'), 0) < HISTORY_PERIOD_BARS[history_period]:
+            df = stock_data_provider.get_stock_data(symbol, history_period)
             if df is None:
                 return jsonify({'error': f'无法获取股票数据: {symbol}'}), 404
             STOCK_DATA[symbol] = {
                 'data': df,
-                'last_update': datetime.now()
+                'last_update': datetime.now(),
+                'period': history_period
             }
         
         df = STOCK_DATA[symbol]['data']
@@ -500,6 +821,11 @@ def get_indicators(symbol):
         # 计算技术指标
         indicators_df = TechnicalAnalyzer.calculate_indicators(df)
         
+        # 均线缠绕/接近
+        ma_state = get_ma_state(symbol, df, periods + [proximity_period])
+        convergence = ma_state.convergence(threshold, periods)
+        proximity = ma_state.proximity(float(df['close'].iloc[-1]), proximity_period, threshold)
+        
         # 返回最新数据
         latest = indicators_df.iloc[-1]
         result = {
@@ -517,16 +843,104 @@ def get_indicators(symbol):
                 'rsi': float(latest.get('rsi', 0)) if pd.notna(latest.get('rsi')) else None,
                 'macd': float(latest.get('MACD_12_26_9', 0)) if pd.notna(latest.get('MACD_12_26_9')) else None,
                 'macd_signal': float(latest.get('MACDs_12_26_9', 0)) if pd.notna(latest.get('MACDs_12_26_9')) else None,
+                'ma_convergence': convergence,
+                'ma_proximity': proximity,
             }
         }
         
         return jsonify(result)
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         logger.error(f"获取技术指标API错误: {e}")
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/indicators/<symbol>/series')
+def get_indicator_series(symbol):
+    """
+    获取技术指标历史序列（用于图表）
+    
+    Query参数:
+        columns: 指标列，逗号分隔（默认 close,sma_20）
+        period: 历史长度，yfinance 格式（默认 1y）
+        start/end: 时间范围（ISO日期）
+        max_points: 最大返回点数，超过时在服务端降采样
+        method: 降采样算法 lttb / minmax（默认 lttb）
+        periods/threshold: 请求 convergence_ratio 列时使用的均线周期和阈值
+    """
+    try:
+        columns = [c.strip() for c in request.args.get('columns', 'close,sma_20').split(',') if c.strip()]
+        period = request.args.get('period', '1y')
+        start = request.args.get('start')
+        end = request.args.get('end')
+        max_points = request.args.get('max_points', type=int)
+        method = request.args.get('method', 'lttb').lower()
+        
+        if not columns:
+            return jsonify({'error': 'columns 至少包含一个指标列'}), 400
+        if method not in ('lttb', 'minmax'):
+            return jsonify({'error': f'不支持的降采样算法: {method}'}), 400
+        if max_points is not None and max_points < 3:
+            return jsonify({'error': 'max_points 至少为 3'}), 400
+        
+        df = stock_data_provider.get_stock_data(symbol, period)
+        if df is None:
+            return jsonify({'error': f'无法获取股票数据: {symbol}'}), 404
+        
+        indicators_df = TechnicalAnalyzer.calculate_indicators(df)
+        
+        if 'convergence_ratio' in columns:
+            periods = parse_periods(request.args.get('periods', '5,10,20'))
+            threshold = request.args.get('threshold', 2.0, type=float)
+            convergence = TechnicalAnalyzer.calculate_ma_convergence(df['close'], periods, threshold)
+            indicators_df['convergence_ratio'] = convergence['convergence_ratio']
+        
+        unknown = [c for c in columns if c not in indicators_df.columns]
+        if unknown:
+            return jsonify({
+                'error': f'未知的指标列: {unknown}',
+                'available_columns': list(indicators_df.columns)
+            }), 400
+        
+        # 时间范围过滤
+        series_df = indicators_df.loc[start:end, columns]
+        total = len(series_df)
+        
+        # 服务端降采样，按首列选点，其余列取相同下标保证对齐
+        if max_points and total > max_points:
+            values = series_df[columns[0]].to_numpy(dtype=float)
+            if method == 'lttb':
+                x = (series_df.index - series_df.index[0]).total_seconds().to_numpy()
+                indices = lttb_indices(x, values, max_points)
+            else:
+                indices = minmax_indices(values, max_points)
+            series_df = series_df.iloc[indices]
+        
+        series_df = series_df.astype(float).round(4)
+        records = [
+            {'date': ts.isoformat(), **{c: (None if pd.isna(v) else v) for c, v in zip(columns, row)}}
+            for ts, row in zip(series_df.index, series_df.itertuples(index=False, name=None))
+        ]
+        
+        return jsonify({
+            'symbol': symbol,
+            'period': period,
+            'columns': columns,
+            'total': total,
+            'count': len(records),
+            'method': method if max_points and total > max_points else None,
+            'data': records
+        })
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"获取指标序列API错误: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 if __name__ == '__main__':
     logger.info("启动股票监控系统...")
     logger.info(f"服务地址: http://{CONFIG['host']}:{CONFIG['port']}")